@@ -0,0 +1,216 @@
+"""Admission control for model calls: a concurrency limit with a fair, bounded queue.
+
+At most MAX_CONCURRENT calls run at once in the process. Further requests
+wait in a queue of at most MAX_QUEUED entries, with at most
+MAX_QUEUED_PER_USER per user. Interactive requests are admitted before
+batch requests. Within a priority, users take turns (round robin), so one
+user's burst cannot hold everyone else back. A request that cannot be
+queued, or that waits longer than QUEUE_TIMEOUT seconds, raises
+`Overloaded` instead of piling up threads. `controller.stats()` reports
+the live counters; warmup.py serves them at GET /metrics.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+MAX_CONCURRENT = int(os.environ.get("ADMISSION_MAX_CONCURRENT", "8"))
+MAX_QUEUED = int(os.environ.get("ADMISSION_MAX_QUEUED", "32"))
+MAX_QUEUED_PER_USER = int(os.environ.get("ADMISSION_MAX_QUEUED_PER_USER", "2"))
+QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "60"))
+
+PRIORITIES = ('interactive', 'batch')
+
+
+class Overloaded(Exception):
+    """Raised when a request is rejected instead of queued or times out in the queue."""
+
+    def __init__(self, reason):
+        super().__init__(f"Classification capacity exhausted ({reason})")
+        self.reason = reason
+
+
+class Cancelled(Exception):
+    """Raised in a queued request whose `cancel` event was set (see AdmissionController.wake)."""
+
+
+class _Ticket:
+    __slots__ = ('user_id', 'priority', 'granted', 'enqueued')
+
+    def __init__(self, user_id, priority):
+        self.user_id = user_id
+        self.priority = priority
+        self.granted = False
+        self.enqueued = time.monotonic()
+
+
+class AdmissionController:
+    """Admits at most `max_concurrent` holders; queues the rest fairly per user."""
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT, max_queued=MAX_QUEUED,
+                 max_queued_per_user=MAX_QUEUED_PER_USER, timeout=QUEUE_TIMEOUT):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.max_queued_per_user = max_queued_per_user
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        # priority -> user_id -> tickets; a user moves to the back after each admission
+        self._queues = {priority: OrderedDict() for priority in PRIORITIES}
+        self._queued = 0
+        self._active = 0
+        self._counters = {'admitted': 0, 'waited': 0, 'rejected_full': 0, 'rejected_user': 0, 'timed_out': 0,
+                          'cancelled': 0, 'declined': 0}
+        self._waits = deque(maxlen=200)
+
+    def _order(self):
+        """Queued tickets in the order they will be admitted."""
+        order = []
+        for priority in PRIORITIES:
+            lanes = [list(tickets) for tickets in self._queues[priority].values()]
+            depth = 0
+            while lanes:
+                lanes = [lane for lane in lanes if len(lane) > depth]
+                order.extend(lane[depth] for lane in lanes)
+                depth += 1
+        return order
+
+    def _dispatch(self):
+        """Admit queued tickets while there is capacity (caller holds the lock)."""
+        while self._active < self.max_concurrent and self._queued:
+            for priority in PRIORITIES:
+                users = self._queues[priority]
+                if users:
+                    user_id, tickets = next(iter(users.items()))
+                    ticket = tickets.popleft()
+                    users.pop(user_id)
+                    if tickets:
+                        users[user_id] = tickets
+                    break
+            ticket.granted = True
+            self._queued -= 1
+            self._active += 1
+            self._waits.append(time.monotonic() - ticket.enqueued)
+        self._cond.notify_all()
+
+    def _remove(self, ticket):
+        users = self._queues[ticket.priority]
+        tickets = users[ticket.user_id]
+        tickets.remove(ticket)
+        if not tickets:
+            users.pop(ticket.user_id)
+        self._queued -= 1
+
+    def acquire(self, user_id, priority='interactive', on_wait=None, cancel=None):
+        """Block until admitted; `on_wait(position)` is called as the queue position changes.
+
+        Position 1 is next in line. Raises Overloaded if the queue is full,
+        the user already has too many queued requests, or the wait times out.
+        `on_wait` runs without the lock; if it raises, the request leaves the
+        queue (or gives back the slot it was just granted). If the `cancel`
+        event is set while the request is queued, it leaves the queue and
+        raises Cancelled; whoever sets it calls wake().
+        """
+        with self._cond:
+            if self._active < self.max_concurrent and not self._queued:
+                self._active += 1
+                self._counters['admitted'] += 1
+                self._waits.append(0.0)
+                return
+            if self._queued >= self.max_queued:
+                self._counters['rejected_full'] += 1
+                raise Overloaded("queue full")
+            user_queued = sum(len(users.get(user_id, ())) for users in self._queues.values())
+            if user_queued >= self.max_queued_per_user:
+                self._counters['rejected_user'] += 1
+                raise Overloaded("too many queued requests for this user")
+            ticket = _Ticket(user_id, priority)
+            self._queues[priority].setdefault(user_id, deque()).append(ticket)
+            self._queued += 1
+            self._counters['waited'] += 1
+
+        deadline = ticket.enqueued + self.timeout
+        position = None
+        try:
+            while True:
+                with self._cond:
+                    if ticket.granted:
+                        self._counters['admitted'] += 1
+                        return
+                    if cancel is not None and cancel.is_set():
+                        self._remove(ticket)
+                        self._counters['cancelled'] += 1
+                        raise Cancelled()
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._remove(ticket)
+                        self._counters['timed_out'] += 1
+                        raise Overloaded("timed out waiting in the queue")
+                    current = self._order().index(ticket) + 1 if on_wait is not None else position
+                    if current == position:
+                        self._cond.wait(remaining)
+                        continue
+                    position = current
+                # Outside the lock: the callback may be slow or raise (e.g. a Streamlit rerun)
+                on_wait(position)
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+    def try_acquire(self):
+        """Take a slot only if one is free and nobody is queued; never waits.
+
+        For optional extra calls (hedges): they use spare capacity or are not made.
+        """
+        with self._cond:
+            if self._active < self.max_concurrent and not self._queued:
+                self._active += 1
+                self._counters['admitted'] += 1
+                return True
+            self._counters['declined'] += 1
+            return False
+
+    def _abandon(self, ticket):
+        """Give up a ticket whose waiter raised: release its slot or leave the queue."""
+        with self._cond:
+            if ticket.granted:
+                self._active -= 1
+                self._dispatch()
+            elif ticket in self._queues[ticket.priority].get(ticket.user_id, ()):
+                self._remove(ticket)
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._dispatch()
+
+    def wake(self):
+        """Wake queued requests so they check their `cancel` events."""
+        with self._cond:
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, user_id, priority='interactive', on_wait=None, cancel=None):
+        self.acquire(user_id, priority, on_wait, cancel)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._waits)
+            return {
+                'active': self._active,
+                'max_concurrent': self.max_concurrent,
+                'queue': {priority: sum(len(tickets) for tickets in self._queues[priority].values())
+                           for priority in PRIORITIES},
+                'max_queued': self.max_queued,
+                **self._counters,
+                'wait_p50': waits[len(waits) // 2] if waits else 0.0,
+                'wait_p95': waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0,
+            }
+
+
+# Shared by every session in the process (the app and the warm-up server)
+controller = AdmissionController()
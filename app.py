@@ -4,35 +4,31 @@ import base64
 from pathlib import Path
 import time
 import os
-import google.generativeai as genai
 from random import randint
-import datetime
-import pandas as pd
-import io
-import openpyxl
 import uuid
-import sqlite3
-
-NUM_KEYS = 1
-
-def init_db():
-    """Initialize SQLite database and create tables if they don't exist."""
-    conn = sqlite3.connect('history.db', check_same_thread=False)
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS classifications (
-            id TEXT PRIMARY KEY,
-            input_text TEXT NOT NULL,
-            main_classification TEXT NOT NULL,
-            sub_classification TEXT NOT NULL,
-            case_type TEXT NOT NULL,
-            explanation TEXT,
-            duration TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    return conn
+from concurrent.futures import ThreadPoolExecutor
+from classifier import (EXPLANATION_MODE, NUM_KEYS, RESPONSE_SCHEMA, create_explanation_model, create_model,
+                        generate_explanation, parse_response)
+from admission import Overloaded, controller as admission
+from condensation import prepare_input
+from hedging import HEDGE_WINDOW, HEDGING, Hedger
+from history_db import HistoryCache, init_db, recent_durations, save_explanation, sync_similarity_index
+from similarity_index import shared_index
+from speculation import SPECULATION, result_key, speculator
+from taxonomy_reload import reloader
+from warmup import SESSION_TTL, configured_keys, taxonomy_file
+from profiling import profile
+
+# Reuse a past classification when a new case is this similar (MinHash Jaccard).
+# Opt-in: the reused case may belong to another user; only its labels are copied.
+SIMILARITY_REUSE = os.environ.get("SIMILARITY_REUSE", "0") == "1"
+SIMILARITY_THRESHOLD = float(os.environ.get("SIMILARITY_THRESHOLD", "0.85"))
+
+# Past classifications below the panels, read from the shared history cache
+HISTORY_VIEW = os.environ.get("HISTORY_VIEW", "0") == "1"
+
+# Opening the app with ?profile=<token> profiles every run of that session
+PROFILE_ADMIN_TOKEN = os.environ.get("PROFILE_ADMIN_TOKEN")
 
 def get_db():
     """Get database connection, creating it if necessary."""
@@ -40,49 +36,98 @@ def get_db():
         st.session_state.db_conn = init_db()
     return st.session_state.db_conn
 
-def load_history_from_db():
-    """Load classification history from SQLite database."""
-    conn = get_db()
-    df = pd.read_sql_query(
-        'SELECT * FROM classifications ORDER BY created_at DESC',
-        conn
-    )
-    if df.empty:
-        return []
-    return df.to_dict('records')
+@st.cache_resource(show_spinner=False)
+def get_history_cache():
+    return HistoryCache()
+
+def get_history():
+    """History rows for the current session's page of the user's cached history."""
+    return get_history_cache().page(get_user_id(), st.session_state.get('history_page', 0))
 
 def save_to_db(entry):
-    """Save a single classification entry to the database."""
-    conn = get_db()
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO classifications 
-        (id, input_text, main_classification, sub_classification, case_type, explanation, duration)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        entry['id'],
-        entry['input'],
-        entry['main_classification'],
-        entry['sub_classification'],
-        entry['case_type'],
-        entry['explanation'],
-        entry['duration']
-    ))
-    conn.commit()
+    """Save a single classification entry to the database and return its rowid."""
+    def insert(conn):
+        c = conn.execute('''
+            INSERT INTO classifications 
+            (id, user_id, input_text, main_classification, sub_classification, case_type, explanation, duration, taxonomy_version, reused_from, input_tokens, condensed_text, model_duration)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            entry['id'],
+            get_user_id(),
+            entry['input'],
+            entry['main_classification'],
+            entry['sub_classification'],
+            entry['case_type'],
+            entry['explanation'],
+            entry['duration'],
+            entry.get('taxonomy_version'),
+            entry.get('reused_from'),
+            entry.get('input_tokens'),
+            entry.get('condensed_text'),
+            entry.get('model_duration')
+        ))
+        conn.commit()
+        return c.lastrowid
+    return get_history_cache().write(get_user_id(), insert)
 
 def delete_from_db(entry_id):
-    """Delete a single entry from the database."""
-    conn = get_db()
-    c = conn.cursor()
-    c.execute('DELETE FROM classifications WHERE id = ?', (entry_id,))
-    conn.commit()
+    """Delete a single entry from the current user's history."""
+    def delete(conn):
+        conn.execute('DELETE FROM classifications WHERE id = ? AND user_id = ?', (entry_id, get_user_id()))
+        conn.commit()
+    get_history_cache().write(get_user_id(), delete)
 
 def clear_history_db():
-    """Clear all history from the database."""
-    conn = get_db()
-    c = conn.cursor()
-    c.execute('DELETE FROM classifications')
-    conn.commit()
+    """Clear the current user's history from the database."""
+    def clear(conn):
+        conn.execute('DELETE FROM classifications WHERE user_id = ?', (get_user_id(),))
+        conn.commit()
+    get_history_cache().write(get_user_id(), clear)
+
+@st.cache_resource(show_spinner=False)
+def get_similarity_index():
+    """Open the process-wide similarity index and index rows saved since the last sync."""
+    index = shared_index()
+    conn = init_db()
+    start_time = time.time()
+    added = sync_similarity_index(index, conn)
+    conn.close()
+    if added:
+        print(f"Similarity index: added {added} rows in {time.time() - start_time:.2f} seconds ({len(index)} total)")
+    return index
+
+def find_similar_classification(text, taxonomy=None):
+    """Return the labels of a near-identical stored case still valid in the `taxonomy` snapshot, or None.
+
+    A case saved under another taxonomy version is reused only if none of
+    its labels fall under a branch that changed since. The stored
+    explanation is not reused: it may quote the other case's text, which
+    can belong to another user. The new row gets its own explanation.
+    """
+    taxonomy = taxonomy or current_taxonomy()
+    index = get_similarity_index()
+    match = index.query(text, SIMILARITY_THRESHOLD)
+    if match is None:
+        return None
+    entry_id, similarity = match
+    row = get_db().execute('''
+        SELECT id, main_classification, sub_classification, case_type, taxonomy_version
+        FROM classifications WHERE id = ?
+    ''', (entry_id,)).fetchone()
+    if row is None:
+        return None
+    data = {'category': row[1], 'subcategory': row[2], 'type': row[3]}
+    if not labels_in_taxonomy(data, taxonomy.artifact):
+        return None
+    if not reloader.unaffected((row[1], row[2], row[3]), row[4], taxonomy):
+        print(f"Not reusing classification {entry_id}: its taxonomy branch changed since {row[4]}")
+        return None
+    print(f"Reusing classification {entry_id} (similarity {similarity:.2f}, reuse rate {index.reuse_rate:.1%})")
+    return {**data, 'id': entry_id, 'similarity': similarity}
+
+def profiling_requested():
+    """Admin toggle: profile this session when the URL carries the admin token."""
+    return bool(PROFILE_ADMIN_TOKEN) and st.query_params.get("profile") == PROFILE_ADMIN_TOKEN
 
 def get_user_id():
     """Get or create a unique user ID for the current session."""
@@ -128,49 +173,49 @@ def get_base64_logo(filename):
         return ""
 
 #------------------------------------------------------------------------------
-# Gemini Communication
+# Taxonomy
 #------------------------------------------------------------------------------
 
-def upload_to_gemini(path, mime_type=None):
-    """Uploads the given file to Gemini."""
-    try:
-        # Resolve the file path relative to the app directory
-        file_path = Path(__file__).parent / path
-        if not file_path.exists():
-            raise FileNotFoundError(f"File not found: {path}")
-
-        file = genai.upload_file(str(file_path), mime_type=mime_type)
-        print(f"Uploaded file '{file.display_name}' as: {file.uri}")
-        return file
-    except Exception as e:
-        st.error(f"Failed to upload file: {e}")
-        return None
+# The active version is swapped in by a background reload when Classes.txt
+# changes (see taxonomy_reload.py). A request takes one snapshot and uses it
+# throughout, so it finishes on the version it started with.
 
-def wait_for_files_active(files):
-    """Waits for the given files to be active."""
-    print("Waiting for file processing...")
-    try:
-        for file in files:
-            if file is None:
-                raise Exception("Invalid file object")
-
-            name = file.name
-            file = genai.get_file(name)
-            while file.state.name == "PROCESSING":
-                print(".", end="", flush=True)
-                time.sleep(10)
-                file = genai.get_file(name)
-            if file.state.name != "ACTIVE":
-                raise Exception(f"File {file.name} failed to process")
-        print("...all files ready")
-        print()
-    except Exception as e:
-        st.error(f"File processing failed: {e}")
-        return False
-    return True
+def current_taxonomy():
+    """The active taxonomy snapshot (artifact, version, schema paths, vocabulary)."""
+    return reloader.current()
+
+def load_taxonomy():
+    """The active memory-mapped taxonomy artifact."""
+    return current_taxonomy().artifact
 
-@st.cache_resource(ttl=datetime.timedelta(days=2), show_spinner=False)
-def initialize_gemini(key_id):
+def get_taxonomy_version():
+    return current_taxonomy().version
+
+def labels_in_taxonomy(data, taxonomy=None):
+    """Check that a response's category/subcategory/type exist in the taxonomy."""
+    taxonomy = taxonomy or load_taxonomy()
+    if data['type'] == 'لا يوجد':
+        return taxonomy.find(data['category'], data['subcategory']) is not None
+    return taxonomy.find(data['category'], data['subcategory'], data['type']) is not None
+
+#------------------------------------------------------------------------------
+# Gemini Communication
+#------------------------------------------------------------------------------
+
+@st.cache_resource(ttl=SESSION_TTL, show_spinner=False)
+def initialize_gemini(key_id, taxonomy_version, replica=0):
+    """Start a chat session for one API key on the uploaded taxonomy.
+
+    The upload is shared with the server warm-up (see warmup.py), and
+    `taxonomy_version` is part of both cache keys, so the file is only
+    re-uploaded when the taxonomy content actually changes (a hot reload
+    uploads it before the version becomes active). `replica` selects a
+    separate session on the same key (used for hedged calls). Sessions
+    expire after SESSION_TTL, before the file they point at is deleted;
+    a new one reuses the upload until it is due for renewal. The model is
+    bound to the key's own client, so sessions on different keys never
+    depend on the process-wide genai.configure.
+    """
     try:
         # Verify if the API key exists
         api_key = os.environ.get(f"GEMINI_API_KEY_{key_id}")
@@ -178,43 +223,19 @@ def initialize_gemini(key_id):
             st.error(f"API key {key_id} not found. Please check your configuration.")
             return None
 
-        genai.configure(api_key=api_key)
-
-        # Create the model
-        generation_config = {
-            "temperature": 0,
-            "top_p": 0.95,
-            "top_k": 40,
-            "max_output_tokens": 8192,
-            "response_mime_type": "application/json",
-        }
-
-        model = genai.GenerativeModel(
-            model_name="gemini-2.0-flash-exp",
-            generation_config=generation_config,
-            system_instruction=(
-                "according to the categories mentinoed. which category does the provided text fit in the most? "
-                "what is the most appropriate subcategory? and what is the most appropriate type? "
-                "you must use a category, subcategory, and type from the file only, choose from them what fits the case the most. "
-                "the output should be in arabic. make the a json object. "
-                "the keys are: category, subcategory, type, explanation. "
-                "if none of the types fit the case at all, return 'لا يوجد' for the type."
-            )
+        # Create the model (labels only when the explanation is generated separately),
+        # constrained to the taxonomy's valid label paths
+        model = create_model(
+            labels_only=EXPLANATION_MODE != "inline",
+            paths=reloader.snapshot(taxonomy_version).paths if RESPONSE_SCHEMA else None,
+            api_key=api_key
         )
 
-        # Upload and process the categories file
+        # Upload the categories file (or its compacted variant) unless warm-up already did
         files = [
-            upload_to_gemini(Path("Data") / "Classes.txt", mime_type="text/plain"),
+            taxonomy_file(key_id, taxonomy_version),
         ]
 
-        # Check if file upload was successful
-        if None in files:
-            raise Exception("Failed to upload required files")
-
-        # Wait for files to be processed
-        if not wait_for_files_active(files):
-            raise Exception("File processing failed")
-
         chat_session = model.start_chat(
             history=[
                 {
@@ -230,26 +251,671 @@ def initialize_gemini(key_id):
         st.error(f"Failed to initialize Gemini: {e}")
         return None
 
+@st.cache_resource(show_spinner=False)
+def get_hedger():
+    """Hedger seeded with the latencies of the latest model calls in history.db."""
+    conn = init_db()
+    samples = recent_durations(conn, HEDGE_WINDOW)
+    conn.close()
+    return Hedger(samples=samples)
+
+def get_chat_session(taxonomy_version):
+    """The chat of the session's key on a taxonomy version (created on first use after a reload)."""
+    return initialize_gemini(st.session_state.key_id, taxonomy_version)
+
+def stateless_chat(chat_session):
+    """A new chat holding only the taxonomy turn of a shared session.
+
+    Cached sessions are shared by every user, so calls whose text is not
+    the user's final input (speculation) must not add to their history.
+    """
+    return chat_session.model.start_chat(history=chat_session.history[:1])
+
+def get_backup_session(taxonomy_version):
+    """Session for hedged calls: another configured key, else a second session on the same key.
+
+    With a single key the backup only duplicates the call on the same quota;
+    it helps with a slow request, not with a throttled key.
+    """
+    other_keys = [key_id for key_id in configured_keys() if key_id != st.session_state.key_id]
+    key_id = other_keys[0] if other_keys else st.session_state.key_id
+    return initialize_gemini(key_id, taxonomy_version, replica=1)
+
+def send_to_gemini(user_input, taxonomy_version):
+    """Classify with the session's chat, hedged onto a backup session when enabled."""
+    chat_session = get_chat_session(taxonomy_version)
+    backup_session = get_backup_session(taxonomy_version) if HEDGING else None
+    if backup_session is None:
+        return parse_response(chat_session.send_message(user_input).text), "primary"
+    hedger = get_hedger()
+    # The caller holds one admission slot; the backup needs a free one of its own
+    data, winner = hedger.call(
+        lambda: parse_response(chat_session.send_message(user_input).text),
+        lambda: parse_response(backup_session.send_message(user_input).text),
+        is_valid=lambda data: data is not False,
+        acquire=admission.try_acquire,
+        release=admission.release
+    )
+    if winner == "backup":
+        print(f"Hedged call won: {hedger.stats()}")
+    return data, winner
+
+#------------------------------------------------------------------------------
+# Explanations
+#------------------------------------------------------------------------------
+# Outside 'inline' mode the classification returns labels only; the
+# explanation is a second call made after the labels are on screen.
+
+@st.cache_resource(show_spinner=False)
+def explanation_model(key_id):
+    return create_explanation_model(os.environ.get(f"GEMINI_API_KEY_{key_id}"))
+
+def get_explanation_model():
+    """The explanation model on the session's key."""
+    return explanation_model(st.session_state.key_id)
+
+@st.cache_resource(show_spinner=False)
+def get_explanation_executor():
+    """Threads generating explanations in 'background' mode."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="explanation")
+
+def label_descriptions(entry):
+    """Taxonomy descriptions of an entry's category, subcategory and type."""
+    labels = (entry["main_classification"], entry["sub_classification"], entry["case_type"])
+    taxonomy = reloader.snapshot(entry.get("taxonomy_version")).artifact
+    nodes = [taxonomy.find(*labels[:depth]) for depth in (1, 2, 3)]
+    return [node.description for node in nodes if node is not None]
+
+def entry_explanation_mode(entry):
+    """Reused labels come without an explanation; in 'inline' mode it is generated in the background."""
+    if EXPLANATION_MODE == "inline" and entry.get("reused_from"):
+        return "background"
+    return EXPLANATION_MODE
+
+def explain_entry(entry, descriptions, model, user_id, priority='interactive'):
+    """Generate the explanation of a saved classification and store it (thread-safe)."""
+    with admission.slot(user_id, priority):
+        start_time = time.time()
+        explanation = generate_explanation(
+            model,
+            entry.get("condensed_text") or entry["input"],
+            (entry["main_classification"], entry["sub_classification"], entry["case_type"]),
+            descriptions
+        )
+        duration = time.time() - start_time
+    print(f"Gemini explanation took {duration:.2f} seconds")
+    get_history_cache().write(user_id, save_explanation, entry["id"], explanation, duration)
+    return explanation
+
+def explanation_html(explanation):
+    return f"""
+        <div class="info-link-container">
+            <a href="#" class="info-link">
+                شرح اضافي
+                <span class="info-icon">i</span>
+            </a>
+            <div class="info-bubble">
+                {explanation}
+            </div>
+        </div>
+    """
+
+#------------------------------------------------------------------------------
+# PAGE FRAGMENTS
+#------------------------------------------------------------------------------
+# Each panel is a keyed fragment: widget callbacks rerun only the panels
+# they affect instead of the whole script (header, logos, CSS).
+
+def start_chat_session():
+    """Initialize Gemini with the session's key, falling back to the other keys."""
+    taxonomy_version = get_taxonomy_version()
+    initialization = initialize_gemini(st.session_state.key_id, taxonomy_version)
+    if initialization is None:
+        for i in range(1, NUM_KEYS + 1):
+            if i != st.session_state.key_id:
+                st.session_state.key_id = i
+                initialization = initialize_gemini(i, taxonomy_version)
+                if initialization is not None:
+                    break
+    return initialization
+
+@st.fragment(key="loading_state")
+def loading_state():
+    """Show the initialization message while the chat session is created."""
+    if "chat_session" in st.session_state:
+        return
+    placeholder = st.empty()
+    placeholder.markdown("""
+        <div class="loading-message">
+            <h3>يتم تهيئة النظام...</h3>
+        </div>
+    """, unsafe_allow_html=True)
+    st.session_state.loading = True
+
+    initialization = start_chat_session()
+    st.session_state.loading = False
+    if initialization is None:
+        placeholder.error("Failed to initialize the system. Please contact support.")
+        return
+
+    st.session_state.chat_session = initialization
+    placeholder.empty()
+
+def speculative_session():
+    if 'speculation' not in st.session_state:
+        st.session_state.speculation = speculator.session(get_user_id())
+    return st.session_state.speculation
+
+def handle_input_change():
+    """Start classifying a changed input in the background before the click (SPECULATION=1)."""
+    user_input = st.session_state.get("rtl_input", "")
+    if not (SPECULATION and "chat_session" in st.session_state and user_input.strip()) or st.session_state.case_submitted:
+        return
+    if SIMILARITY_REUSE and find_similar_classification(user_input):
+        return  # the click reuses a stored classification anyway
+    taxonomy = current_taxonomy()
+    chat_session = get_chat_session(taxonomy.version)
+    if chat_session is None:
+        return
+    model_input, _, _ = prepare_input(user_input, taxonomy.vocabulary)
+    def classify():
+        # Runs in a batch-priority admission slot (see speculation.py)
+        return taxonomy.version, parse_response(stateless_chat(chat_session).send_message(model_input).text)
+    speculative_session().schedule(result_key(model_input), classify)
+
+def handle_classify():
+    """Queue the current input for classification and refresh both panels."""
+    user_input = st.session_state.get("rtl_input", "")
+    if not (user_input and user_input.strip()):
+        return
+    st.session_state.pending_input = user_input
+    st.session_state.loading = True
+    st.session_state.current_results = None
+    st.session_state.overloaded = False
+    # Lock the input right away; the results panel does the classification
+    st.session_state.case_submitted = True
+    st.rerun(["input_panel", "results_panel"])
+
+def handle_new_case():
+    """Handle new case while preserving history."""
+    st.session_state.case_submitted = False
+    st.session_state.current_results = None
+    st.session_state.loading = False
+    st.session_state.overloaded = False
+    if SPECULATION:
+        speculative_session().cancel()
+    if "rtl_input" in st.session_state:
+        st.session_state.rtl_input = ""
+    st.session_state.history_page = 0
+    st.rerun(["input_panel", "results_panel"])
+
+@st.fragment(key="input_panel")
+def input_panel():
+    st.text_area(
+        label=" ",
+        height=300,
+        key="rtl_input",
+        placeholder="الرجاء إدخال النص هنا للتصنيف...",
+        disabled=st.session_state.case_submitted,
+        # Only with speculation: a text area callback turns the classify
+        # click's keyed st.rerun into a full-app rerun
+        on_change=handle_input_change if SPECULATION else None
+    )
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.button("⚖️ تصنيف الدعوى", type="primary", disabled=st.session_state.case_submitted, on_click=handle_classify)
+    with col2:
+        st.button("🔄 حالة جديدة", type="secondary", on_click=handle_new_case)
+
+def classify_pending_input(on_wait=None):
+    """Classify the queued input (reusing a near-identical case if possible) and save it.
+
+    Model calls go through the admission controller; `on_wait(position)` is
+    called while the request is queued, and Overloaded is raised if it is
+    rejected.
+    """
+    user_input = st.session_state.pending_input
+    taxonomy = current_taxonomy()
+    start_time = time.time()
+    data = find_similar_classification(user_input, taxonomy) if SIMILARITY_REUSE else None
+    reused_from = data['id'] if data else None
+    input_tokens, condensed_text, model_duration = None, None, None
+    if data:
+        duration = time.time() - start_time
+    else:
+        model_input, input_tokens, condensed = prepare_input(user_input, taxonomy.vocabulary)
+        if condensed:
+            condensed_text = model_input
+            print(f"Condensed input from ~{input_tokens} tokens to {len(model_input)} of {len(user_input)} chars")
+        data, winner = None, "speculative"
+        if SPECULATION:
+            # A result from before a taxonomy reload is kept if its branch is unchanged
+            claimed = speculative_session().claim(result_key(model_input), is_valid=lambda result: (
+                result[1] is not False and reloader.unaffected(
+                    (result[1]['category'], result[1]['subcategory'], result[1]['type']), result[0], taxonomy)
+            ))
+            data = claimed[1] if claimed else None
+        if data is None:
+            with admission.slot(get_user_id(), on_wait=on_wait):
+                print("Sending message to Gemini...")
+                call_start = time.time()
+                data, winner = send_to_gemini(model_input, taxonomy.version)
+                model_duration = time.time() - call_start
+        end_time = time.time()
+        duration = end_time - start_time
+        print(f"Gemini API response took {duration:.2f} seconds" + {"backup": " (hedged)", "speculative": " (speculative)"}.get(winner, ""))
+        if data and not labels_in_taxonomy(data, taxonomy.artifact):
+            print(f"Response labels not found in taxonomy: {data}")
+
+    if data == False:
+        m_calss_example = "-"
+        s_calss_example = "-"
+        case_type_example = "-"
+        explanation = "-"
+    else:
+        m_calss_example = data['category']
+        s_calss_example = data['subcategory']
+        case_type_example = data['type']
+        # Left empty for a separate call outside 'inline' mode, and for reused labels
+        explanation = data.get('explanation', '-' if EXPLANATION_MODE == "inline" and not reused_from else None)
+
+    # Save new entry to database
+    new_entry = {
+        "id": str(uuid.uuid4()),
+        "input": user_input,
+        "main_classification": m_calss_example,
+        "sub_classification": s_calss_example,
+        "case_type": case_type_example,
+        "explanation": explanation,
+        "duration": f"{duration:.2f}",
+        "taxonomy_version": taxonomy.version,
+        "reused_from": reused_from,
+        "input_tokens": input_tokens,
+        "condensed_text": condensed_text,
+        # The model call alone (no queueing, no speculative hit); seeds the hedger
+        "model_duration": f"{model_duration:.2f}" if model_duration is not None else None
+    }
+
+    rowid = save_to_db(new_entry)
+    if data and not reused_from and SIMILARITY_REUSE:
+        get_similarity_index().add(new_entry["id"], user_input, last_rowid=rowid)
+    if data and explanation is None and entry_explanation_mode(new_entry) == "background":
+        future = get_explanation_executor().submit(
+            explain_entry, dict(new_entry), label_descriptions(new_entry), get_explanation_model(),
+            get_user_id(), 'batch'
+        )
+        st.session_state.explanation_future = (new_entry["id"], future)
+    return new_entry
+
+def wait_for_explanation(entry):
+    """Fill in a background explanation when it arrives; the labels are already shown."""
+    pending = st.session_state.get("explanation_future")
+    if not pending or pending[0] != entry["id"]:
+        return
+    placeholder = st.empty()
+    placeholder.markdown('<div class="info-link-container"><span class="info-link">جاري إعداد الشرح...</span></div>', unsafe_allow_html=True)
+    try:
+        entry["explanation"] = pending[1].result()
+    except Exception as e:
+        print(f"Explanation failed: {e}")
+        placeholder.empty()
+        return
+    placeholder.markdown(explanation_html(entry["explanation"]), unsafe_allow_html=True)
+
+@st.fragment(key="explanation_panel")
+def explanation_panel():
+    """'on_demand' mode: generate the explanation only when the user asks for it."""
+    entry = st.session_state.current_results
+    if not entry["explanation"]:
+        slot = st.empty()
+        if not slot.button("💡 شرح اضافي", key="explain", type="secondary"):
+            return
+        slot.empty()
+        with st.spinner(''):
+            try:
+                entry["explanation"] = explain_entry(entry, label_descriptions(entry), get_explanation_model(), get_user_id())
+            except Exception as e:
+                print(f"Explanation failed: {e}")
+                st.error("تعذر إعداد الشرح، حاول مرة أخرى")
+                return
+    st.markdown(explanation_html(entry["explanation"]), unsafe_allow_html=True)
+
+@st.fragment(key="results_panel")
+def results_panel():
+    st.markdown('<div class="content-section">', unsafe_allow_html=True)
+
+    if st.session_state.loading:
+        # Shown only while this run classifies; the results replace it below
+        placeholder = st.empty()
+        with placeholder.container():
+            st.markdown("<h2>⚡ نتائج التصنيف</h2>", unsafe_allow_html=True)
+            st.markdown("""
+                <div class="custom-spinner-container">
+                    <div class="custom-spinner"></div>
+                    <div class="spinner-text">جاري تحليل وتصنيف الدعوى...</div>
+                </div>
+            """, unsafe_allow_html=True)
+            queue_status = st.empty()
+            def show_queue_position(position):
+                queue_status.markdown(f'<div class="spinner-text">في قائمة الانتظار: ترتيبك {position}</div>', unsafe_allow_html=True)
+            with st.spinner(''):
+                with profile("classification", force=profiling_requested()):
+                    try:
+                        st.session_state.current_results = classify_pending_input(on_wait=show_queue_position)
+                    except Overloaded as e:
+                        print(f"Classification rejected: {e}; {admission.stats()}")
+                        st.session_state.overloaded = True
+        placeholder.empty()
+        st.session_state.case_submitted = True
+        st.session_state.loading = False
+
+    if st.session_state.get("overloaded"):
+        st.error("الخدمة مشغولة حاليا بسبب كثرة الطلبات، يرجى المحاولة بعد قليل")
+        st.button("🔁 إعادة المحاولة", key="retry", type="secondary", on_click=handle_classify)
+
+    if st.session_state.current_results:
+        # Kept on one line: a blank line would end the HTML block in markdown
+        reuse_badge = '<span>♻️ مطابقة لدعوى سابقة</span>' if st.session_state.current_results.get("reused_from") else ''
+        st.markdown(f"""
+            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 1rem;">
+                <h2 style="margin: 0;">⚡ نتائج التصنيف</h2>
+                <div style="display: flex; align-items: center; gap: 0.75rem; color: #666; font-size: 0.9em;">
+                    {reuse_badge}<span>⏱️ {st.session_state.current_results.get("duration", "-")} ثانية</span>
+                </div>
+            </div>
+        """, unsafe_allow_html=True)
+
+        latest_entry = st.session_state.current_results
+        st.markdown(f"""
+            <div class="classification-item main-classification">
+                <div class="classification-label">
+                    <span class="classification-icon">📊</span>
+                    التصنيف الرئيسي
+                </div>
+                <div class="classification-value">{latest_entry["main_classification"]}</div>
+            </div>
+        """, unsafe_allow_html=True)
+
+        st.markdown(f"""
+            <div class="classification-item sub-classification">
+                <div class="classification-label">
+                    <span class="classification-icon">🔍</span>
+                    التصنيف الفرعي
+                </div>
+                <div class="classification-value">{latest_entry["sub_classification"]}</div>
+            </div>
+        """, unsafe_allow_html=True)
+
+        st.markdown(f"""
+            <div class="classification-item case-type">
+                <div class="classification-label">
+                    <span class="classification-icon">⚖️</span>
+                    نوع الدعوى
+                </div>
+                <div class="classification-value">{latest_entry["case_type"]}</div>
+            </div>
+        """, unsafe_allow_html=True)
+
+        if latest_entry["explanation"]:
+            st.markdown(explanation_html(latest_entry["explanation"]), unsafe_allow_html=True)
+        elif latest_entry["main_classification"] != "-":
+            if entry_explanation_mode(latest_entry) == "on_demand":
+                explanation_panel()
+            elif entry_explanation_mode(latest_entry) == "background":
+                wait_for_explanation(latest_entry)
+
+    else:
+        st.markdown("<h2>⚡ نتائج التصنيف</h2>", unsafe_allow_html=True)
+        st.markdown("""
+            <div class="results-card empty-results-card">
+                <img src="https://img.icons8.com/fluency/96/000000/search.png">
+                <h3>أدخل نص الدعوى للحصول على التصنيف</h3>
+            </div>
+        """, unsafe_allow_html=True)
+
+#------------------------------------------------------------------------------
+# HISTORY
+#------------------------------------------------------------------------------
+# Shown with HISTORY_VIEW=1. A session keeps only its page number; the rows
+# come from the process-wide HistoryCache shared by all sessions.
+
+def change_history_page(step):
+    st.session_state.history_page = max(0, st.session_state.history_page + step)
+
+def history_pager():
+    """Previous/next buttons over the user's history pages."""
+    pages = get_history_cache().page_count(get_user_id())
+    page = min(st.session_state.history_page, pages - 1)
+    st.session_state.history_page = page
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        st.button("→ السابق", disabled=page == 0, on_click=change_history_page, args=(-1,), width="stretch")
+    with col_page:
+        st.markdown(f'<div class="info-message">صفحة {page + 1} من {pages}</div>', unsafe_allow_html=True)
+    with col_next:
+        st.button("التالي ←", disabled=page >= pages - 1, on_click=change_history_page, args=(1,), width="stretch")
+
+def history_section():
+    st.markdown("""
+        <div class="history-title">
+            <h2>📜 سجل التصنيفات</h2>
+        </div>
+    """, unsafe_allow_html=True)
+
+    # Download functionality (the current page)
+    history = list(get_history())
+    if history:
+        import io
+        import openpyxl
+        import pandas as pd
+
+        # Convert history to DataFrame for display
+        df_display = pd.DataFrame(history)
+        df_display = df_display[['case_type', 'sub_classification', 'main_classification', 'input_text', 'explanation']]
+        df_display.columns = ['نوع الدعوى', 'التصنيف الفرعي', 'التصنيف الرئيسي', 'نص الدعوى', 'شرح']
+
+        # Create a different DataFrame for download with original order
+        df_download = pd.DataFrame(history)
+        df_download = df_download[['input_text', 'main_classification', 'sub_classification', 'case_type', 'explanation']]
+        df_download.columns = ['نص الدعوى', 'التصنيف الرئيسي', 'التصنيف الفرعي', 'نوع الدعوى', 'شرح']
+
+        # Create Excel file in memory
+        output = io.BytesIO()
+        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+            df_download.to_excel(writer, index=False, sheet_name='Sheet1')
+
+            worksheet = writer.sheets['Sheet1']
+            worksheet.sheet_view.rightToLeft = True
+
+            for column in worksheet.columns:
+                max_length = 0
+                column = [cell for cell in column]
+                for cell in column:
+                    try:
+                        if len(str(cell.value)) > max_length:
+                            max_length = len(str(cell.value))
+                    except:
+                        pass
+                adjusted_width = (max_length + 2)
+                worksheet.column_dimensions[column[0].column_letter].width = adjusted_width
+
+            for row in worksheet.rows:
+                for cell in row:
+                    cell.font = openpyxl.styles.Font(name='Arial', size=11)
+                    cell.alignment = openpyxl.styles.Alignment(horizontal='right', vertical='center', wrap_text=True)
+
+        excel_data = output.getvalue()
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.download_button(
+                label="⬇️ تحميل سجل التصنيفات (Excel)",
+                data=excel_data,
+                file_name="history.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                use_container_width=True
+            )
+
+        with col2:
+            # Convert history to JSON for download
+            json_str = json.dumps(history, ensure_ascii=False, indent=2)
+            st.download_button(
+                label="⬇️ تحميل سجل التصنيفات (JSON)",
+                data=json_str,
+                file_name="export.json",
+                mime="application/json",
+                use_container_width=True
+            )
+
+        history_pager()
+
+        tab1, tab2 = st.tabs(["🗂️ عرض تفصيلي", "📊 عرض جدولي"])
+
+        with tab1:
+            notification_icon = "✅"
+
+            for i in range(len(history)):
+                if f"item_visible_{i}" not in st.session_state:
+                    st.session_state[f"item_visible_{i}"] = True
+
+            def handle_delete(entry_id):
+                delete_from_db(entry_id)
+                st.toast("تم حذف العنصر بنجاح", icon=notification_icon)
+                st.session_state.deletion_triggered = True
+
+            visible_count = 0
+            for i, entry in enumerate(history[:5]):  # Show only last 5 entries
+                if visible_count > 0:
+                    st.markdown("""
+                        <div class="custom-divider">
+                            <span>•••</span>
+                        </div>
+                    """, unsafe_allow_html=True)
+                visible_count += 1
+
+                with st.container():
+                    st.markdown('<div class="flex-95-5">', unsafe_allow_html=True)
+                    col_content, col_delete = st.columns([0.95, 0.05])
+
+                    with col_content:
+                        st.markdown(f"""
+                        <div class="case-text">
+                            <strong>البحث:</strong> {entry["input_text"]}
+                        </div>
+                        """,
+                        unsafe_allow_html=True)
+
+                        if entry["explanation"]:
+                            st.markdown(f"""
+                                <div class="info-link-container">
+                                    <a href="#" class="info-link">
+                                        شرح اضافي
+                                        <span class="info-icon">i</span>
+                                    </a>
+                                    <div class="info-bubble">
+                                        {entry["explanation"]}
+                                    </div>
+                                </div>
+                            """, unsafe_allow_html=True)
+
+                    with col_delete:
+                        st.markdown('<div class="delete-button-wrapper">', unsafe_allow_html=True)
+                        if st.button("🗑️", key=f"delete_{entry['id']}", on_click=handle_delete, args=(entry['id'],)):
+                            pass
+                        st.markdown('</div>', unsafe_allow_html=True)
+                    st.markdown('</div>', unsafe_allow_html=True)
+
+                    st.markdown(f"""
+                        <div class="classification-item main-classification">
+                            <div class="classification-label">
+                                <span class="classification-icon">📊</span>
+                                التصنيف الرئيسي
+                            </div>
+                            <div class="classification-value">{entry["main_classification"]}</div>
+                        </div>
+                    """, unsafe_allow_html=True)
+
+                    st.markdown(f"""
+                        <div class="classification-item sub-classification">
+                            <div class="classification-label">
+                                <span class="classification-icon">🔍</span>
+                                التصنيف الفرعي
+                            </div>
+                            <div class="classification-value">{entry["sub_classification"]}</div>
+                        </div>
+                    """, unsafe_allow_html=True)
+
+                    st.markdown(f"""
+                        <div class="classification-item case-type">
+                            <div class="classification-label">
+                                <span class="classification-icon">⚖️</span>
+                                نوع الدعوى
+                            </div>
+                            <div class="classification-value">{entry["case_type"]}</div>
+                        </div>
+                    """, unsafe_allow_html=True)
+
+                    st.markdown(f"""
+                        <div class="classification-item response-time">
+                            <div class="classification-label">
+                                <span class="classification-icon">⏱️</span>
+                                زمن الاستجابة
+                            </div>
+                            <div class="classification-value">{entry.get("duration", "-")} ثانية</div>
+                        </div>
+                    """, unsafe_allow_html=True)
+
+            def handle_clear_all():
+                if not st.session_state.get('clear_triggered'):
+                    clear_history_db()
+                    st.toast("تم مسح السجل بالكامل", icon=notification_icon)
+                    st.session_state.clear_triggered = True
+                    st.session_state.deletion_triggered = True
+
+            st.markdown('<div class="clear-all-button-container">', unsafe_allow_html=True)
+            if st.button("مسح السجل بالكامل", type="secondary", on_click=handle_clear_all):
+                pass
+            st.markdown('</div>', unsafe_allow_html=True)
+
+        with tab2:
+            if st.session_state.deletion_triggered:
+                st.session_state.deletion_triggered = False
+                st.rerun()
+
+            st.markdown("""
+                <style>
+                    .stDataFrame {
+                        font-family: 'Noto Kufi Arabic', sans-serif;
+                    }
+                    .stDataFrame td, .stDataFrame th {
+                        text-align: right !important;
+                        direction: rtl !important;
+                    }
+                </style>
+            """, unsafe_allow_html=True)
+            st.dataframe(
+                df_display,
+                use_container_width=True,
+                hide_index=True
+            )
+
+    else:
+        st.markdown('<div class="info-message">لا يوجد سجل تصنيفات سابقة</div>', unsafe_allow_html=True)
+
 #------------------------------------------------------------------------------
 # MAIN APPLICATION
 #------------------------------------------------------------------------------
 def main():
-    # Initialize history from database at startup
-    if 'history' not in st.session_state:
-        st.session_state.history = load_history_from_db()
+    # Sessions only keep a page reference into the shared history cache
+    if 'history_page' not in st.session_state:
+        st.session_state.history_page = 0
     
     # Add deletion tracking to session state initialization
     if "deletion_triggered" not in st.session_state:
         st.session_state.deletion_triggered = False
     
-    # Event-based history updates
-    if "history_needs_refresh" not in st.session_state:
-        st.session_state.history_needs_refresh = False
-    
-    if st.session_state.history_needs_refresh:
-        st.session_state.history = load_history_from_db()
-        st.session_state.history_needs_refresh = False
-
     # Add new session state for delete operations
     if "delete_triggered" not in st.session_state:
         st.session_state.delete_triggered = False
@@ -309,391 +975,18 @@ def main():
     with col_input:
         st.markdown('<div class="content-section">', unsafe_allow_html=True)
         st.markdown("## 📝 نص الدعوى ")
-
-        if "chat_session" in st.session_state:
-            user_input = st.text_area(
-                label=" ",
-                height=300,
-                key="rtl_input",
-                placeholder="الرجاء إدخال النص هنا للتصنيف...",
-                disabled=st.session_state.case_submitted
-            )
-        else:
-            st.markdown("""
-                <div class="loading-message">
-                    <h3>يتم تهيئة النظام...</h3>
-                </div>
-            """, unsafe_allow_html=True)
-            st.session_state.loading = True
-
-            # Try to initialize with current key
-            initialization = initialize_gemini(st.session_state.key_id)
-
-            # If initialization fails, try other keys
-            if initialization is None:
-                for i in range(1, NUM_KEYS + 1):
-                    if i != st.session_state.key_id:
-                        st.session_state.key_id = i
-                        initialization = initialize_gemini(i)
-                        if initialization is not None:
-                            break
-
-                if initialization is None:
-                    st.error("Failed to initialize the system. Please contact support.")
-                    st.session_state.loading = False
-                    return
-
-            st.session_state.chat_session = initialization
-            st.session_state.loading = False
-            st.rerun()
-
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("⚖️ تصنيف الدعوى", type="primary", disabled=st.session_state.case_submitted):
-                if user_input and user_input.strip():
-                    st.session_state.loading = True
-                    st.session_state.current_results = None
-
-        with col2:
-            def handle_new_case():
-                """Handle new case while preserving history."""
-                st.session_state.case_submitted = False
-                st.session_state.current_results = None
-                st.session_state.loading = False
-                if "rtl_input" in st.session_state:
-                    st.session_state.rtl_input = ""
-                st.session_state.history = load_history_from_db()
-
-            if st.button("🔄 حالة جديدة", type="secondary", on_click=handle_new_case):
-                pass
+        loading_state()
+        if "chat_session" not in st.session_state:
+            return
+        input_panel()
 
     # Results section
     with col_results:
-        st.markdown('<div class="content-section">', unsafe_allow_html=True)
-        
-        if st.session_state.current_results:
-            st.markdown(f"""
-                <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 1rem;">
-                    <h2 style="margin: 0;">⚡ نتائج التصنيف</h2>
-                    <div style="display: flex; align-items: center; color: #666; font-size: 0.9em;">
-                        <span>⏱️ {st.session_state.current_results.get("duration", "-")} ثانية</span>
-                    </div>
-                </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown("<h2>⚡ نتائج التصنيف</h2>", unsafe_allow_html=True)
-
-        if st.session_state.loading:
-            st.markdown("""
-                <div class="custom-spinner-container">
-                    <div class="custom-spinner"></div>
-                    <div class="spinner-text">جاري تحليل وتصنيف الدعوى...</div>
-                </div>
-            """, unsafe_allow_html=True)
-
-            with st.spinner(''):
-                print("Sending message to Gemini...")
-                start_time = time.time()
-                response = st.session_state.chat_session.send_message(user_input)
-                end_time = time.time()
-                duration = end_time - start_time
-                print(f"Gemini API response took {duration:.2f} seconds")
-                try:
-                    data = json.loads(response.text)
-                    if isinstance(data, list) and len(data) > 0:
-                        data = data[0]
-                    if not isinstance(data, dict) or not all(key in data for key in ['category', 'subcategory', 'type']):
-                        print(f"Invalid response structure: {data}")
-                        data = False
-                except json.JSONDecodeError as e:
-                    print(f"Error decoding JSON: {e}")
-                    data = False
-
-            if data == False:
-                m_calss_example = "-"
-                s_calss_example = "-"
-                case_type_example = "-"
-                explanation = "-"
-            else:
-                m_calss_example = data['category']
-                s_calss_example = data['subcategory']
-                case_type_example = data['type']
-                explanation = data.get('explanation', '-')
-
-            # Save new entry to database
-            new_entry = {
-                "id": str(uuid.uuid4()),
-                "input": user_input,
-                "main_classification": m_calss_example,
-                "sub_classification": s_calss_example,
-                "case_type": case_type_example,
-                "explanation": explanation,
-                "duration": f"{duration:.2f}"
-            }
-
-            save_to_db(new_entry)
-            st.session_state.history = load_history_from_db()
-            st.session_state.current_results = new_entry
-            st.session_state.case_submitted = True
-            st.session_state.loading = False
-            st.rerun()
-
-        elif st.session_state.current_results:
-            latest_entry = st.session_state.current_results
-
-            st.markdown(f"""
-                <div class="classification-item main-classification">
-                    <div class="classification-label">
-                        <span class="classification-icon">📊</span>
-                        التصنيف الرئيسي
-                    </div>
-                    <div class="classification-value">{latest_entry["main_classification"]}</div>
-                </div>
-            """, unsafe_allow_html=True)
-
-            st.markdown(f"""
-                <div class="classification-item sub-classification">
-                    <div class="classification-label">
-                        <span class="classification-icon">🔍</span>
-                        التصنيف الفرعي
-                    </div>
-                    <div class="classification-value">{latest_entry["sub_classification"]}</div>
-                </div>
-            """, unsafe_allow_html=True)
-
-            st.markdown(f"""
-                <div class="classification-item case-type">
-                    <div class="classification-label">
-                        <span class="classification-icon">⚖️</span>
-                        نوع الدعوى
-                    </div>
-                    <div class="classification-value">{latest_entry["case_type"]}</div>
-                </div>
-            """, unsafe_allow_html=True)
-
-            if latest_entry["explanation"]:
-                st.markdown(f"""
-                    <div class="info-link-container">
-                        <a href="#" class="info-link">
-                            شرح اضافي
-                            <span class="info-icon">i</span>
-                        </a>
-                        <div class="info-bubble">
-                            {latest_entry["explanation"]}
-                        </div>
-                    </div>
-                """, unsafe_allow_html=True)
-
-        else:
-            st.markdown("""
-                <div class="results-card empty-results-card">
-                    <img src="https://img.icons8.com/fluency/96/000000/search.png">
-                    <h3>أدخل نص الدعوى للحصول على التصنيف</h3>
-                </div>
-            """, unsafe_allow_html=True)
+        results_panel()
 
-    # # History Section
-    # st.markdown("""
-    #     <div class="history-title">
-    #         <h2>📜 سجل التصنيفات</h2>
-    #     </div>
-    # """, unsafe_allow_html=True)
-
-    # # Download functionality
-    # if st.session_state.history:
-    #     # Convert history to DataFrame for display
-    #     df_display = pd.DataFrame(st.session_state.history)
-    #     df_display = df_display[['case_type', 'sub_classification', 'main_classification', 'input_text', 'explanation']]
-    #     df_display.columns = ['نوع الدعوى', 'التصنيف الفرعي', 'التصنيف الرئيسي', 'نص الدعوى', 'شرح']
-
-    #     # Create a different DataFrame for download with original order
-    #     df_download = pd.DataFrame(st.session_state.history)
-    #     df_download = df_download[['input_text', 'main_classification', 'sub_classification', 'case_type', 'explanation']]
-    #     df_download.columns = ['نص الدعوى', 'التصنيف الرئيسي', 'التصنيف الفرعي', 'نوع الدعوى', 'شرح']
-
-    #     # Create Excel file in memory
-    #     output = io.BytesIO()
-    #     with pd.ExcelWriter(output, engine='openpyxl') as writer:
-    #         df_download.to_excel(writer, index=False, sheet_name='Sheet1')
-
-    #         worksheet = writer.sheets['Sheet1']
-    #         worksheet.sheet_view.rightToLeft = True
-
-    #         for column in worksheet.columns:
-    #             max_length = 0
-    #             column = [cell for cell in column]
-    #             for cell in column:
-    #                 try:
-    #                     if len(str(cell.value)) > max_length:
-    #                         max_length = len(str(cell.value))
-    #                 except:
-    #                     pass
-    #             adjusted_width = (max_length + 2)
-    #             worksheet.column_dimensions[column[0].column_letter].width = adjusted_width
-
-    #         for row in worksheet.rows:
-    #             for cell in row:
-    #                 cell.font = openpyxl.styles.Font(name='Arial', size=11)
-    #                 cell.alignment = openpyxl.styles.Alignment(horizontal='right', vertical='center', wrap_text=True)
-
-    #     excel_data = output.getvalue()
-
-    #     col1, col2 = st.columns(2)
-
-    #     with col1:
-    #         st.download_button(
-    #             label="⬇️ تحميل سجل التصنيفات (Excel)",
-    #             data=excel_data,
-    #             file_name="history.xlsx",
-    #             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    #             use_container_width=True
-    #         )
-
-    #     with col2:
-    #         # Convert history to JSON for download
-    #         json_str = json.dumps(st.session_state.history, ensure_ascii=False, indent=2)
-    #         st.download_button(
-    #             label="⬇️ تحميل سجل التصنيفات (JSON)",
-    #             data=json_str,
-    #             file_name="export.json",
-    #             mime="application/json",
-    #             use_container_width=True
-    #         )
-
-    #     tab1, tab2 = st.tabs(["🗂️ عرض تفصيلي", "📊 عرض جدولي"])
-
-    #     with tab1:
-    #         notification_icon = "✅"
-
-    #         for i in range(len(st.session_state.history)):
-    #             if f"item_visible_{i}" not in st.session_state:
-    #                 st.session_state[f"item_visible_{i}"] = True
-
-    #         def handle_delete(entry_id):
-    #             delete_from_db(entry_id)
-    #             st.session_state.history = load_history_from_db()
-    #             st.toast("تم حذف العنصر بنجاح", icon=notification_icon)
-    #             st.session_state.deletion_triggered = True
-
-    #         visible_count = 0
-    #         for i, entry in enumerate(st.session_state.history[:5]):  # Show only last 5 entries
-    #             if visible_count > 0:
-    #                 st.markdown("""
-    #                     <div class="custom-divider">
-    #                         <span>•••</span>
-    #                     </div>
-    #                 """, unsafe_allow_html=True)
-    #             visible_count += 1
-
-    #             with st.container():
-    #                 st.markdown('<div class="flex-95-5">', unsafe_allow_html=True)
-    #                 col_content, col_delete = st.columns([0.95, 0.05])
-
-    #                 with col_content:
-    #                     st.markdown(f"""
-    #                     <div class="case-text">
-    #                         <strong>البحث:</strong> {entry["input_text"]}
-    #                     </div>
-    #                     """,
-    #                     unsafe_allow_html=True)
-
-    #                     if entry["explanation"]:
-    #                         st.markdown(f"""
-    #                             <div class="info-link-container">
-    #                                 <a href="#" class="info-link">
-    #                                     شرح اضافي
-    #                                     <span class="info-icon">i</span>
-    #                                 </a>
-    #                                 <div class="info-bubble">
-    #                                     {entry["explanation"]}
-    #                                 </div>
-    #                             </div>
-    #                         """, unsafe_allow_html=True)
-
-    #                 with col_delete:
-    #                     st.markdown('<div class="delete-button-wrapper">', unsafe_allow_html=True)
-    #                     if st.button("🗑️", key=f"delete_{entry['id']}", on_click=handle_delete, args=(entry['id'],)):
-    #                         pass
-    #                     st.markdown('</div>', unsafe_allow_html=True)
-    #                 st.markdown('</div>', unsafe_allow_html=True)
-
-    #                 st.markdown(f"""
-    #                     <div class="classification-item main-classification">
-    #                         <div class="classification-label">
-    #                             <span class="classification-icon">📊</span>
-    #                             التصنيف الرئيسي
-    #                         </div>
-    #                         <div class="classification-value">{entry["main_classification"]}</div>
-    #                     </div>
-    #                 """, unsafe_allow_html=True)
-
-    #                 st.markdown(f"""
-    #                     <div class="classification-item sub-classification">
-    #                         <div class="classification-label">
-    #                             <span class="classification-icon">🔍</span>
-    #                             التصنيف الفرعي
-    #                         </div>
-    #                         <div class="classification-value">{entry["sub_classification"]}</div>
-    #                     </div>
-    #                 """, unsafe_allow_html=True)
-
-    #                 st.markdown(f"""
-    #                     <div class="classification-item case-type">
-    #                         <div class="classification-label">
-    #                             <span class="classification-icon">⚖️</span>
-    #                             نوع الدعوى
-    #                         </div>
-    #                         <div class="classification-value">{entry["case_type"]}</div>
-    #                     </div>
-    #                 """, unsafe_allow_html=True)
-
-    #                 st.markdown(f"""
-    #                     <div class="classification-item response-time">
-    #                         <div class="classification-label">
-    #                             <span class="classification-icon">⏱️</span>
-    #                             زمن الاستجابة
-    #                         </div>
-    #                         <div class="classification-value">{entry.get("duration", "-")} ثانية</div>
-    #                     </div>
-    #                 """, unsafe_allow_html=True)
-
-    #         def handle_clear_all():
-    #             if not st.session_state.get('clear_triggered'):
-    #                 clear_history_db()
-    #                 st.session_state.history = []
-    #                 st.toast("تم مسح السجل بالكامل", icon=notification_icon)
-    #                 st.session_state.clear_triggered = True
-    #                 st.session_state.deletion_triggered = True
-
-    #         st.markdown('<div class="clear-all-button-container">', unsafe_allow_html=True)
-    #         if st.button("مسح السجل بالكامل", type="secondary", on_click=handle_clear_all):
-    #             pass
-    #         st.markdown('</div>', unsafe_allow_html=True)
-
-    #     with tab2:
-    #         if st.session_state.deletion_triggered:
-    #             st.session_state.deletion_triggered = False
-    #             st.rerun()
-                
-    #         st.markdown("""
-    #             <style>
-    #                 .stDataFrame {
-    #                     font-family: 'Noto Kufi Arabic', sans-serif;
-    #                 }
-    #                 .stDataFrame td, .stDataFrame th {
-    #                     text-align: right !important;
-    #                     direction: rtl !important;
-    #                 }
-    #             </style>
-    #         """, unsafe_allow_html=True)
-    #         st.dataframe(
-    #             df_display,
-    #             use_container_width=True,
-    #             hide_index=True
-    #         )
-
-    # else:
-    #     st.markdown('<div class="info-message">لا يوجد سجل تصنيفات سابقة</div>', unsafe_allow_html=True)
+    if HISTORY_VIEW:
+        history_section()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with profile("script_run", force=profiling_requested()):
+        main()
\ No newline at end of file
@@ -0,0 +1,297 @@
+"""Gemini model configuration and response parsing shared by the app and tools.
+
+google.generativeai takes close to a second to import, so it is imported
+inside the functions that call it rather than with this module.
+"""
+import json
+import os
+import threading
+import time
+
+from taxonomy_versions import PATH_SEPARATOR
+
+# API keys are read from GEMINI_API_KEY_1 .. GEMINI_API_KEY_<NUM_KEYS>
+NUM_KEYS = 1
+
+# Taxonomy prompt variant to upload (see taxonomy_compaction.VARIANTS)
+PROMPT_VARIANT = os.environ.get("TAXONOMY_PROMPT_VARIANT", "full")
+
+# When the explanation is generated:
+#   inline      in the classification response (one call, slowest labels)
+#   background  by a second call started as soon as the labels are shown
+#   on_demand   by a second call when the user asks for it
+EXPLANATION_MODES = ('inline', 'background', 'on_demand')
+EXPLANATION_MODE = os.environ.get("EXPLANATION_MODE", "inline")
+
+# Constrain classification responses with a schema whose required 'path'
+# field is an enum of the taxonomy's valid category/subcategory/type paths
+RESPONSE_SCHEMA = os.environ.get("RESPONSE_SCHEMA", "1") == "1"
+
+# Secondary option: one optional field per category instead, each an enum of
+# that category's subcategory/type paths. Smaller enums, but an empty object
+# or several category fields still match the schema (the SDK has no anyOf)
+SCHEMA_BY_CATEGORY = os.environ.get("SCHEMA_BY_CATEGORY", "0") == "1"
+
+MODEL_NAME = "gemini-2.0-flash-exp"
+
+GENERATION_CONFIG = {
+    "temperature": 0,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 8192,
+    "response_mime_type": "application/json",
+}
+
+SYSTEM_INSTRUCTION = (
+    "according to the categories mentinoed. which category does the provided text fit in the most? "
+    "what is the most appropriate subcategory? and what is the most appropriate type? "
+    "you must use a category, subcategory, and type from the file only, choose from them what fits the case the most. "
+    "the output should be in arabic. make the a json object. "
+    "the keys are: category, subcategory, type, explanation. "
+    "if none of the types fit the case at all, return 'لا يوجد' for the type."
+)
+
+# Labels-only classification: three short strings fit well within this limit
+LABELS_GENERATION_CONFIG = {**GENERATION_CONFIG, "max_output_tokens": 256}
+
+LABELS_SYSTEM_INSTRUCTION = (
+    "according to the categories mentinoed. which category does the provided text fit in the most? "
+    "what is the most appropriate subcategory? and what is the most appropriate type? "
+    "you must use a category, subcategory, and type from the file only, choose from them what fits the case the most. "
+    "the output should be in arabic. make the a json object. "
+    "the keys are: category, subcategory, type. do not add an explanation. "
+    "if none of the types fit the case at all, return 'لا يوجد' for the type."
+)
+
+# With a response schema, the three labels come back as one enum value
+SCHEMA_SYSTEM_INSTRUCTION = (
+    "according to the categories mentinoed. which category does the provided text fit in the most? "
+    "what is the most appropriate subcategory? and what is the most appropriate type? "
+    "the keys are: path, explanation. the path is the category, subcategory and type joined by ' > ', "
+    "choose the path that fits the case the most. the explanation should be in arabic. "
+    "if none of the types fit the case at all, use the path ending with 'لا يوجد'."
+)
+
+SCHEMA_LABELS_SYSTEM_INSTRUCTION = (
+    "according to the categories mentinoed. which category does the provided text fit in the most? "
+    "what is the most appropriate subcategory? and what is the most appropriate type? "
+    "the key is: path. the path is the category, subcategory and type joined by ' > ', "
+    "choose the path that fits the case the most. do not add an explanation. "
+    "if none of the types fit the case at all, use the path ending with 'لا يوجد'."
+)
+
+# With SCHEMA_BY_CATEGORY, the category is the key of the only label field
+CATEGORY_SCHEMA_SYSTEM_INSTRUCTION = (
+    "according to the categories mentinoed. which category does the provided text fit in the most? "
+    "what is the most appropriate subcategory? and what is the most appropriate type? "
+    "the keys are: explanation and the name of the category that fits the case the most. "
+    "use only one category key. its value is the subcategory and type joined by ' > '. "
+    "the explanation should be in arabic. "
+    "if none of the types fit the case at all, use the value ending with 'لا يوجد'."
+)
+
+CATEGORY_SCHEMA_LABELS_SYSTEM_INSTRUCTION = (
+    "according to the categories mentinoed. which category does the provided text fit in the most? "
+    "what is the most appropriate subcategory? and what is the most appropriate type? "
+    "the key is the name of the category that fits the case the most. "
+    "use only one category key. its value is the subcategory and type joined by ' > '. "
+    "do not add an explanation. "
+    "if none of the types fit the case at all, use the value ending with 'لا يوجد'."
+)
+
+EXPLANATION_GENERATION_CONFIG = {
+    "temperature": 0,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 1024,
+    "response_mime_type": "text/plain",
+}
+
+EXPLANATION_INSTRUCTION = (
+    "a court case text was classified into the given category, subcategory and type. "
+    "explain briefly in arabic why the case fits this classification, using the given descriptions. "
+    "answer with the explanation text only."
+)
+
+RESPONSE_KEYS = ('category', 'subcategory', 'type')
+
+# Type label used when no type of the subcategory fits
+NO_TYPE = 'لا يوجد'
+
+
+def taxonomy_paths(artifact):
+    """Every valid 'category > subcategory > type' path of a TaxonomyArtifact.
+
+    As in the app's validation, every subcategory also allows the NO_TYPE type.
+    """
+    paths = []
+    for category in artifact.categories():
+        for subcategory in category.children:
+            prefix = PATH_SEPARATOR.join((category.name, subcategory.name))
+            paths.extend(PATH_SEPARATOR.join((prefix, case_type.name)) for case_type in subcategory.children)
+            paths.append(PATH_SEPARATOR.join((prefix, NO_TYPE)))
+    return list(dict.fromkeys(paths))
+
+
+def response_schema(paths, with_explanation=True, by_category=False):
+    """JSON schema allowing only the given paths (and optionally an explanation).
+
+    By default a required 'path' field is an enum of every full path, so
+    any response that matches the schema is a valid path. By category,
+    every category is an optional field whose enum holds only that
+    category's 'subcategory > type' paths, and the chosen field's name is
+    the category. The SDK's schema has no anyOf, so "exactly one category
+    field" cannot be required; parse_response rejects the other cases.
+    """
+    if by_category:
+        properties = {}
+        for path in paths:
+            category, _, rest = path.partition(PATH_SEPARATOR)
+            properties.setdefault(category, {"type": "STRING", "format": "enum", "enum": []})["enum"].append(rest)
+        required = []
+    else:
+        properties = {"path": {"type": "STRING", "format": "enum", "enum": paths}}
+        required = ["path"]
+    if with_explanation:
+        properties["explanation"] = {"type": "STRING"}
+        required.append("explanation")
+    return {"type": "OBJECT", "properties": properties, "required": required}
+
+
+def create_model(labels_only=False, paths=None, by_category=SCHEMA_BY_CATEGORY, api_key=None):
+    """Create the classification model.
+
+    With `labels_only` the response has no explanation and a small output limit.
+    With `paths` (see taxonomy_paths) the response is constrained to one of them.
+    With `api_key` the model calls go through that key's client (see
+    api_client); otherwise genai must already be configured.
+    """
+    import google.generativeai as genai
+    generation_config = LABELS_GENERATION_CONFIG if labels_only else GENERATION_CONFIG
+    if paths:
+        schema = response_schema(paths, not labels_only, by_category)
+        generation_config = {**generation_config, "response_schema": schema}
+        if by_category:
+            system_instruction = (CATEGORY_SCHEMA_LABELS_SYSTEM_INSTRUCTION if labels_only
+                                  else CATEGORY_SCHEMA_SYSTEM_INSTRUCTION)
+        else:
+            system_instruction = SCHEMA_LABELS_SYSTEM_INSTRUCTION if labels_only else SCHEMA_SYSTEM_INSTRUCTION
+    else:
+        system_instruction = LABELS_SYSTEM_INSTRUCTION if labels_only else SYSTEM_INSTRUCTION
+    model = genai.GenerativeModel(
+        model_name=MODEL_NAME,
+        generation_config=generation_config,
+        system_instruction=system_instruction,
+    )
+    return bind_model(model, api_key)
+
+
+def create_explanation_model(api_key=None):
+    """Create the model that explains an existing classification."""
+    import google.generativeai as genai
+    model = genai.GenerativeModel(
+        model_name=MODEL_NAME,
+        generation_config=EXPLANATION_GENERATION_CONFIG,
+        system_instruction=EXPLANATION_INSTRUCTION,
+    )
+    return bind_model(model, api_key)
+
+
+def explanation_prompt(text, labels, descriptions=()):
+    """Prompt for explaining `labels` (category, subcategory, type) of a case text."""
+    lines = [f"{key}: {label}" for key, label in zip(RESPONSE_KEYS, labels)]
+    lines.extend(f"الوصف: {description}" for description in descriptions if description)
+    return "\n".join(lines + ["", "نص الدعوى:", text])
+
+
+def generate_explanation(model, text, labels, descriptions=()):
+    return model.generate_content(explanation_prompt(text, labels, descriptions)).text.strip()
+
+
+def parse_response(text):
+    """Return the classification dict from a model response, or False if invalid.
+
+    A schema-constrained response ('path', or a single category field) is
+    split into the category/subcategory/type keys.
+    """
+    try:
+        data = json.loads(text)
+        if isinstance(data, list) and len(data) > 0:
+            data = data[0]
+        if isinstance(data, dict) and 'path' not in data and not any(key in data for key in RESPONSE_KEYS):
+            chosen = [key for key in data if key != 'explanation']
+            if len(chosen) == 1 and isinstance(data[chosen[0]], str):
+                data['path'] = PATH_SEPARATOR.join((chosen[0], data.pop(chosen[0])))
+        if isinstance(data, dict) and isinstance(data.get('path'), str):
+            labels = data.pop('path').split(PATH_SEPARATOR)
+            if len(labels) == len(RESPONSE_KEYS):
+                data.update(zip(RESPONSE_KEYS, labels))
+        if not isinstance(data, dict) or not all(key in data for key in RESPONSE_KEYS):
+            print(f"Invalid response structure: {data}")
+            return False
+    except json.JSONDecodeError as e:
+        print(f"Error decoding JSON: {e}")
+        return False
+    return data
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def api_client(api_key, service='generative'):
+    """A 'generative' or 'file' service client bound to one API key.
+
+    genai.configure sets one process-wide key, so sessions on different
+    keys would race on it; these clients are created once per key instead.
+    """
+    with _clients_lock:
+        client = _clients.get((api_key, service))
+        if client is None:
+            if service == 'file':
+                from google.generativeai.client import FileServiceClient as cls
+            else:
+                from google.ai.generativelanguage import GenerativeServiceClient as cls
+            client = _clients[(api_key, service)] = cls(client_options={'api_key': api_key})
+        return client
+
+
+def bind_model(model, api_key):
+    """Send a model's calls (and its chats') through `api_key`'s client.
+
+    The SDK only falls back to the genai.configure client when the model
+    has none yet, so a bound model keeps its key whatever is configured.
+    """
+    if api_key is not None:
+        model._client = api_client(api_key)
+    return model
+
+
+def upload_file(path, mime_type="text/plain", api_key=None):
+    """Upload a file to Gemini and wait until it is ready to be used in a prompt.
+
+    With `api_key` the upload uses that key's client instead of the one
+    set by genai.configure.
+    """
+    import google.generativeai as genai
+    from google.generativeai.types.file_types import File
+
+    if api_key is None:
+        upload, get_file = genai.upload_file, genai.get_file
+    else:
+        client = api_client(api_key, 'file')
+        upload = lambda path, mime_type: File(client.create_file(path, mime_type=mime_type))
+        get_file = lambda name: File(client.get_file(name=name))
+    file = upload(str(path), mime_type=mime_type)
+    print(f"Uploaded file '{file.display_name}' as: {file.uri}")
+    print("Waiting for file processing...")
+    file = get_file(file.name)
+    while file.state.name == "PROCESSING":
+        print(".", end="", flush=True)
+        time.sleep(10)
+        file = get_file(file.name)
+    if file.state.name != "ACTIVE":
+        raise Exception(f"File {file.name} failed to process")
+    print("...all files ready")
+    print()
+    return file
@@ -0,0 +1,101 @@
+"""Extractive condensation of long case texts before classification.
+
+A text estimated at more than CONDENSE_THRESHOLD input tokens is reduced
+to its sentences that share the most vocabulary with the taxonomy (node
+names, descriptions, hints and exceptions in Classes.txt), up to
+CONDENSE_TARGET tokens, in their original order. The first sentence is
+always kept, since pleadings usually open with the claim. Words are
+weighted by how few taxonomy nodes use them, so words found everywhere
+(دعوى, طلب) count for little. It is off (CONDENSE_THRESHOLD=0) until
+testin/evaluate_condensation.py has shown the labels hold; 3000 is the
+threshold it evaluates by default.
+"""
+import math
+import os
+import re
+from collections import Counter
+
+from similarity_index import normalize
+from taxonomy import TAXONOMY_PATH, iter_events, read_source
+from taxonomy_compaction import count_tokens
+
+CONDENSE_THRESHOLD = int(os.environ.get("CONDENSE_THRESHOLD", "0"))
+CONDENSE_TARGET = int(os.environ.get("CONDENSE_TARGET", "1500"))
+
+# Sentences without punctuation are cut into chunks of at most this many words
+MAX_SENTENCE_WORDS = 60
+
+_SENTENCE_END = re.compile(r'(?<=[.!?؟؛])\s+|\n+')
+_WORD = re.compile(r'[ء-ي]+')
+_PREFIX = re.compile(r'^(?:و|ف|ب|ك|ل)?ال|^لل')
+
+
+def words(text):
+    """Normalized Arabic words with the definite article and its prefixes removed."""
+    stems = (_PREFIX.sub('', word) for word in _WORD.findall(normalize(text)))
+    return [stem for stem in stems if len(stem) > 2]
+
+
+def build_vocabulary(source=TAXONOMY_PATH):
+    """Map each taxonomy word to its weight: log(nodes / nodes using the word)."""
+    text, _ = read_source(source)
+    document_counts = Counter()
+    nodes = 0
+    for event, node in iter_events(text.splitlines()):
+        if event != 'enter':
+            continue
+        nodes += 1
+        fields = [node['name'], node['description'], *node['hints'], *node['exceptions']]
+        document_counts.update(set(words(' '.join(fields))))
+    return {word: math.log(nodes / count) for word, count in document_counts.items() if count < nodes}
+
+
+def split_sentences(text):
+    sentences = []
+    for sentence in _SENTENCE_END.split(text):
+        tokens = sentence.split()
+        for start in range(0, len(tokens), MAX_SENTENCE_WORDS):
+            sentences.append(' '.join(tokens[start:start + MAX_SENTENCE_WORDS]))
+    return [sentence for sentence in sentences if sentence]
+
+
+def sentence_score(sentence, vocabulary):
+    """Taxonomy weight of the sentence's distinct words, favouring dense sentences."""
+    sentence_words = words(sentence)
+    if not sentence_words:
+        return 0.0
+    return sum(vocabulary.get(word, 0.0) for word in set(sentence_words)) / math.sqrt(len(sentence_words))
+
+
+def condense(text, vocabulary, target=CONDENSE_TARGET):
+    """Keep the highest-scoring sentences (plus the first) within `target` tokens.
+
+    Repeated sentences are kept once, and gaps between kept sentences are
+    marked with '…'.
+    """
+    sentences = split_sentences(text)
+    ranked = sorted(range(1, len(sentences)), key=lambda i: sentence_score(sentences[i], vocabulary), reverse=True)
+    kept = {0}
+    seen = {normalize(sentences[0])}
+    budget = target - count_tokens(sentences[0])[0]
+    for i in ranked:
+        tokens = count_tokens(sentences[i])[0]
+        if tokens <= budget and normalize(sentences[i]) not in seen:
+            kept.add(i)
+            seen.add(normalize(sentences[i]))
+            budget -= tokens
+    parts = []
+    for i in sorted(kept):
+        if parts and i - 1 not in kept:
+            parts.append('…')
+        parts.append(sentences[i])
+    return ' '.join(parts)
+
+
+def prepare_input(text, vocabulary, threshold=CONDENSE_THRESHOLD, target=CONDENSE_TARGET):
+    """Return (model_input, input_tokens, condensed) for a case text."""
+    tokens, _ = count_tokens(text)
+    if not threshold or tokens <= threshold:
+        return text, tokens, False
+    condensed = condense(text, vocabulary, target)
+    return condensed, tokens, True
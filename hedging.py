@@ -0,0 +1,157 @@
+"""Hedged model calls: send a backup request when the first one is unusually slow.
+
+The hedge delay is the HEDGE_PERCENTILE of recent single-call latencies
+(seeded from history.db, then updated with every primary call). If the
+primary call has not returned a valid result by then, the backup call is
+started on another key or chat session. The first valid result wins. The
+other call is cancelled if it has not started yet; otherwise its result is
+discarded (the SDK call itself cannot be interrupted). Hedges are capped at
+HEDGE_BUDGET extra calls per request over the last HEDGE_WINDOW requests.
+A backup call needs a slot of its own from `acquire` (see
+admission.AdmissionController.try_acquire); without one it is not sent.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+HEDGING = os.environ.get("HEDGING", "0") == "1"
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", "0.95"))
+HEDGE_BUDGET = float(os.environ.get("HEDGE_BUDGET", "0.1"))
+HEDGE_MIN_DELAY = float(os.environ.get("HEDGE_MIN_DELAY", "1.0"))
+HEDGE_WINDOW = 200
+
+# No hedging until the percentile is based on at least this many calls
+MIN_SAMPLES = 20
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies (seconds)."""
+
+    def __init__(self, window=HEDGE_WINDOW, samples=()):
+        self._lock = threading.Lock()
+        self._samples = deque(samples, maxlen=window)
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction):
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+class HedgeBudget:
+    """Allows at most `fraction` hedges per request over the last `window` requests."""
+
+    def __init__(self, fraction=HEDGE_BUDGET, window=HEDGE_WINDOW):
+        self.fraction = fraction
+        self._lock = threading.Lock()
+        self._requests = deque(maxlen=window)
+
+    def request(self):
+        """Register a request; returns the slot to pass to `try_spend`."""
+        slot = [False]
+        with self._lock:
+            self._requests.append(slot)
+        return slot
+
+    def try_spend(self, slot):
+        with self._lock:
+            hedges = sum(1 for request in self._requests if request[0])
+            if hedges + 1 > self.fraction * len(self._requests):
+                return False
+            slot[0] = True
+            return True
+
+
+class Hedger:
+    """Runs a primary call and, past the hedge delay and within budget, a backup call."""
+
+    def __init__(self, percentile=HEDGE_PERCENTILE, budget=HEDGE_BUDGET, min_delay=HEDGE_MIN_DELAY,
+                 samples=(), max_workers=8):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.tracker = LatencyTracker(samples=samples)
+        self.budget = HedgeBudget(budget)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+        self.declined = 0
+        self.backup_wins = 0
+
+    def delay(self):
+        threshold = self.tracker.percentile(self.percentile)
+        return None if threshold is None else max(self.min_delay, threshold)
+
+    def _record_primary(self, start):
+        def record(future):
+            if not future.cancelled() and future.exception() is None:
+                self.tracker.record(time.monotonic() - start)
+        return record
+
+    def call(self, primary, backup, is_valid, acquire=None, release=None):
+        """Return (result, winner) where winner is 'primary' or 'backup'.
+
+        If neither call produces a valid result, the last result is returned
+        (or the last exception raised). `acquire()` is asked for a slot before
+        the backup is sent, and `release()` gives it back when the backup ends.
+        """
+        start = time.monotonic()
+        slot = self.budget.request()
+        with self._lock:
+            self.requests += 1
+
+        primary_future = self._executor.submit(primary)
+        primary_future.add_done_callback(self._record_primary(start))
+        names = {primary_future: 'primary'}
+        pending = {primary_future}
+        delay = self.delay()
+        last = None
+        while pending:
+            timeout = None if delay is None else max(0.0, start + delay - time.monotonic())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # Past the hedge delay: start the backup if the budget allows
+                delay = None
+                if acquire is not None and not acquire():
+                    with self._lock:
+                        self.declined += 1
+                elif self.budget.try_spend(slot):
+                    backup_future = self._executor.submit(backup)
+                    if release is not None:
+                        # Also runs if the backup is cancelled before it starts
+                        backup_future.add_done_callback(lambda future: release())
+                    names[backup_future] = 'backup'
+                    pending.add(backup_future)
+                    with self._lock:
+                        self.hedges += 1
+                elif release is not None:
+                    release()
+                continue
+            for future in done:
+                last = future
+                if future.exception() is None and is_valid(future.result()):
+                    for other in pending:
+                        other.cancel()
+                    if names[future] == 'backup':
+                        with self._lock:
+                            self.backup_wins += 1
+                    return future.result(), names[future]
+        return last.result(), names[last]
+
+    def stats(self):
+        with self._lock:
+            requests, hedges, declined, backup_wins = self.requests, self.hedges, self.declined, self.backup_wins
+        return {
+            'requests': requests,
+            'hedge_rate': hedges / requests if requests else 0.0,
+            'declined': declined,
+            'backup_win_rate': backup_wins / hedges if hedges else 0.0,
+            'delay': self.delay(),
+        }
@@ -0,0 +1,177 @@
+"""SQLite schema for the classification history shared by the app and warm-up."""
+import sqlite3
+import threading
+from collections import OrderedDict
+
+DB_PATH = 'history.db'
+
+# Rows per history page held by a session
+HISTORY_PAGE_SIZE = 50
+
+# Users whose history the process-wide cache keeps (least recently used evicted)
+HISTORY_CACHE_USERS = 1000
+
+
+def init_db():
+    """Initialize SQLite database and create tables if they don't exist."""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS classifications (
+            id TEXT PRIMARY KEY,
+            user_id TEXT,
+            input_text TEXT NOT NULL,
+            main_classification TEXT NOT NULL,
+            sub_classification TEXT NOT NULL,
+            case_type TEXT NOT NULL,
+            explanation TEXT,
+            duration TEXT,
+            explanation_duration TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            taxonomy_version TEXT,
+            reused_from TEXT,
+            input_tokens INTEGER,
+            condensed_text TEXT,
+            model_duration TEXT
+        )
+    ''')
+
+    # Migrate databases created before these columns existed
+    columns = {row[1] for row in c.execute('PRAGMA table_info(classifications)')}
+    if 'taxonomy_version' not in columns:
+        c.execute('ALTER TABLE classifications ADD COLUMN taxonomy_version TEXT')
+    if 'reused_from' not in columns:
+        c.execute('ALTER TABLE classifications ADD COLUMN reused_from TEXT')
+    if 'explanation_duration' not in columns:
+        c.execute('ALTER TABLE classifications ADD COLUMN explanation_duration TEXT')
+    if 'user_id' not in columns:
+        # Rows saved before histories were per user keep a NULL owner
+        c.execute('ALTER TABLE classifications ADD COLUMN user_id TEXT')
+    if 'input_tokens' not in columns:
+        c.execute('ALTER TABLE classifications ADD COLUMN input_tokens INTEGER')
+    if 'condensed_text' not in columns:
+        # What the model was sent when input_text was too long; NULL otherwise
+        c.execute('ALTER TABLE classifications ADD COLUMN condensed_text TEXT')
+    if 'model_duration' not in columns:
+        # Latency of the model call itself; NULL for reused and speculative
+        # results, and for rows saved before it was recorded
+        c.execute('ALTER TABLE classifications ADD COLUMN model_duration TEXT')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_classifications_user_created
+        ON classifications (user_id, created_at)
+    ''')
+
+    # Rows waiting to be re-classified by testin/revalidate_history.py,
+    # and how far its scan got for each taxonomy version
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS revalidation_queue (
+            id TEXT PRIMARY KEY,
+            reason TEXT NOT NULL,
+            taxonomy_version TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS revalidation_scan (
+            taxonomy_version TEXT PRIMARY KEY,
+            last_rowid INTEGER NOT NULL DEFAULT 0,
+            finished_at TIMESTAMP
+        )
+    ''')
+
+    conn.commit()
+    return conn
+
+
+def sync_similarity_index(index, conn):
+    """Add model-labelled rows saved since the index's last sync; returns the count."""
+    rows = conn.execute('''
+        SELECT rowid, id, input_text FROM classifications
+        WHERE rowid > ? AND main_classification != '-' AND reused_from IS NULL
+        ORDER BY rowid
+    ''', (index.meta['last_rowid'],)).fetchall()
+    return index.sync(rows)
+
+
+def save_explanation(conn, entry_id, explanation, duration):
+    """Store an explanation generated after the classification was saved."""
+    conn.execute(
+        'UPDATE classifications SET explanation = ?, explanation_duration = ? WHERE id = ?',
+        (explanation, f"{duration:.2f}", entry_id)
+    )
+    conn.commit()
+
+
+def recent_durations(conn, limit):
+    """Latencies (seconds) of the latest model calls, oldest first.
+
+    `duration` is what the user waited, including the admission queue, and
+    is near zero for speculative hits; only the model call's own latency
+    is used.
+    """
+    rows = conn.execute('''
+        SELECT model_duration FROM classifications
+        WHERE model_duration IS NOT NULL
+        ORDER BY rowid DESC LIMIT ?
+    ''', (limit,)).fetchall()
+    return [float(row[0]) for row in reversed(rows)]
+
+
+def load_user_history(conn, user_id):
+    """Load one user's classification history, newest first."""
+    import pandas as pd  # imported on first use to keep it off the startup path
+    # Served by the (user_id, created_at) index: cost grows with the user's rows only
+    df = pd.read_sql_query(
+        'SELECT * FROM classifications WHERE user_id = ? ORDER BY created_at DESC',
+        conn,
+        params=(user_id,)
+    )
+    if df.empty:
+        return []
+    return df.to_dict('records')
+
+
+class HistoryCache:
+    """Process-wide, read-mostly copy of each user's history, paged by sessions.
+
+    Writes go through `write`, on the cache's own connection, and drop only the
+    writer's entry. Commits on that connection leave its `PRAGMA data_version`
+    unchanged, so the version moves only when another process (e.g. the
+    re-validation job) commits, and then every entry is reloaded. At most
+    `max_users` users are kept.
+    """
+
+    def __init__(self, max_users=HISTORY_CACHE_USERS):
+        self._conn = init_db()
+        self._lock = threading.Lock()
+        self._users = OrderedDict()  # user_id -> (data_version, rows)
+        self.max_users = max_users
+
+    def rows(self, user_id):
+        with self._lock:
+            data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+            cached = self._users.get(user_id)
+            if cached is None or cached[0] != data_version:
+                cached = (data_version, tuple(load_user_history(self._conn, user_id)))
+                self._users[user_id] = cached
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+            return cached[1]
+
+    def page(self, user_id, page, size=HISTORY_PAGE_SIZE):
+        return self.rows(user_id)[page * size:(page + 1) * size]
+
+    def page_count(self, user_id, size=HISTORY_PAGE_SIZE):
+        return max(1, -(-len(self.rows(user_id)) // size))
+
+    def write(self, user_id, write, *args):
+        """Run `write(conn, *args)` on the cache's connection and drop the user's entry."""
+        with self._lock:
+            result = write(self._conn, *args)
+            self._users.pop(user_id, None)
+            return result
+
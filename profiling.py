@@ -0,0 +1,205 @@
+"""Opt-in sampling profiler for script runs and classification calls.
+
+A profiled block registers its thread with one background sampler that
+reads the thread's Python stack every PROFILE_INTERVAL_MS. Nothing runs
+unless a block is being profiled. Each block is profiled with probability
+PROFILE_SAMPLE_RATE (default 0, off), or always when `force` is set (the
+app's admin toggle). Per profiled block, two files are written to
+PROFILE_DIR:
+
+    <name>-<time>-<id>.folded          collapsed stacks ("a;b;c 12"), readable by
+                                       flamegraph.pl, speedscope and inferno
+    <name>-<time>-<id>.functions.tsv   samples per function: self, total
+
+    python profiling.py [dir] [--name classification] [--top 30]
+
+merges the .folded files in a directory and prints the per-function table.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+PROFILE_DIR = Path(os.environ.get("PROFILE_DIR", Path(__file__).parent / "profiles"))
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+
+# Deepest frames kept per sample; Streamlit's own stack is ~60 frames
+MAX_DEPTH = 128
+
+
+class Profile:
+    """Stack samples collected for one profiled block."""
+
+    def __init__(self, name):
+        self.name = name
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = time.time()
+        self.duration = 0.0
+
+
+class Sampler:
+    """Background thread sampling the stacks of registered threads."""
+
+    def __init__(self, interval=PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._targets = {}
+        self._wake = threading.Event()
+        self._thread = None
+        self.sampling_seconds = 0.0
+
+    def register(self, thread_id, profile):
+        with self._lock:
+            self._targets.setdefault(thread_id, []).append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def unregister(self, thread_id, profile):
+        """Stop sampling `profile`; once this returns, its counts no longer change."""
+        with self._lock:
+            profiles = self._targets.get(thread_id, [])
+            if profile in profiles:
+                profiles.remove(profile)
+            if not profiles:
+                self._targets.pop(thread_id, None)
+
+    def _run(self):
+        while True:
+            # Cleared before reading the targets, so a register() in between
+            # leaves the event set and the wait below returns at once
+            self._wake.clear()
+            with self._lock:
+                thread_ids = list(self._targets)
+            if not thread_ids:
+                self._wake.wait()
+                continue
+            start = time.perf_counter()
+            frames = sys._current_frames()
+            stacks = {thread_id: folded_stack(frames[thread_id]) for thread_id in thread_ids if thread_id in frames}
+            del frames
+            # Counted under the lock, and only for profiles still registered,
+            # so write_profile never sees the counters change
+            with self._lock:
+                for thread_id, stack in stacks.items():
+                    for profile in self._targets.get(thread_id, ()):
+                        profile.stacks[stack] += 1
+                        profile.samples += 1
+            self.sampling_seconds += time.perf_counter() - start
+            time.sleep(self.interval)
+
+
+def folded_stack(frame):
+    """Collapse a frame's stack into 'root;...;leaf' with file:function entries."""
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+_sampler = Sampler()
+
+
+def should_profile(force=False):
+    return force or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE)
+
+
+@contextmanager
+def profile(name, force=False):
+    """Sample the current thread for the duration of the block, if selected."""
+    if not should_profile(force):
+        yield None
+        return
+    record = Profile(name)
+    thread_id = threading.get_ident()
+    _sampler.register(thread_id, record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.duration = time.perf_counter() - start
+        _sampler.unregister(thread_id, record)
+        if record.samples:
+            path = write_profile(record)
+            print(f"Profiled {name}: {record.samples} samples over {record.duration:.2f} seconds -> {path}")
+
+
+def function_totals(stacks):
+    """Per-function (self, total) sample counts from collapsed stacks."""
+    self_counts = Counter()
+    total_counts = Counter()
+    for stack, count in stacks.items():
+        names = stack.split(';')
+        self_counts[names[-1]] += count
+        for name in set(names):
+            total_counts[name] += count
+    return {name: (self_counts[name], total) for name, total in total_counts.items()}
+
+
+def write_profile(record, directory=None):
+    """Write the collapsed stacks and per-function table of a profile; returns the .folded path."""
+    directory = Path(directory or PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(record.started))
+    base = directory / f"{record.name}-{stamp}-{uuid.uuid4().hex[:8]}"
+    with open(base.with_suffix('.folded'), 'w', encoding='utf-8') as f:
+        f.writelines(f"{stack} {count}\n" for stack, count in record.stacks.most_common())
+    write_function_table(function_totals(record.stacks), record.samples, base.with_suffix('.functions.tsv'))
+    return base.with_suffix('.folded')
+
+
+def write_function_table(totals, samples, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("function\tself\ttotal\tself_pct\ttotal_pct\n")
+        for name, (own, total) in sorted(totals.items(), key=lambda item: item[1], reverse=True):
+            f.write(f"{name}\t{own}\t{total}\t{own / samples:.1%}\t{total / samples:.1%}\n")
+
+
+def read_folded(paths):
+    stacks = Counter()
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack:
+                    stacks[stack] += int(count)
+    return stacks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge collapsed-stack profiles and print per-function samples.")
+    parser.add_argument('directory', nargs='?', default=str(PROFILE_DIR))
+    parser.add_argument('--name', default=None, help="only profiles of this block (e.g. script_run, classification)")
+    parser.add_argument('--top', type=int, default=30)
+    parser.add_argument('--output', default=None, help="also write the merged stacks as one .folded file")
+    args = parser.parse_args()
+
+    paths = sorted(Path(args.directory).glob(f"{args.name or '*'}-*.folded"))
+    stacks = read_folded(paths)
+    samples = sum(stacks.values())
+    if not samples:
+        print(f"No profiles in {args.directory}")
+        return
+    print(f"{len(paths)} profiles, {samples} samples")
+    print(f"{'self':>7}{'total':>8}  function")
+    totals = function_totals(stacks)
+    for name, (own, total) in sorted(totals.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{own / samples:>7.1%}{total / samples:>8.1%}  {name}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+"""Start the server warm-up and readiness probe, then run the Streamlit app.
+
+    python serve.py [streamlit run options, e.g. --server.port=8502]
+
+The warm-up runs in this process, so the app reuses its uploads and the
+indexes it brought up to date (see warmup.py).
+"""
+import sys
+from pathlib import Path
+
+from streamlit.web import cli as stcli
+
+import warmup
+
+if __name__ == "__main__":
+    warmup.start()
+    sys.argv = ["streamlit", "run", str(Path(__file__).parent / "app.py"), *sys.argv[1:]]
+    sys.exit(stcli.main())
@@ -0,0 +1,215 @@
+"""Near-duplicate lookup over past classifications (MinHash LSH in NumPy).
+
+Each input text is normalized, split into character shingles and reduced
+to a MinHash signature. Signatures and their LSH band keys are appended to
+flat files that are memory-mapped for queries, so the index is updated
+incrementally and a query is a vectorized band comparison followed by a
+signature comparison on the few candidates.
+
+Files in the index directory:
+
+    signatures.u32   N x NUM_PERM MinHash values
+    bands.u64        N x BANDS band keys
+    ids.txt          classification id per row
+    meta.json        row count, parameters and the last synced DB rowid
+"""
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+INDEX_DIR = Path(__file__).parent / "similarity_index"
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+
+_DIACRITICS = re.compile('[\u064b-\u065f\u0670\u0640]')
+_ALEF = re.compile('[\u0622\u0623\u0625]')
+
+
+def normalize(text):
+    """Strip Arabic diacritics/tatweel, unify alef forms and collapse whitespace."""
+    text = _ALEF.sub('ا', _DIACRITICS.sub('', text))
+    text = text.replace('ة', 'ه').replace('ى', 'ي')
+    return ' '.join(text.split())
+
+
+@lru_cache(maxsize=None)
+def _hash_constants():
+    """(prime, mask, perm_a, perm_b, band_mix, shingle_base), built on first use.
+
+    Importing this module (condensation.py needs `normalize`) does not load NumPy.
+    """
+    import numpy as np
+    rng = np.random.RandomState(1234)
+    perm_a = rng.randint(1, 2 ** 31, size=NUM_PERM, dtype=np.uint64)
+    perm_b = rng.randint(0, 2 ** 32, size=NUM_PERM, dtype=np.uint64)
+    band_mix = rng.randint(1, 2 ** 63, size=ROWS_PER_BAND, dtype=np.uint64) | np.uint64(1)
+    return np.uint64(4294967311), np.uint64(0xFFFFFFFF), perm_a, perm_b, band_mix, np.uint64(1000003)
+
+
+def shingle_hashes(text):
+    """Hash every SHINGLE_SIZE-character window of the normalized text."""
+    import numpy as np
+    _, mask, _, _, _, shingle_base = _hash_constants()
+    codes = np.frombuffer(normalize(text).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    if len(codes) < SHINGLE_SIZE:
+        codes = np.pad(codes, (0, SHINGLE_SIZE - len(codes)))
+    windows = np.lib.stride_tricks.sliding_window_view(codes, SHINGLE_SIZE)
+    powers = shingle_base ** np.arange(SHINGLE_SIZE - 1, -1, -1, dtype=np.uint64)
+    return np.unique((windows * powers).sum(axis=1) & mask)
+
+
+def signature(text):
+    """MinHash signature (NUM_PERM uint32 values) of a text."""
+    import numpy as np
+    prime, mask, perm_a, perm_b, _, _ = _hash_constants()
+    hashes = shingle_hashes(text)
+    permuted = (np.outer(hashes, perm_a) + perm_b) % prime
+    return (permuted.min(axis=0) & mask).astype(np.uint32)
+
+
+def band_keys(signatures):
+    """Combine each band of ROWS_PER_BAND values into one uint64 key."""
+    import numpy as np
+    band_mix = _hash_constants()[4]
+    grouped = np.atleast_2d(signatures).astype(np.uint64).reshape(-1, BANDS, ROWS_PER_BAND)
+    return np.bitwise_xor.reduce(grouped * band_mix, axis=2)
+
+
+class SimilarityIndex:
+    """Append-only MinHash LSH index backed by memory-mapped files."""
+
+    def __init__(self, directory=INDEX_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self.meta = self._read_meta()
+        self._ids = self._read_ids()
+        self._maps = None
+        self.queries = 0
+        self.hits = 0
+
+    def _path(self, name):
+        return self.directory / name
+
+    def _read_meta(self):
+        try:
+            meta = json.loads(self._path('meta.json').read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            meta = None
+        params = {'num_perm': NUM_PERM, 'bands': BANDS, 'shingle_size': SHINGLE_SIZE}
+        if not meta or any(meta.get(key) != value for key, value in params.items()):
+            # Missing or built with other parameters: start from scratch
+            for name in ('signatures.u32', 'bands.u64', 'ids.txt'):
+                self._path(name).unlink(missing_ok=True)
+            meta = {'count': 0, 'last_rowid': 0, **params}
+        return meta
+
+    def _read_ids(self):
+        try:
+            ids = self._path('ids.txt').read_text(encoding='utf-8').splitlines()
+        except OSError:
+            ids = []
+        if len(ids) > self.meta['count']:
+            # Ids appended by an interrupted write are not covered by meta.json
+            ids = ids[:self.meta['count']]
+            self._path('ids.txt').write_text(''.join(f"{entry_id}\n" for entry_id in ids), encoding='utf-8')
+        return ids
+
+    def _write_meta(self):
+        tmp_path = self._path('meta.json.tmp')
+        tmp_path.write_text(json.dumps(self.meta), encoding='utf-8')
+        os.replace(tmp_path, self._path('meta.json'))
+
+    def __len__(self):
+        return self.meta['count']
+
+    def _mapped(self):
+        import numpy as np
+        count = self.meta['count']
+        if self._maps is None or self._maps[0] != count:
+            if count == 0:
+                return None, None
+            signatures = np.memmap(self._path('signatures.u32'), dtype=np.uint32, mode='r', shape=(count, NUM_PERM))
+            bands = np.memmap(self._path('bands.u64'), dtype=np.uint64, mode='r', shape=(count, BANDS))
+            self._maps = (count, signatures, bands)
+        return self._maps[1], self._maps[2]
+
+    def add_signatures(self, ids, signatures, last_rowid=None):
+        """Append precomputed signatures (one row per id)."""
+        import numpy as np
+        signatures = np.ascontiguousarray(signatures, dtype=np.uint32).reshape(-1, NUM_PERM)
+        with self._lock:
+            count = self.meta['count']
+            # Drop any bytes past the recorded count left by an interrupted append
+            for name, width in (('signatures.u32', NUM_PERM * 4), ('bands.u64', BANDS * 8)):
+                with open(self._path(name), 'ab') as f:
+                    f.truncate(count * width)
+                    f.write(signatures.tobytes() if name == 'signatures.u32' else band_keys(signatures).tobytes())
+            with open(self._path('ids.txt'), 'w' if count == 0 else 'a', encoding='utf-8') as f:
+                f.writelines(f"{entry_id}\n" for entry_id in ids)
+            self._ids.extend(ids)
+            self.meta['count'] = count + len(ids)
+            if last_rowid is not None:
+                # Sessions add rows out of rowid order; the checkpoint never moves back
+                self.meta['last_rowid'] = max(self.meta['last_rowid'], last_rowid)
+            self._write_meta()
+
+    def add(self, entry_id, text, last_rowid=None):
+        self.add_signatures([entry_id], signature(text), last_rowid)
+
+    def query(self, text, threshold):
+        """Return (id, similarity) of the closest past text at or above `threshold`, else None."""
+        import numpy as np
+        self.queries += 1
+        signatures, bands = self._mapped()
+        if signatures is None:
+            return None
+        query_signature = signature(text)
+        candidates = np.flatnonzero((bands == band_keys(query_signature)).any(axis=1))
+        if len(candidates) == 0:
+            return None
+        similarity = (signatures[candidates] == query_signature).mean(axis=1)
+        best = int(similarity.argmax())
+        if similarity[best] < threshold:
+            return None
+        self.hits += 1
+        return self._ids[candidates[best]], float(similarity[best])
+
+    def sync(self, rows):
+        """Index (rowid, id, text) rows newer than the last synced rowid."""
+        import numpy as np
+        with self._lock:  # concurrent syncs must not add the same rows twice
+            rows = [row for row in rows if row[0] > self.meta['last_rowid']]
+            if not rows:
+                return 0
+            signatures = np.stack([signature(text) for _, _, text in rows])
+            self.add_signatures([entry_id for _, entry_id, _ in rows], signatures,
+                                last_rowid=max(row[0] for row in rows))
+            return len(rows)
+
+    @property
+    def reuse_rate(self):
+        return self.hits / self.queries if self.queries else 0.0
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_index():
+    """The process-wide index over INDEX_DIR, used by the app and the warm-up.
+
+    Each instance appends from its own row count, so two instances over the
+    same files would put ids.txt out of line with the signature files.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = SimilarityIndex()
+        return _shared
@@ -0,0 +1,246 @@
+"""Speculative classification of the case text before the user clicks classify.
+
+With SPECULATION=1, a new input value starts a SPECULATION_DEBOUNCE timer.
+If the text is unchanged when it fires, the classification call starts in
+the background, and its future is stored in the result cache under the
+text's key. Clicking classify claims the cached result for the same text:
+it is either ready (a hit) or already on its way (a partial hit).
+Speculative calls wait for a batch-priority slot of the admission
+controller. A click never waits behind that queue: a speculative call that
+has not been admitted yet is withdrawn, and the click makes its own call
+at interactive priority. A text change likewise cancels the pending timer
+and any speculative call not admitted yet. A call already admitted cannot
+be stopped; it stays in the cache in case the text comes back. Each session may have at
+most SPECULATION_MAX_WASTED speculative calls without a click; the count
+restarts at every click. `speculator.stats()` holds the hit-rate metrics;
+warmup.py serves them at GET /metrics.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import admission
+
+SPECULATION = os.environ.get("SPECULATION", "0") == "1"
+SPECULATION_DEBOUNCE = float(os.environ.get("SPECULATION_DEBOUNCE", "1.5"))
+SPECULATION_MAX_WASTED = int(os.environ.get("SPECULATION_MAX_WASTED", "3"))
+RESULT_CACHE_SIZE = 256
+
+
+def result_key(text):
+    """Cache key of a model input.
+
+    The taxonomy version is not part of the key: callers store it with the
+    result and check at claim time whether the labels are still valid.
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class SpeculativeCall:
+    """A speculative call's future, and whether it was admitted or withdrawn first."""
+
+    def __init__(self):
+        self.future = None
+        self.admitted = False
+        self.withdrawn = threading.Event()
+        self._lock = threading.Lock()
+
+    def admit(self):
+        """Called with the slot held; False if the call was withdrawn meanwhile."""
+        with self._lock:
+            if self.withdrawn.is_set():
+                return False
+            self.admitted = True
+            return True
+
+    def withdraw(self):
+        """Stop the call unless it was admitted; True if it will not call the model."""
+        with self._lock:
+            if self.admitted:
+                return False
+            self.withdrawn.set()
+        self.future.cancel()
+        return True
+
+
+class ResultCache:
+    """LRU of SpeculativeCalls by result_key, shared by all sessions."""
+
+    def __init__(self, max_entries=RESULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            speculative = self._entries.get(key)
+            if speculative is not None:
+                self._entries.move_to_end(key)
+            return speculative
+
+    def put(self, key, speculative):
+        with self._lock:
+            self._entries[key] = speculative
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key, speculative):
+        """Remove `key` if it still maps to `speculative`."""
+        with self._lock:
+            if self._entries.get(key) is speculative:
+                del self._entries[key]
+
+
+class Speculator:
+    """Runs speculative calls for every session and keeps the metrics."""
+
+    def __init__(self, debounce=SPECULATION_DEBOUNCE, max_wasted=SPECULATION_MAX_WASTED, max_workers=8,
+                 controller=None):
+        self.debounce = debounce
+        self.max_wasted = max_wasted
+        # Admission controller for batch-priority slots; None admits at once
+        self.controller = controller
+        self.cache = ResultCache()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculation")
+        self._lock = threading.Lock()
+        self._counters = {'started': 0, 'cancelled': 0, 'wasted': 0, 'capped': 0,
+                          'hits': 0, 'partial_hits': 0, 'misses': 0, 'withdrawn': 0}
+
+    def count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def submit(self, call, user_id=None):
+        """Run `call` in the background once admitted; returns its SpeculativeCall."""
+        speculative = SpeculativeCall()
+
+        def run():
+            if self.controller is None:
+                return call() if speculative.admit() else None
+            with self.controller.slot(user_id, 'batch', cancel=speculative.withdrawn):
+                return call() if speculative.admit() else None
+
+        speculative.future = self._executor.submit(run)
+        return speculative
+
+    def withdraw(self, speculative):
+        """Withdraw a call that was not admitted yet; True if it was."""
+        if not speculative.withdraw():
+            return False
+        if self.controller is not None:
+            self.controller.wake()
+        return True
+
+    def session(self, user_id=None):
+        return SpeculativeSession(self, user_id)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+        clicks = counters['hits'] + counters['partial_hits'] + counters['misses']
+        return {
+            **counters,
+            'hit_rate': (counters['hits'] + counters['partial_hits']) / clicks if clicks else 0.0,
+            'waste_rate': counters['wasted'] / counters['started'] if counters['started'] else 0.0,
+        }
+
+
+class SpeculativeSession:
+    """One browser session's debounce timer and speculative call."""
+
+    def __init__(self, speculator, user_id=None):
+        self.speculator = speculator
+        self.user_id = user_id
+        self._lock = threading.Lock()
+        self._timer = None
+        self._pending = None  # (key, SpeculativeCall) of the last speculative call
+        self._unused = 0
+
+    def _drop_stale(self, key=None):
+        """Cancel the timer and a speculative call for any text other than `key` (lock held)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+            self.speculator.count('cancelled')
+        if self._pending is not None and self._pending[0] != key:
+            stale_key, speculative = self._pending
+            self._pending = None
+            if self.speculator.withdraw(speculative):
+                self.speculator.cache.discard(stale_key, speculative)
+                self.speculator.count('cancelled')
+                self._unused -= 1
+            else:
+                self.speculator.count('wasted')
+
+    def schedule(self, key, call):
+        """Start `call` after the debounce unless the text changes or is claimed first."""
+        with self._lock:
+            if self._timer is not None and self._timer.args[0] == key:
+                return
+            self._drop_stale(key)
+            if self.speculator.cache.get(key) is not None:
+                return
+            if self._unused >= self.speculator.max_wasted:
+                self.speculator.count('capped')
+                return
+            timer = threading.Timer(self.speculator.debounce, self._start, (key, call))
+            timer.daemon = True
+            self._timer = timer
+            timer.start()
+
+    def _start(self, key, call):
+        with self._lock:
+            if self._timer is None or self._timer.args[0] != key:
+                return
+            self._timer = None
+            speculative = self.speculator.submit(call, self.user_id)
+            self.speculator.cache.put(key, speculative)
+            self._pending = (key, speculative)
+            self._unused += 1
+            self.speculator.count('started')
+
+    def claim(self, key, is_valid):
+        """On click: the speculative result for `key`, waiting if its model call is running.
+
+        Returns None (a miss) if there is none, if it failed or is not valid,
+        or if it was still waiting for a batch slot; it is then withdrawn so
+        the click's own call is admitted at interactive priority.
+        """
+        with self._lock:
+            self._drop_stale(key)
+            self._pending = None
+            self._unused = 0
+        speculative = self.speculator.cache.get(key)
+        if speculative is None:
+            self.speculator.count('misses')
+            return None
+        future = speculative.future
+        ready = future.done()
+        if not ready and self.speculator.withdraw(speculative):
+            self.speculator.cache.discard(key, speculative)
+            self.speculator.count('withdrawn')
+            self.speculator.count('misses')
+            return None
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Speculative classification failed: {e}")
+            result = None
+        if result is None or not is_valid(result):
+            self.speculator.cache.discard(key, speculative)
+            self.speculator.count('misses')
+            return None
+        self.speculator.count('hits' if ready else 'partial_hits')
+        return result
+
+    def cancel(self):
+        """Drop any pending speculation (new case, or the session is done)."""
+        with self._lock:
+            self._drop_stale()
+
+
+# Shared by every session in the process (the app and the warm-up server)
+speculator = Speculator(controller=admission.controller)
@@ -0,0 +1,102 @@
+"""Streaming reader for the case classification taxonomy (Data/Classes.txt)."""
+import hashlib
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Tuple
+
+TAXONOMY_PATH = Path(__file__).parent / "Data" / "Classes.txt"
+
+# Heading depth -> field name used in model responses
+LEVELS = {1: 'category', 2: 'subcategory', 3: 'type'}
+
+DESCRIPTION_PREFIX = 'الوصف:'
+HINTS_PREFIX = 'التلميحات:'
+EXCEPTIONS_PREFIX = 'الاستثناءات:'
+
+
+def read_source(path=TAXONOMY_PATH) -> Tuple[str, str]:
+    """Read the taxonomy once and return its text and SHA-256 digest."""
+    data = Path(path).read_bytes()
+    return data.decode('utf-8'), hashlib.sha256(data).hexdigest()
+
+
+def heading_level(line: str) -> int:
+    """Return 1-3 for '#', '##' and '###' headings, 0 for anything else."""
+    hashes = len(line) - len(line.lstrip('#'))
+    if 1 <= hashes <= 3 and line[hashes:hashes + 1] == ' ':
+        return hashes
+    return 0
+
+
+def iter_events(lines: Iterable[str]) -> Iterator[Tuple[str, Any]]:
+    """Parse taxonomy lines into a flat stream of events.
+
+    Yields ('enter', node) once a node's own description, hints and
+    exceptions are complete (i.e. before any of its children), and
+    ('exit', level) when the node is closed. Nodes are plain dicts with
+    level, name, description, hints and exceptions. Hint and exception
+    items start with '-'; any other line continues the previous item.
+    """
+    open_levels = []
+    pending = None
+    section = None
+
+    for line_num, raw in enumerate(lines, 1):
+        line = raw.strip()
+        if not line:
+            continue
+
+        level = heading_level(line)
+        if level:
+            if pending is not None:
+                yield 'enter', pending
+            while open_levels and open_levels[-1] >= level:
+                yield 'exit', open_levels.pop()
+            if len(open_levels) != level - 1:
+                raise ValueError(f"Error parsing line {line_num}: {line}\nError: heading has no parent")
+            open_levels.append(level)
+            pending = {
+                'level': level,
+                'name': line[level + 1:].strip(),
+                'description': '',
+                'hints': [],
+                'exceptions': [],
+            }
+            section = None
+            continue
+
+        if pending is None:
+            raise ValueError(f"Error parsing line {line_num}: {line}\nError: content before the first heading")
+
+        if line.startswith(DESCRIPTION_PREFIX):
+            section = 'description'
+            line = line[len(DESCRIPTION_PREFIX):].strip()
+        elif line.startswith(HINTS_PREFIX):
+            section = 'hints'
+            line = line[len(HINTS_PREFIX):].strip()
+        elif line.startswith(EXCEPTIONS_PREFIX):
+            section = 'exceptions'
+            line = line[len(EXCEPTIONS_PREFIX):].strip()
+        elif section in ('hints', 'exceptions'):
+            items = pending[section]
+            if line.startswith('-'):
+                items.append(line[1:].strip())
+            elif items:
+                items[-1] += '\n' + line
+            else:
+                items.append(line)
+            continue
+        else:
+            section = 'description'
+
+        if not line:
+            continue
+        if section == 'description':
+            pending['description'] = f"{pending['description']} {line}".strip()
+        else:
+            pending[section].append(line[1:].strip() if line.startswith('-') else line)
+
+    if pending is not None:
+        yield 'enter', pending
+    while open_levels:
+        yield 'exit', open_levels.pop()
+
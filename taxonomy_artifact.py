@@ -0,0 +1,316 @@
+"""Compact, memory-mappable binary form of the taxonomy.
+
+Layout (little-endian, version 1):
+
+    header   magic 'NZTX', format version, source SHA-256, counts and
+             section offsets (HEADER)
+    nodes    one fixed-size record per node (NODE), in level order so the
+             children of any node are contiguous: level, parent, first
+             child, child count, name/description string ids and the
+             hint/exception ranges into the item array
+    items    u32 string ids for hints and exceptions
+    strings  (offset, length) index followed by the UTF-8 blob; identical
+             strings are stored once
+
+Readers map the file and decode strings only when a field is accessed, so
+opening is near-instant and the pages are shared between processes.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Mapping
+from pathlib import Path
+
+from taxonomy import TAXONOMY_PATH, iter_events, read_source
+
+ARTIFACT_PATH = TAXONOMY_PATH.with_suffix('.nztx')
+
+MAGIC = b'NZTX'
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct('<4sHH32sIIIIIIII')
+NODE = struct.Struct('<B3xi8I')
+ITEM = struct.Struct('<I')
+STRING = struct.Struct('<II')
+
+CHILD_KEYS = {1: 'subcategories', 2: 'types'}
+
+
+def build_artifact(source=TAXONOMY_PATH, dest=None):
+    """Compile `source` into the binary artifact at `dest` (atomically replaced)."""
+    dest = Path(dest or Path(source).with_suffix('.nztx'))
+    text, source_hash = read_source(source)
+
+    # Collect nodes in document order, then renumber them level by level
+    nodes = []
+    stack = []
+    for event, node in iter_events(text.splitlines()):
+        if event == 'exit':
+            stack.pop()
+            continue
+        node['parent'] = stack[-1] if stack else -1
+        node['children'] = []
+        if stack:
+            nodes[stack[-1]]['children'].append(len(nodes))
+        stack.append(len(nodes))
+        nodes.append(node)
+
+    order = sorted(range(len(nodes)), key=lambda i: nodes[i]['level'])
+    new_index = {old: new for new, old in enumerate(order)}
+
+    strings = {}
+
+    def string_id(value):
+        if value not in strings:
+            strings[value] = len(strings)
+        return strings[value]
+
+    items = []
+    records = []
+    for old in order:
+        node = nodes[old]
+        hint_start = len(items)
+        items.extend(string_id(hint) for hint in node['hints'])
+        exc_start = len(items)
+        items.extend(string_id(exc) for exc in node['exceptions'])
+        children = [new_index[child] for child in node['children']]
+        records.append(NODE.pack(
+            node['level'],
+            new_index[node['parent']] if node['parent'] >= 0 else -1,
+            children[0] if children else 0,
+            len(children),
+            string_id(node['name']),
+            string_id(node['description']),
+            hint_start,
+            len(node['hints']),
+            exc_start,
+            len(node['exceptions']),
+        ))
+
+    blobs = [value.encode('utf-8') for value in strings]
+    string_index = []
+    offset = 0
+    for blob in blobs:
+        string_index.append(STRING.pack(offset, len(blob)))
+        offset += len(blob)
+
+    category_count = sum(1 for node in nodes if node['level'] == 1)
+    nodes_offset = HEADER.size
+    items_offset = nodes_offset + NODE.size * len(records)
+    index_offset = items_offset + ITEM.size * len(items)
+    data_offset = index_offset + STRING.size * len(string_index)
+
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0, bytes.fromhex(source_hash),
+        len(records), category_count, len(items), len(strings),
+        nodes_offset, items_offset, index_offset, data_offset,
+    )
+
+    tmp_path = dest.with_name(dest.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.writelines(records)
+        f.writelines(ITEM.pack(item) for item in items)
+        f.writelines(string_index)
+        f.writelines(blobs)
+    os.replace(tmp_path, dest)
+    return dest
+
+
+def artifact_is_current(source=TAXONOMY_PATH, artifact=None):
+    """Return True if `artifact` exists and was built from the current `source`."""
+    artifact = Path(artifact or Path(source).with_suffix('.nztx'))
+    try:
+        with open(artifact, 'rb') as f:
+            head = f.read(HEADER.size)
+    except OSError:
+        return False
+    if len(head) < HEADER.size:
+        return False
+    magic, version, _, source_hash = HEADER.unpack(head)[:4]
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return False
+    return hashlib.sha256(Path(source).read_bytes()).digest() == source_hash
+
+
+def ensure_artifact(source=TAXONOMY_PATH, artifact=None):
+    """Rebuild the artifact if it is missing or stale, and return its path."""
+    artifact = Path(artifact or Path(source).with_suffix('.nztx'))
+    if not artifact_is_current(source, artifact):
+        build_artifact(source, artifact)
+    return artifact
+
+
+class TaxonomyArtifact:
+    """Read-only, memory-mapped view over a built artifact."""
+
+    def __init__(self, path=ARTIFACT_PATH):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _, source_hash, self.node_count, self.category_count,
+         self.item_count, self.string_count, self._nodes_offset, self._items_offset,
+         self._index_offset, self._data_offset) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a taxonomy artifact")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported taxonomy artifact version {version}")
+        self.version = version
+        self.source_sha256 = source_hash.hex()
+        self._strings = {}
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def string(self, string_id):
+        """Decode a string from the table (memoized after first access)."""
+        value = self._strings.get(string_id)
+        if value is None:
+            offset, length = STRING.unpack_from(self._mm, self._index_offset + STRING.size * string_id)
+            start = self._data_offset + offset
+            value = self._mm[start:start + length].decode('utf-8')
+            self._strings[string_id] = value
+        return value
+
+    def record(self, index):
+        return NODE.unpack_from(self._mm, self._nodes_offset + NODE.size * index)
+
+    def node(self, index):
+        return Node(self, index)
+
+    def categories(self):
+        return [Node(self, i) for i in range(self.category_count)]
+
+    def _items(self, start, count):
+        return [
+            self.string(ITEM.unpack_from(self._mm, self._items_offset + ITEM.size * i)[0])
+            for i in range(start, start + count)
+        ]
+
+    def find(self, *names):
+        """Return the node at the given category/subcategory/type path, or None."""
+        candidates = self.categories()
+        node = None
+        for name in names:
+            node = next((child for child in candidates if child.name == name), None)
+            if node is None:
+                return None
+            candidates = node.children
+        return node
+
+    def as_mapping(self):
+        """Lazy dict-like view with the same layout as the JSON/YAML exports."""
+        return ChildrenView(self.categories())
+
+
+class Node:
+    """Handle to one node; every field is read from the map on access."""
+
+    __slots__ = ('artifact', 'index')
+
+    def __init__(self, artifact, index):
+        self.artifact = artifact
+        self.index = index
+
+    @property
+    def level(self):
+        return self.artifact.record(self.index)[0]
+
+    @property
+    def name(self):
+        return self.artifact.string(self.artifact.record(self.index)[4])
+
+    @property
+    def description(self):
+        return self.artifact.string(self.artifact.record(self.index)[5])
+
+    @property
+    def hints(self):
+        record = self.artifact.record(self.index)
+        return self.artifact._items(record[6], record[7])
+
+    @property
+    def exceptions(self):
+        record = self.artifact.record(self.index)
+        return self.artifact._items(record[8], record[9])
+
+    @property
+    def parent(self):
+        parent = self.artifact.record(self.index)[1]
+        return Node(self.artifact, parent) if parent >= 0 else None
+
+    @property
+    def child_count(self):
+        return self.artifact.record(self.index)[3]
+
+    @property
+    def children(self):
+        record = self.artifact.record(self.index)
+        return [Node(self.artifact, i) for i in range(record[2], record[2] + record[3])]
+
+    def __repr__(self):
+        return f"Node({self.index}, level={self.level}, name={self.name!r})"
+
+
+class NodeView(Mapping):
+    """A node as {'description', 'hints', 'exceptions', 'subcategories'/'types'}."""
+
+    def __init__(self, node):
+        self.node = node
+        record = node.artifact.record(node.index)
+        keys = ['description']
+        if record[7]:
+            keys.append('hints')
+        if record[9]:
+            keys.append('exceptions')
+        if record[0] in CHILD_KEYS:
+            keys.append(CHILD_KEYS[record[0]])
+        self._keys = keys
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        if key in ('subcategories', 'types'):
+            return ChildrenView(self.node.children)
+        return getattr(self.node, key)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class ChildrenView(Mapping):
+    """Name -> NodeView mapping; len() needs no string decoding."""
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self._by_name = None
+
+    def __getitem__(self, name):
+        if self._by_name is None:
+            self._by_name = {node.name: node for node in self.nodes}
+        return NodeView(self._by_name[name])
+
+    def __iter__(self):
+        return (node.name for node in self.nodes)
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else TAXONOMY_PATH
+    path = build_artifact(source)
+    with TaxonomyArtifact(path) as artifact:
+        print(f"Built {path} ({path.stat().st_size} bytes): "
+              f"{artifact.node_count} nodes, {artifact.string_count} strings")
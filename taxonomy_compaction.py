@@ -0,0 +1,219 @@
+"""Compacted prompt variants of the taxonomy with token accounting.
+
+Every variant is re-rendered from the parsed taxonomy in the Classes.txt
+layout. Compaction stages:
+
+    dedupe_hints      hints/exceptions repeated across nodes are listed once
+                      as shared notes ([م1], [م2], ...) and referenced
+    collapse_phrases  long word sequences repeated across the file are
+                      replaced by aliases («ع1», ...) defined in a glossary
+    strip_citations   legal-article citations and portal URLs are removed
+    drop_*            descriptions, hints or exceptions are dropped for the
+                      given heading levels (1 category, 2 subcategory, 3 type)
+
+'full' is the untouched Classes.txt. Token counts are exact when a Gemini
+model is passed to `count_tokens`; otherwise they are estimates.
+"""
+import argparse
+import os
+import re
+from collections import Counter
+from pathlib import Path
+
+from taxonomy import TAXONOMY_PATH, iter_events, read_source
+
+PROMPTS_DIR = TAXONOMY_PATH.parent / "prompts"
+
+VARIANTS = {
+    'full': None,
+    'normalized': {},
+    'deduplicated': {'dedupe_hints': True},
+    'compact': {'dedupe_hints': True, 'collapse_phrases': True, 'strip_citations': True},
+    'compact_no_type_exceptions': {
+        'dedupe_hints': True, 'collapse_phrases': True, 'strip_citations': True,
+        'drop_exceptions': (3,),
+    },
+    'compact_no_category_details': {
+        'dedupe_hints': True, 'collapse_phrases': True, 'strip_citations': True,
+        'drop_hints': (1,), 'drop_exceptions': (1,),
+    },
+    'descriptions_only': {'strip_citations': True, 'drop_hints': (1, 2, 3), 'drop_exceptions': (1, 2, 3)},
+    'labels_only': {'drop_descriptions': (1, 2, 3), 'drop_hints': (1, 2, 3), 'drop_exceptions': (1, 2, 3)},
+}
+
+# Shared notes shorter than this are cheaper to repeat than to reference
+MIN_NOTE_LENGTH = 30
+MIN_PHRASE_WORDS = 6
+MAX_PHRASE_WORDS = 14
+MIN_PHRASE_COUNT = 3
+MAX_PHRASES = 40
+
+_CITATION_PATTERNS = [
+    re.compile(r'\s*\((?:وفق|وفقا|وفقاً)[^)]*\)'),
+    re.compile(r'(?:،\s*)?(?:و)?(?:(?:وفق|وفقا|وفقاً)\s+)?(?:لل|ال)مادة\s[^،.:()]*'),
+    re.compile(r'\s*\(?https?://[^\s)]+\)?:?'),
+]
+
+
+def load_nodes(source=TAXONOMY_PATH):
+    """Parse the taxonomy into a flat, document-ordered list of nodes."""
+    text, _ = read_source(source)
+    return [node for event, node in iter_events(text.splitlines()) if event == 'enter']
+
+
+def _strip_citations(text):
+    for pattern in _CITATION_PATTERNS:
+        text = pattern.sub('', text)
+    text = re.sub(r'[ \t]{2,}', ' ', re.sub(r'\s+([،.:])', r'\1', text))
+    return text.strip().lstrip('،:').strip()
+
+
+def _phrase_pattern(phrase):
+    return re.compile(r'(?<!\S)' + re.escape(phrase) + r'(?!\S)')
+
+
+def _collapse_phrases(fields):
+    """Replace repeated word sequences in `fields` (a list of [text]) with aliases."""
+    counts = Counter()
+    for field in fields:
+        words = field[0].split()
+        for n in range(MIN_PHRASE_WORDS, MAX_PHRASE_WORDS + 1):
+            for i in range(len(words) - n + 1):
+                counts[' '.join(words[i:i + n])] += 1
+
+    def saving(item):
+        phrase, count = item
+        return (count - 1) * len(phrase) - 5 * count
+
+    candidates = sorted((item for item in counts.items() if item[1] >= MIN_PHRASE_COUNT), key=saving, reverse=True)
+    glossary = []
+    for phrase, _ in candidates[:MAX_PHRASES * 5]:
+        if len(glossary) >= MAX_PHRASES:
+            break
+        pattern = _phrase_pattern(phrase)
+        if sum(len(pattern.findall(field[0])) for field in fields) < MIN_PHRASE_COUNT:
+            continue
+        alias = f"«ع{len(glossary) + 1}»"
+        for field in fields:
+            field[0] = pattern.sub(alias, field[0])
+        glossary.append((alias, phrase))
+    return glossary
+
+
+def compact(source=TAXONOMY_PATH, dedupe_hints=False, collapse_phrases=False, strip_citations=False,
+            drop_descriptions=(), drop_hints=(), drop_exceptions=()):
+    """Render a compacted copy of the taxonomy text."""
+    nodes = load_nodes(source)
+
+    # Mutable one-element lists so every stage can rewrite fields in place
+    for node in nodes:
+        level = node['level']
+        node['description'] = [] if level in drop_descriptions or not node['description'] else [node['description']]
+        node['hints'] = [] if level in drop_hints else [[item] for item in node['hints']]
+        node['exceptions'] = [] if level in drop_exceptions else [[item] for item in node['exceptions']]
+
+    def all_fields():
+        for node in nodes:
+            yield from ([node['description']] if node['description'] else [])
+            yield from node['hints']
+            yield from node['exceptions']
+
+    if strip_citations:
+        for field in all_fields():
+            field[0] = _strip_citations(field[0])
+
+    notes = []
+    note_ids = {}
+    if dedupe_hints:
+        counts = Counter(item[0] for node in nodes for item in node['hints'] + node['exceptions'])
+        for node in nodes:
+            for item in node['hints'] + node['exceptions']:
+                text = item[0]
+                if counts[text] > 1 and len(text) >= MIN_NOTE_LENGTH:
+                    if text not in note_ids:
+                        note_ids[text] = f"[م{len(note_ids) + 1}]"
+                        notes.append([text])
+                    item[0] = note_ids[text]
+
+    glossary = []
+    if collapse_phrases:
+        glossary = _collapse_phrases([field for field in all_fields()] + notes)
+
+    lines = []
+    if glossary:
+        lines.append("اختصارات مستخدمة في التصنيفات:")
+        lines.extend(f"{alias} = {phrase}" for alias, phrase in glossary)
+        lines.append("")
+    if notes:
+        lines.append("ملاحظات مشتركة يشار إليها برموزها داخل التصنيفات:")
+        lines.extend(f"{note_id} {note[0]}" for note_id, note in zip(note_ids.values(), notes))
+        lines.append("")
+
+    for node in nodes:
+        lines.append(f"{'#' * node['level']} {node['name']}")
+        if node['description'] and node['description'][0]:
+            lines.append(f"الوصف: {node['description'][0]}")
+        for label, key in (('التلميحات:', 'hints'), ('الاستثناءات:', 'exceptions')):
+            items = [item[0] for item in node[key] if item[0]]
+            if items:
+                lines.append(label)
+                lines.extend(f"- {item}" for item in items)
+    return '\n'.join(lines) + '\n'
+
+
+def build_variant(name, source=TAXONOMY_PATH):
+    """Return the prompt text for a named variant."""
+    if VARIANTS[name] is None:
+        return read_source(source)[0]
+    return compact(source, **VARIANTS[name])
+
+
+def variant_path(name, source=TAXONOMY_PATH):
+    """Write the variant under Data/prompts (if changed) and return its path."""
+    if VARIANTS[name] is None:
+        return Path(source)
+    path = PROMPTS_DIR / f"{Path(source).stem}.{name}.txt"
+    text = build_variant(name, source)
+    if not path.exists() or path.read_text(encoding='utf-8') != text:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        tmp_path.write_text(text, encoding='utf-8')
+        os.replace(tmp_path, path)
+    return path
+
+
+def count_tokens(text, model=None):
+    """Return (tokens, exact). Exact counts come from the Gemini tokenizer."""
+    if model is not None:
+        return model.count_tokens(text).total_tokens, True
+    # Rough estimate for Arabic text without a tokenizer: ~2.5 chars per token
+    return round(len(text) / 2.5), False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build compacted taxonomy prompt variants and count their tokens.")
+    parser.add_argument('--key-id', type=int, default=None, help="use GEMINI_API_KEY_<id> for exact token counts")
+    parser.add_argument('--write', action='store_true', help="write the variants to Data/prompts")
+    args = parser.parse_args()
+
+    model = None
+    if args.key_id is not None:
+        import google.generativeai as genai
+        from classifier import create_model
+        genai.configure(api_key=os.environ[f"GEMINI_API_KEY_{args.key_id}"])
+        model = create_model()
+
+    full_tokens = None
+    print(f"{'variant':<30}{'chars':>10}{'tokens':>10}{'saving':>9}")
+    for name in VARIANTS:
+        text = build_variant(name)
+        tokens, exact = count_tokens(text, model)
+        full_tokens = full_tokens or tokens
+        mark = '' if exact else '~'
+        print(f"{name:<30}{len(text):>10}{mark + str(tokens):>10}{1 - tokens / full_tokens:>9.1%}")
+        if args.write:
+            variant_path(name)
+
+
+if __name__ == "__main__":
+    main()
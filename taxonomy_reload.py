@@ -0,0 +1,188 @@
+"""Hot reload of the taxonomy while the app is running.
+
+`current()` returns the active TaxonomySnapshot: the memory-mapped
+artifact, its version, the label paths of the response schema and the
+condensation vocabulary. A watcher thread checks Data/Classes.txt every
+TAXONOMY_WATCH_SECONDS (0 turns it off). When the file has changed and
+stayed unchanged for one more check, the new version is prepared in that
+thread: artifact, version manifest, the prompt upload for every configured
+key (see warmup.taxonomy_file), paths and vocabulary. Only then is the
+snapshot swapped in, with a single assignment.
+
+Results kept from an older version (speculative results, reused labels)
+stay usable when `unaffected()` finds that none of their labels fall under
+a branch that changed since (taxonomy_versions.is_affected).
+
+A request takes one snapshot when it starts and uses it to the end, so a
+request in flight during the swap finishes on the old version and saves
+that version. Later requests get chat sessions for the new version; the
+upload is already done, so creating them makes no network call. If the
+preparation fails, the old version stays active and the reload is retried
+after RETRY_SECONDS.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from classifier import taxonomy_paths
+from condensation import build_vocabulary
+from taxonomy import TAXONOMY_PATH, read_source
+from taxonomy_artifact import TaxonomyArtifact, ensure_artifact
+from taxonomy_versions import MANIFEST_PATH, affected_branches, diff_versions, is_affected, record_version
+from warmup import RETRY_SECONDS, configured_keys, taxonomy_file
+
+TAXONOMY_WATCH_SECONDS = float(os.environ.get("TAXONOMY_WATCH_SECONDS", "5"))
+
+# Older snapshots kept for requests and sessions still on them
+KEEP_VERSIONS = 3
+
+
+class TaxonomySnapshot:
+    """One taxonomy version and the indexes built from it (never modified)."""
+
+    def __init__(self, version, artifact, paths, vocabulary):
+        self.version = version
+        self.artifact = artifact
+        self.source_sha256 = artifact.source_sha256
+        self.paths = paths
+        self.vocabulary = vocabulary
+        self.loaded_at = time.time()
+
+
+def build_snapshot(source=TAXONOMY_PATH, manifest_path=MANIFEST_PATH, upload=True):
+    """Build the artifact and indexes of `source` and record its version.
+
+    With `upload`, the prompt is also uploaded for every configured key.
+    """
+    artifact = TaxonomyArtifact(ensure_artifact(source))
+    previous, version = record_version(source, manifest_path)
+    if previous and previous != version:
+        diff = diff_versions(previous, version, manifest_path)
+        print(
+            f"Taxonomy changed {previous} -> {version}: "
+            f"{len(diff['added'])} added, {len(diff['removed'])} removed, {len(diff['modified'])} modified; "
+            f"affected branches: {sorted(affected_branches(diff))}"
+        )
+    snapshot = TaxonomySnapshot(version, artifact, taxonomy_paths(artifact), build_vocabulary(source))
+    if upload:
+        for key_id in configured_keys():
+            taxonomy_file(key_id, version)
+    return snapshot
+
+
+class TaxonomyReloader:
+    """Holds the active snapshot and swaps in a new one when the source changes."""
+
+    def __init__(self, source=TAXONOMY_PATH, manifest_path=MANIFEST_PATH, interval=TAXONOMY_WATCH_SECONDS):
+        self.source = source
+        self.manifest_path = manifest_path
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active = None
+        self._snapshots = OrderedDict()  # version -> snapshot, newest last
+        self._thread = None
+        self._affected = {}  # (old version, new version) -> affected node keys
+        self._counters = {'reloads': 0, 'unchanged': 0, 'failed': 0, 'last_build_seconds': None}
+
+    def current(self):
+        """The active snapshot; the first call loads it and starts the watcher."""
+        active = self._active
+        if active is not None:
+            return active
+        with self._lock:
+            if self._active is None:
+                self._publish(build_snapshot(self.source, self.manifest_path, upload=False))
+                self._start_watcher()
+            return self._active
+
+    def snapshot(self, version):
+        """The snapshot of a recent `version`, or the active one if it is gone."""
+        return self._snapshots.get(version) or self.current()
+
+    def unaffected(self, labels, version, snapshot=None):
+        """True if labels classified under `version` are still valid in `snapshot` (default: active).
+
+        False if `version` is unknown to the manifest, so it cannot be compared.
+        """
+        snapshot = snapshot or self.current()
+        if version == snapshot.version:
+            return True
+        pair = (version, snapshot.version)
+        if pair not in self._affected:
+            try:
+                self._affected[pair] = affected_branches(diff_versions(*pair, self.manifest_path))
+            except KeyError:
+                self._affected[pair] = None
+        affected = self._affected[pair]
+        return affected is not None and not is_affected(labels, affected)
+
+    def _publish(self, snapshot):
+        snapshots = OrderedDict(self._snapshots)
+        snapshots[snapshot.version] = snapshot
+        snapshots.move_to_end(snapshot.version)
+        while len(snapshots) > KEEP_VERSIONS:
+            snapshots.popitem(last=False)
+        self._snapshots = snapshots
+        self._active = snapshot
+
+    def _start_watcher(self):
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name='taxonomy-reload', daemon=True)
+            self._thread.start()
+
+    def _stat(self):
+        stat = os.stat(self.source)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _watch(self):
+        loaded = seen = self._stat()
+        retry_at = 0.0
+        while True:
+            time.sleep(self.interval)
+            try:
+                stat = self._stat()
+            except OSError:
+                continue  # the file is being replaced
+            if stat != seen:
+                seen = stat  # wait until the file stops changing
+                continue
+            if stat == loaded or time.time() < retry_at:
+                continue
+            if self.reload():
+                loaded = stat
+            else:
+                retry_at = time.time() + RETRY_SECONDS
+
+    def reload(self):
+        """Prepare the current source and make it active; returns False if it failed."""
+        if read_source(self.source)[1] == self._active.source_sha256:
+            self._counters['unchanged'] += 1
+            return True
+        start_time = time.time()
+        try:
+            snapshot = build_snapshot(self.source, self.manifest_path)
+        except Exception as e:
+            self._counters['failed'] += 1
+            print(f"Taxonomy reload failed, keeping {self._active.version}: {e}")
+            return False
+        if read_source(self.source)[1] != snapshot.source_sha256:
+            print("Taxonomy changed again during the reload; retrying")
+            return False
+        previous = self._active.version
+        with self._lock:
+            self._publish(snapshot)
+        self._counters['reloads'] += 1
+        self._counters['last_build_seconds'] = round(time.time() - start_time, 2)
+        print(f"Taxonomy reloaded {previous} -> {snapshot.version} "
+              f"(prepared in {self._counters['last_build_seconds']:.2f} seconds)")
+        return True
+
+    def stats(self):
+        active = self._active
+        return {**self._counters, 'version': active.version if active else None,
+                'versions': list(self._snapshots)}
+
+
+# Shared by every session in the process
+reloader = TaxonomyReloader()
@@ -0,0 +1,172 @@
+"""Merkle hashes over the taxonomy tree, a persisted version manifest and diffs.
+
+Every category/subcategory/type gets a `content` hash (its own name,
+description, hints and exceptions) and a `hash` covering its content and
+its children's hashes, so an unchanged subtree can be skipped without
+looking inside it. The taxonomy version is derived from the category hashes.
+"""
+import datetime
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+from taxonomy import TAXONOMY_PATH, iter_events, read_source
+
+MANIFEST_PATH = TAXONOMY_PATH.with_name('Classes.versions.json')
+
+# Joins category/subcategory/type names into node keys
+PATH_SEPARATOR = ' > '
+
+
+def _digest(parts):
+    h = hashlib.sha256()
+    for part in parts:
+        data = str(part).encode('utf-8')
+        h.update(len(data).to_bytes(4, 'little'))
+        h.update(data)
+    return h.hexdigest()
+
+
+def node_key(labels):
+    """Join a category/subcategory/type path into a node key."""
+    return PATH_SEPARATOR.join(labels)
+
+
+def parent_key(key):
+    return key.rpartition(PATH_SEPARATOR)[0]
+
+
+def hash_nodes(source=TAXONOMY_PATH):
+    """Hash every node of `source`.
+
+    Returns (version, nodes) where nodes maps each node key to its
+    {'content': ..., 'hash': ...} digests.
+    """
+    text, _ = read_source(source)
+    nodes = {}
+    roots = []
+    stack = []
+    for event, value in iter_events(text.splitlines()):
+        if event == 'enter':
+            key = f"{stack[-1][0]}{PATH_SEPARATOR}{value['name']}" if stack else value['name']
+            content = _digest([
+                value['level'], value['name'], value['description'],
+                len(value['hints']), *value['hints'], *value['exceptions'],
+            ])
+            stack.append((key, content, []))
+        else:
+            key, content, children = stack.pop()
+            subtree = _digest([content, *children])
+            nodes[key] = {'content': content, 'hash': subtree}
+            (stack[-1][2] if stack else roots).append(subtree)
+    return _digest(roots)[:16], nodes
+
+
+def load_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'current': None, 'versions': {}}
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def record_version(source=TAXONOMY_PATH, manifest_path=MANIFEST_PATH):
+    """Hash `source`, store it in the manifest and mark it current.
+
+    Returns (previous_version, current_version); they are equal when the
+    taxonomy content has not changed since the last call.
+    """
+    version, nodes = hash_nodes(source)
+    manifest = load_manifest(manifest_path)
+    previous = manifest.get('current')
+    if previous == version and version in manifest['versions']:
+        return previous, version
+
+    manifest['versions'].setdefault(version, {
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'source_sha256': read_source(source)[1],
+        'nodes': nodes,
+    })
+    manifest['current'] = version
+    save_manifest(manifest, manifest_path)
+    return previous, version
+
+
+def _children_index(nodes):
+    children = {}
+    for key in nodes:
+        children.setdefault(parent_key(key), []).append(key)
+    return children
+
+
+def diff_nodes(old, new):
+    """Structural diff of two node maps, descending only into changed subtrees.
+
+    Returns {'added': [...], 'removed': [...], 'modified': [...]} where
+    modified nodes exist in both versions with different own content.
+    """
+    old_children = _children_index(old)
+    new_children = _children_index(new)
+    diff = {'added': [], 'removed': [], 'modified': []}
+
+    pending = ['']
+    while pending:
+        parent = pending.pop()
+        for key in new_children.get(parent, []):
+            if key not in old:
+                diff['added'].append(key)
+            elif old[key]['hash'] != new[key]['hash']:
+                if old[key]['content'] != new[key]['content']:
+                    diff['modified'].append(key)
+                pending.append(key)
+        for key in old_children.get(parent, []):
+            if key not in new:
+                diff['removed'].append(key)
+    return diff
+
+
+def diff_versions(old_version, new_version, manifest_path=MANIFEST_PATH):
+    manifest = load_manifest(manifest_path)
+    versions = manifest['versions']
+    return diff_nodes(versions[old_version]['nodes'], versions[new_version]['nodes'])
+
+
+def affected_branches(diff):
+    """Node keys whose stored results may no longer be valid.
+
+    Removed and modified nodes are affected themselves; an added node
+    affects its parent, since cases filed under the parent may now belong
+    to the new child. The empty key means a category was added and
+    everything is affected.
+    """
+    affected = set(diff['removed']) | set(diff['modified'])
+    affected.update(parent_key(key) for key in diff['added'])
+    return affected
+
+
+def is_affected(labels, affected):
+    """True if any prefix of a category/subcategory/type path is affected."""
+    if '' in affected:
+        return True
+    key = ''
+    for label in labels:
+        key = f"{key}{PATH_SEPARATOR}{label}" if key else label
+        if key in affected:
+            return True
+    return False
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else TAXONOMY_PATH
+    previous, version = record_version(source)
+    print(f"Taxonomy version {version} recorded in {MANIFEST_PATH}"
+          + (f" (previous {previous})" if previous and previous != version else ""))
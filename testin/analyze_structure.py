@@ -1,8 +1,14 @@
 import yaml
 import json
 import os
+import sys
 from collections import defaultdict
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from taxonomy_artifact import TaxonomyArtifact, ensure_artifact
+from taxonomy_versions import diff_versions, load_manifest, record_version
+
 def read_yaml_file(file_path):
     with open(file_path, 'r', encoding='utf-8') as file:
         return yaml.safe_load(file)
@@ -11,6 +17,10 @@ def read_json_file(file_path):
     with open(file_path, 'r', encoding='utf-8') as file:
         return json.load(file)
 
+def read_artifact_file(file_path=None):
+    # Lazy mapping over the memory-mapped artifact; counts need no string decoding
+    return TaxonomyArtifact(file_path or ensure_artifact()).as_mapping()
+
 def count_structure(data):
     main_count = len(data)
     sub_count = 0
@@ -62,6 +72,15 @@ def print_all_types(data, file):
                     for type_item in sub_data['types']:
                         file.write(f"│   └── Type: {type_item}\n")
 
+def write_version_diff(file, previous, version):
+    diff = diff_versions(previous, version)
+    file.write(f"\nChanges since version {previous}:\n")
+    file.write("=" * 50 + "\n")
+    for change in ('added', 'removed', 'modified'):
+        file.write(f"{change.capitalize()}: {len(diff[change])}\n")
+        for key in diff[change]:
+            file.write(f"├── {key}\n")
+
 def main():
     # Get the directory where the script is located
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -71,31 +90,26 @@ def main():
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
     
     with open(output_file, 'w', encoding='utf-8') as f:
-        # Analyze YAML file
-        yaml_data = read_yaml_file('details.yaml')
-        yaml_main, yaml_sub, yaml_types, yaml_structure = count_structure(yaml_data)
+        # Analyze the compiled taxonomy artifact
+        data = read_artifact_file()
+        main_count, sub_count, types_count, structure = count_structure(data)
         
-        f.write("\nYAML File Analysis:\n")
+        f.write("\nTaxonomy Artifact Analysis:\n")
         f.write("=" * 50 + "\n")
-        f.write(f"Main categories: {yaml_main}\n")
-        f.write(f"Subcategories: {yaml_sub}\n")
-        f.write(f"Types: {yaml_types}\n")
-        
-        write_detailed_structure(f, yaml_structure)
-        print_all_types(yaml_data, f)
+        f.write(f"Main categories: {main_count}\n")
+        f.write(f"Subcategories: {sub_count}\n")
+        f.write(f"Types: {types_count}\n")
         
-        # Analyze JSON file
-        json_data = read_json_file('details.json')
-        json_main, json_sub, json_types, json_structure = count_structure(json_data)
+        write_detailed_structure(f, structure)
+        print_all_types(data, f)
         
-        f.write("\nJSON File Analysis:\n")
+        # Record the Merkle-hashed version and diff it against the previous one
+        _, version = record_version()
+        f.write(f"\nTaxonomy Version: {version}\n")
         f.write("=" * 50 + "\n")
-        f.write(f"Main categories: {json_main}\n")
-        f.write(f"Subcategories: {json_sub}\n")
-        f.write(f"Types: {json_types}\n")
-        
-        write_detailed_structure(f, json_structure)
-        print_all_types(json_data, f)
+        versions = list(load_manifest()['versions'])
+        if versions.index(version) > 0:
+            write_version_diff(f, versions[versions.index(version) - 1], version)
         
         print(f"Analysis has been written to {output_file}")
 
@@ -0,0 +1,125 @@
+"""Simulate a burst of classification load through the admission controller.
+
+--users interactive users each fire --requests back-to-back calls while a
+batch job runs --batch calls on --batch-workers threads, retrying rejected
+calls after --backoff seconds. Every call sleeps for a lognormal latency
+around --latency seconds (standing in for send_message).
+The report shows peak concurrency, rejections, waits per priority, and how
+evenly the interactive users were served (Jain's index over completed
+calls, 1.0 = perfectly even), with and without admission control.
+
+    python benchmark_admission.py --users 20 --requests 5 --batch 100
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import AdmissionController, Overloaded
+
+
+class Unlimited:
+    """Stand-in with the controller's interface and no limit (the old behaviour)."""
+
+    def acquire(self, user_id, priority='interactive', on_wait=None):
+        pass
+
+    def release(self):
+        pass
+
+
+def run(controller, args):
+    rng = random.Random(5)
+    lock = threading.Lock()
+    state = {'active': 0, 'peak': 0}
+    results = []
+
+    def call(user_id, priority):
+        """Returns False if the call was rejected."""
+        start = time.monotonic()
+        try:
+            controller.acquire(user_id, priority)
+        except Overloaded as e:
+            with lock:
+                results.append((user_id, priority, None, e.reason))
+            return False
+        waited = time.monotonic() - start
+        with lock:
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+            latency = rng.lognormvariate(0, 0.3) * args.latency
+        try:
+            time.sleep(latency)
+        finally:
+            with lock:
+                state['active'] -= 1
+            controller.release()
+        with lock:
+            results.append((user_id, priority, waited, None))
+        return True
+
+    def user(user_id, count):
+        for _ in range(count):
+            call(user_id, 'interactive')
+
+    def batch_worker(count):
+        for _ in range(count):
+            while not call('batch-job', 'batch'):
+                time.sleep(args.backoff)
+
+    threads = [threading.Thread(target=user, args=(f"user-{i}", args.requests)) for i in range(args.users)]
+    per_worker = [args.batch // args.batch_workers + (i < args.batch % args.batch_workers)
+                  for i in range(args.batch_workers)]
+    threads += [threading.Thread(target=batch_worker, args=(count,)) for count in per_worker]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, state['peak'], time.monotonic() - start
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def report(name, results, peak, elapsed, users):
+    print(f"\n{name}: peak concurrency {peak}, {elapsed:.1f}s total")
+    for priority in ('interactive', 'batch'):
+        rows = [row for row in results if row[1] == priority]
+        waits = [row[2] for row in rows if row[2] is not None]
+        rejected = len(rows) - len(waits)
+        print(f"  {priority:<12} done {len(waits):>4}  rejected {rejected:>4}  "
+              f"wait p50 {percentile(waits, 0.5):.2f}s  p95 {percentile(waits, 0.95):.2f}s")
+    done = [sum(1 for row in results if row[0] == f"user-{i}" and row[2] is not None) for i in range(users)]
+    if any(done):
+        fairness = sum(done) ** 2 / (len(done) * sum(count * count for count in done))
+        print(f"  interactive fairness (Jain) {fairness:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Burst load with and without admission control.")
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=5, help="calls per interactive user")
+    parser.add_argument('--batch', type=int, default=100, help="calls made by the batch job")
+    parser.add_argument('--batch-workers', type=int, default=4)
+    parser.add_argument('--backoff', type=float, default=0.2, help="batch retry delay after a rejection (s)")
+    parser.add_argument('--latency', type=float, default=0.2, help="median simulated call latency (s)")
+    parser.add_argument('--max-concurrent', type=int, default=8)
+    parser.add_argument('--max-queued', type=int, default=32)
+    parser.add_argument('--timeout', type=float, default=10.0)
+    args = parser.parse_args()
+
+    report("no admission control", *run(Unlimited(), args), args.users)
+    controller = AdmissionController(args.max_concurrent, args.max_queued, timeout=args.timeout)
+    report("admission control", *run(controller, args), args.users)
+    print(f"\n{controller.stats()}")
+
+
+if __name__ == "__main__":
+    main()
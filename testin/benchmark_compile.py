@@ -0,0 +1,66 @@
+"""Benchmark the single-pass compiler against the legacy converter scripts.
+
+Legacy pipeline: convert_formats (parse + JSON + YAML dump),
+text_to_json_converter, yaml_to_csv_converter (reparses YAML) and
+analyze_structure (reparses YAML and JSON). All outputs go to a temp dir.
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+import analyze_structure
+import convert_formats
+import text_to_json_converter
+import yaml_to_csv_converter
+from compile_taxonomy import compile_taxonomy
+from taxonomy import TAXONOMY_PATH
+
+ROUNDS = 5
+
+
+def run_legacy(source, out_dir):
+    data = convert_formats.parse_text_file(source)
+    json_path = os.path.join(out_dir, 'legacy.json')
+    yaml_path = os.path.join(out_dir, 'legacy.yaml')
+    convert_formats.save_as_json(data, json_path)
+    convert_formats.save_as_yaml(data, yaml_path)
+    text_to_json_converter.parse_text_to_json(source)
+    with redirect_stdout(io.StringIO()):
+        yaml_to_csv_converter.flatten_yaml_to_csv(yaml_path, os.path.join(out_dir, 'legacy.csv'))
+    with open(os.path.join(out_dir, 'legacy_structure.txt'), 'w', encoding='utf-8') as f:
+        for loaded in (analyze_structure.read_yaml_file(yaml_path), analyze_structure.read_json_file(json_path)):
+            _, _, _, structure = analyze_structure.count_structure(loaded)
+            analyze_structure.write_detailed_structure(f, structure)
+            analyze_structure.print_all_types(loaded, f)
+
+
+def best_of(func, rounds=ROUNDS):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else str(TAXONOMY_PATH)
+    with tempfile.TemporaryDirectory() as out_dir:
+        legacy = best_of(lambda: run_legacy(source, out_dir))
+        full = best_of(lambda: compile_taxonomy(source, out_dir, force=True))
+        cached = best_of(lambda: compile_taxonomy(source, out_dir))
+
+    print(f"Source: {source}")
+    print(f"Legacy scripts:           {legacy * 1000:8.1f} ms")
+    print(f"Single-pass compile:      {full * 1000:8.1f} ms  ({legacy / full:.1f}x)")
+    print(f"Unchanged source (skip):  {cached * 1000:8.1f} ms  ({legacy / cached:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Label latency vs. explanation latency for the EXPLANATION_MODE settings.
+
+Every case is classified twice in a fresh chat:
+
+    inline       one call returning labels and explanation (the original prompt)
+    labels-only  a labels-only call, then a separate explanation call
+
+The report shows the time until the labels are available in each mode,
+the explanation call's latency, and the output tokens of the labels calls.
+Needs GEMINI_API_KEY_<key-id>. The input file is a CSV or JSONL with a
+text column (the evaluate_prompts.py labelled set works).
+
+    python benchmark_explanations.py cases.jsonl --key-id 1 --limit 30
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import google.generativeai as genai
+
+from classifier import (create_explanation_model, create_model, generate_explanation,
+                        parse_response)
+from taxonomy_compaction import build_variant
+
+
+def load_texts(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        if file_path.endswith('.jsonl'):
+            return [json.loads(line)['text'] for line in f if line.strip()]
+        return [row['text'] for row in csv.DictReader(f)]
+
+
+def timed_send(model, prompt, text):
+    chat = model.start_chat(history=[{"role": "user", "parts": [prompt]}])
+    start_time = time.time()
+    response = chat.send_message(text)
+    return time.time() - start_time, response
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare label and explanation latency per explanation mode.")
+    parser.add_argument('cases', help="CSV or JSONL with a text column")
+    parser.add_argument('--key-id', type=int, default=1)
+    parser.add_argument('--variant', default='full', help="taxonomy prompt variant")
+    parser.add_argument('--limit', type=int, default=None, help="only use the first N cases")
+    args = parser.parse_args()
+
+    genai.configure(api_key=os.environ[f"GEMINI_API_KEY_{args.key_id}"])
+    inline_model = create_model()
+    labels_model = create_model(labels_only=True)
+    explanation_model = create_explanation_model()
+    prompt = build_variant(args.variant)
+    texts = load_texts(args.cases)[:args.limit]
+
+    results = {'inline labels': [], 'labels-only labels': [], 'explanation call': []}
+    output_tokens = {'inline labels': [], 'labels-only labels': []}
+    for i, text in enumerate(texts, 1):
+        duration, response = timed_send(inline_model, prompt, text)
+        results['inline labels'].append(duration)
+        output_tokens['inline labels'].append(response.usage_metadata.candidates_token_count)
+
+        duration, response = timed_send(labels_model, prompt, text)
+        results['labels-only labels'].append(duration)
+        output_tokens['labels-only labels'].append(response.usage_metadata.candidates_token_count)
+
+        data = parse_response(response.text)
+        if data:
+            start_time = time.time()
+            generate_explanation(explanation_model, text, [data[key] for key in ('category', 'subcategory', 'type')])
+            results['explanation call'].append(time.time() - start_time)
+        print(f"{i}/{len(texts)}", end="\r", flush=True)
+
+    print(f"\n{'':<22}{'p50':>8}{'p95':>8}{'mean':>8}{'out tokens':>12}")
+    for name, durations in results.items():
+        tokens = output_tokens.get(name)
+        mean_tokens = f"{sum(tokens) / len(tokens):.0f}" if tokens else '-'
+        print(f"{name:<22}{percentile(durations, 0.5):>7.2f}s{percentile(durations, 0.95):>7.2f}s"
+              f"{sum(durations) / max(1, len(durations)):>7.2f}s{mean_tokens:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Report the p99 latency gained by hedging against the extra calls it costs.
+
+Replays a latency distribution request by request with the app's hedging
+policy (hedging.LatencyTracker and hedging.HedgeBudget): hedge delay =
+percentile of recent primary latencies, backup latency drawn independently,
+result = min(primary, delay + backup). Latencies come from the duration
+column of history.db when it has at least --min-rows model calls, otherwise
+from a synthetic distribution (lognormal around 3 s with a 5% slow tail).
+
+    python benchmark_hedging.py --db ../history.db --requests 20000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedging import HEDGE_MIN_DELAY, HEDGE_WINDOW, HedgeBudget, LatencyTracker
+from history_db import recent_durations
+
+PERCENTILES = (0.9, 0.95, 0.99)
+BUDGETS = (0.02, 0.05, 0.1)
+
+
+def load_durations(db_path, min_rows):
+    if db_path and os.path.exists(db_path):
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            durations = recent_durations(conn, -1)
+        except sqlite3.OperationalError:
+            # Not migrated yet (no model_duration column): the rows predate reuse,
+            # queueing and speculation, so every duration is a model call
+            durations = [float(row[0]) for row in conn.execute(
+                'SELECT duration FROM classifications WHERE duration IS NOT NULL')]
+        conn.close()
+        durations = [d for d in durations if d > 0]
+        if len(durations) >= min_rows:
+            return durations, f"{len(durations)} durations from {db_path}"
+    return None, "synthetic lognormal latencies with a 5% slow tail"
+
+
+def synthetic_latency(rng):
+    latency = rng.lognormvariate(1.1, 0.25)
+    if rng.random() < 0.05:
+        latency *= rng.uniform(2, 6)
+    return latency
+
+
+def quantile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def simulate(draw, requests, percentile, budget_fraction, min_delay):
+    tracker = LatencyTracker(window=HEDGE_WINDOW)
+    budget = HedgeBudget(budget_fraction, window=HEDGE_WINDOW)
+    baseline, hedged_latencies = [], []
+    hedges = 0
+    for _ in range(requests):
+        primary = draw()
+        slot = budget.request()
+        threshold = tracker.percentile(percentile)
+        latency = primary
+        if threshold is not None:
+            delay = max(min_delay, threshold)
+            if primary > delay and budget.try_spend(slot):
+                hedges += 1
+                latency = min(primary, delay + draw())
+        tracker.record(primary)
+        baseline.append(primary)
+        hedged_latencies.append(latency)
+    return baseline, hedged_latencies, hedges / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate hedging: p99 improvement vs extra call rate.")
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'history.db'))
+    parser.add_argument('--min-rows', type=int, default=200, help="use history.db only with at least this many rows")
+    parser.add_argument('--requests', type=int, default=20_000)
+    parser.add_argument('--min-delay', type=float, default=HEDGE_MIN_DELAY)
+    args = parser.parse_args()
+
+    durations, source = load_durations(args.db, args.min_rows)
+    print(f"Latencies: {source}")
+
+    print(f"{'percentile':>10}{'budget':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'p99 gain':>10}{'extra calls':>13}")
+    for percentile in PERCENTILES:
+        for budget in BUDGETS:
+            rng = random.Random(11)
+            draw = (lambda: rng.choice(durations)) if durations else (lambda: synthetic_latency(rng))
+            baseline, hedged, extra = simulate(draw, args.requests, percentile, budget, args.min_delay)
+            gain = 1 - quantile(hedged, 0.99) / quantile(baseline, 0.99)
+            print(f"{percentile:>10.2f}{budget:>8.0%}{quantile(hedged, 0.5):>7.2f}s{quantile(hedged, 0.95):>7.2f}s"
+                  f"{quantile(hedged, 0.99):>7.2f}s{gain:>10.1%}{extra:>13.1%}")
+    print(f"{'no hedging':>18}{quantile(baseline, 0.5):>7.2f}s{quantile(baseline, 0.95):>7.2f}s{quantile(baseline, 0.99):>7.2f}s")
+    print("Each extra call costs one more full request (input and output tokens).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark per-user history queries against total table size.
+
+Fills a temporary history.db (schema from history_db.init_db) with
+--per-user rows for each of a growing number of users, then times the
+app's per-user history query and the old unscoped query at each size.
+
+    python benchmark_history.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import history_db
+
+USER_QUERY = 'SELECT * FROM classifications WHERE user_id = ? ORDER BY created_at DESC'
+GLOBAL_QUERY = 'SELECT * FROM classifications ORDER BY created_at DESC'
+
+
+def fill(conn, start, stop, per_user):
+    rows = []
+    for i in range(start, stop):
+        rows.append((str(uuid.uuid4()), f"user-{i // per_user}", "نص الدعوى " * 20, 'تجاري', 'الشركات', 'لا يوجد',
+                     'شرح', '1.00', f"2026-01-01 00:{(i // 60) % 60:02d}:{i % 60:02d}"))
+    conn.executemany('''
+        INSERT INTO classifications
+        (id, user_id, input_text, main_classification, sub_classification, case_type, explanation, duration, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+
+
+def timed(conn, query, params=(), repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = conn.execute(query, params).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time per-user history queries as the table grows.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--per-user', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        history_db.DB_PATH = os.path.join(directory, 'history.db')
+        conn = history_db.init_db()
+        plan = conn.execute('EXPLAIN QUERY PLAN ' + USER_QUERY, ('user-0',)).fetchall()
+        print(f"Plan: {' / '.join(row[-1] for row in plan)}")
+
+        print(f"{'rows':>10}{'user query ms':>15}{'user rows':>11}{'unscoped ms':>13}")
+        filled = 0
+        for size in sorted(args.sizes):
+            fill(conn, filled, size, args.per_user)
+            filled = size
+            user_ms, user_rows = timed(conn, USER_QUERY, (f"user-{size // args.per_user // 2}",))
+            global_ms, _ = timed(conn, GLOBAL_QUERY, repeat=1)
+            print(f"{size:>10,}{user_ms:>15.2f}{user_rows:>11}{global_ms:>13.1f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
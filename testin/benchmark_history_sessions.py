@@ -0,0 +1,88 @@
+"""Memory held for history as the number of concurrent sessions grows.
+
+Like the app, every session has its own user id (app.get_user_id), so no
+two sessions share rows. Fills a temporary history.db with --rows rows per
+session. Each session then reads its history in two ways, and the Python
+memory still held afterwards is measured with tracemalloc (with the time to
+fill the cache):
+
+    per-session copy   every session keeps its own list of its rows
+                       (st.session_state.history before the cache)
+    shared cache       sessions keep a page number; rows live in
+                       history_db.HistoryCache, which keeps at most
+                       --cache-users users
+
+    python benchmark_history_sessions.py --rows 500 --sessions 10 50 200 --cache-users 1000 50
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import history_db
+
+
+def fill(conn, sessions, rows):
+    conn.executemany('''
+        INSERT INTO classifications
+        (id, user_id, input_text, main_classification, sub_classification, case_type, explanation, duration)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(str(uuid.uuid4()), f"session-{i % sessions}", "نص الدعوى " * 20, 'تجاري', 'الشركات', 'لا يوجد', 'شرح', '1.00')
+          for i in range(sessions * rows)])
+    conn.commit()
+
+
+def measure(build):
+    """(MB held by what `build` returns, seconds to build it)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return current / 1e6, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="History memory vs. concurrent sessions.")
+    parser.add_argument('--rows', type=int, default=500, help="history rows per session")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--cache-users', type=int, nargs='+', default=[history_db.HISTORY_CACHE_USERS])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history_db.DB_PATH = os.path.join(tmp, 'history.db')
+        conn = history_db.init_db()
+        fill(conn, max(args.sessions), args.rows)
+        history_db.load_user_history(conn, 'session-0')  # import pandas outside the measurement
+        print(f"one user id per session, {args.rows} rows each")
+        print(f"{'sessions':>9}{'cache users':>13}{'per-session copy':>20}{'shared cache':>16}{'cache load':>12}")
+        for sessions in args.sessions:
+            users = [f"session-{i}" for i in range(sessions)]
+
+            copies, _ = measure(lambda: [history_db.load_user_history(conn, user) for user in users])
+
+            for max_users in args.cache_users:
+                def shared():
+                    cache = history_db.HistoryCache(max_users)
+                    pages = [0] * sessions  # all a session keeps
+                    for user, page in zip(users, pages):
+                        cache.page(user, page)
+                    return cache, pages
+
+                cached, elapsed = measure(shared)
+                print(f"{sessions:>9}{max_users:>13}{copies:>17.1f} MB{cached:>13.1f} MB{elapsed:>11.2f}s")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
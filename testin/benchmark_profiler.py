@@ -0,0 +1,105 @@
+"""Measure the overhead of the sampling profiler (profiling.py).
+
+Two workloads are timed with profiling off and with every run profiled:
+
+    compaction   taxonomy_compaction.compact(), pure-Python CPU work
+    app          first load + classify + new case of app.py under AppTest,
+                 with an instant stand-in chat session
+
+The overhead at a sampling fraction r is roughly r times the fully
+profiled overhead. Profiles are written to a temporary directory.
+
+    python benchmark_profiler.py --runs 20 --interval-ms 5
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import profiling
+from taxonomy_compaction import VARIANTS, compact
+
+CASE_TEXT = "نزاع بين الشركاء في شركة تضامن حول توزيع الأرباح وتصفية حصة أحد الشركاء بعد انسحابه."
+RESPONSE = {'category': 'تجاري', 'subcategory': 'الشركات', 'type': 'لا يوجد', 'explanation': 'شرح'}
+SAMPLE_RATES = (0.01, 0.05, 0.1)
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class StandInChat:
+    """Replaces the Gemini chat session; answers instantly with a fixed label."""
+
+    def send_message(self, content):
+        return _Response(json.dumps(RESPONSE, ensure_ascii=False))
+
+
+def compaction_workload():
+    with profiling.profile('benchmark'):
+        compact(**VARIANTS['compact'])
+
+
+def app_workload():
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=60)
+    at.session_state.chat_session = StandInChat()
+    at.run()
+    at.text_area(key="rtl_input").input(CASE_TEXT)
+    at.button[0].click().run()
+    at.button[1].click().run()
+
+
+def timed(workload, runs):
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        workload()
+        durations.append(time.perf_counter() - start)
+    return sorted(durations)[len(durations) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the sampling profiler's overhead.")
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--interval-ms', type=float, default=profiling.PROFILE_INTERVAL_MS)
+    args = parser.parse_args()
+
+    os.environ['SIMILARITY_REUSE'] = '0'
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)  # history.db is opened relative to the working directory
+    profiling.PROFILE_DIR = Path(workdir) / "profiles"
+    profiling._sampler.interval = args.interval_ms / 1000
+
+    print(f"Sampling interval {args.interval_ms:g} ms, median of {args.runs} runs")
+    try:
+        for name, workload in (('compaction', compaction_workload), ('app', app_workload)):
+            workload()  # warm caches and imports
+            profiling.PROFILE_SAMPLE_RATE = 0
+            off = timed(workload, args.runs)
+            profiling.PROFILE_SAMPLE_RATE = 1
+            sampling_before = profiling._sampler.sampling_seconds
+            on = timed(workload, args.runs)
+            sampling = (profiling._sampler.sampling_seconds - sampling_before) / args.runs
+            overhead = on / off - 1
+            projected = ', '.join(f"{rate:.0%}: {overhead * rate:+.2%}" for rate in SAMPLE_RATES)
+            print(f"{name:<11} off {off * 1000:7.1f} ms   profiled {on * 1000:7.1f} ms   "
+                  f"overhead {overhead:+.1%} (sampler {sampling * 1000:.1f} ms/run)   at sample rate {projected}")
+        profiles = len(list(profiling.PROFILE_DIR.glob('*.folded')))
+        print(f"{profiles} profiles written")
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Edit the taxonomy under load and measure the hot reload (taxonomy_reload.py).
+
+A copy of Classes.txt in a temporary directory is watched by its own
+TaxonomyReloader. --threads simulated requests run back to back: each takes
+the active snapshot, looks up a category in its artifact, then waits
+--latency seconds (the model call). After --before seconds a type is added
+to the copy. The report shows how long the reload took to prepare, the time
+each request spent getting its snapshot and a label before, during and after
+the reload, and how many requests started on the old version and finished
+after the swap. No upload is made unless GEMINI_API_KEY_<n> is set.
+
+    python benchmark_reload.py --threads 16 --latency 0.2
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from taxonomy import TAXONOMY_PATH
+from taxonomy_reload import TaxonomyReloader, build_snapshot
+
+NEW_TYPE = "\n### نوع تجريبي\nالوصف: نوع أضيف لقياس إعادة التحميل.\n"
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the taxonomy hot reload under load.")
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0.2, help="simulated model call (s)")
+    parser.add_argument('--interval', type=float, default=0.5, help="watcher check interval (s)")
+    parser.add_argument('--before', type=float, default=2.0, help="seconds of load before the edit")
+    parser.add_argument('--after', type=float, default=2.0, help="seconds of load after the swap")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'Classes.txt'
+        shutil.copy(TAXONOMY_PATH, source)
+        manifest = Path(tmp) / 'Classes.versions.json'
+
+        start = time.perf_counter()
+        build_snapshot(source, manifest, upload=False)
+        print(f"Cold load (artifact, version, paths, vocabulary): {time.perf_counter() - start:.2f}s")
+
+        reloader = TaxonomyReloader(source, manifest, interval=args.interval)
+        old_version = reloader.current().version
+        stop = threading.Event()
+        lock = threading.Lock()
+        requests = []  # (started, lookup seconds, version, finished)
+
+        def request_loop():
+            while not stop.is_set():
+                started = time.perf_counter()
+                snapshot = reloader.current()
+                category = snapshot.artifact.categories()[0]
+                snapshot.artifact.find(category.name)
+                lookup = time.perf_counter() - started
+                time.sleep(args.latency)
+                with lock:
+                    requests.append((started, lookup, snapshot.version, time.perf_counter()))
+
+        threads = [threading.Thread(target=request_loop) for _ in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.before)
+        edited = time.perf_counter()
+        with open(source, 'a', encoding='utf-8') as f:
+            f.write(NEW_TYPE)
+        while reloader.current().version == old_version:
+            time.sleep(0.01)
+        swapped = time.perf_counter()
+        time.sleep(args.after)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    stats = reloader.stats()
+    print(f"Edit to swap: {swapped - edited:.2f}s (prepared in {stats['last_build_seconds']}s "
+          f"after the file settled; check interval {args.interval}s)")
+    phases = {
+        'before': [r for r in requests if r[0] < edited],
+        'during': [r for r in requests if edited <= r[0] < swapped],
+        'after': [r for r in requests if r[0] >= swapped],
+    }
+    print(f"{'phase':<8}{'requests':>10}{'lookup p50':>12}{'p99':>10}{'max':>10}")
+    for name, rows in phases.items():
+        lookups = [r[1] * 1000 for r in rows]
+        print(f"{name:<8}{len(rows):>10}{percentile(lookups, 0.5):>10.3f}ms{percentile(lookups, 0.99):>8.3f}ms"
+              f"{max(lookups, default=0):>8.3f}ms")
+    straddling = [r for r in requests if r[0] < swapped <= r[3]]
+    print(f"In flight at the swap: {len(straddling)}, "
+          f"finished on the old version: {sum(r[2] == old_version for r in straddling)}")
+    late_old = sum(r[2] == old_version for r in phases['after'])
+    print(f"Started after the swap on the old version: {late_old}; versions kept: {stats['versions']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Measure script time and bytes sent per interaction of the Streamlit app.
+
+Drives app.py headlessly with Streamlit's AppTest through first load,
+classify and new case, and reports per interaction the wall time of the
+script run(s), the number of forward messages and their serialized size
+(what the browser would receive over the websocket), and whether the run
+was a full-app or fragment rerun. Gemini is replaced by an instant stand-in
+model (see stand_in.py) so only rendering cost is measured; the
+database lives in a temporary directory.
+
+    python benchmark_reruns.py                      # current app.py
+    python benchmark_reruns.py --app old_app.py     # e.g. `git show HEAD~1:app.py > old_app.py`
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from streamlit.runtime.forward_msg_queue import ForwardMsgQueue
+from streamlit.testing.v1 import AppTest
+
+from stand_in import CASE_TEXT, use_stand_in_model
+
+_sent = {'messages': 0, 'bytes': 0, 'fragment_runs': 0, 'full_runs': 0}
+_enqueue = ForwardMsgQueue.enqueue
+_clear = ForwardMsgQueue.clear
+
+
+def _counting_enqueue(self, msg):
+    _sent['messages'] += 1
+    _sent['bytes'] += msg.ByteSize()
+    return _enqueue(self, msg)
+
+
+def _counting_clear(self, retain_lifecycle_msgs=False, fragment_ids_this_run=None):
+    # The test runner clears the queue once per script start, like AppSession
+    _sent['fragment_runs' if fragment_ids_this_run else 'full_runs'] += 1
+    return _clear(self, retain_lifecycle_msgs=retain_lifecycle_msgs, fragment_ids_this_run=fragment_ids_this_run)
+
+
+ForwardMsgQueue.enqueue = _counting_enqueue
+ForwardMsgQueue.clear = _counting_clear
+
+
+def measure(label, action):
+    for key in _sent:
+        _sent[key] = 0
+    start = time.perf_counter()
+    at = action()
+    elapsed = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(f"{label} failed: {at.exception[0].message}")
+    # Widget callbacks run at the start of the interaction's run; a keyed
+    # st.rerun() there replaces it with a fragment run before the script body
+    kind = 'fragment' if _sent['fragment_runs'] else 'full app'
+    return {'interaction': label, 'ms': elapsed, 'messages': _sent['messages'], 'bytes': _sent['bytes'], 'run': kind}
+
+
+def run_sequence(app_path):
+    at = AppTest.from_file(str(app_path), default_timeout=60)
+    results = [measure("first load", at.run)]
+    at.text_area(key="rtl_input").input(CASE_TEXT)
+    results.append(measure("classify", lambda: at.button[0].click().run()))
+    results.append(measure("new case", lambda: at.button[1].click().run()))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure script time and bytes per interaction of app.py.")
+    parser.add_argument('--app', default=str(ROOT / "app.py"), help="app script to measure")
+    parser.add_argument('--repeat', type=int, default=5, help="measured sequences (timings are averaged)")
+    args = parser.parse_args()
+
+    app_path = Path(args.app).resolve()
+    repeat = max(1, args.repeat)
+    os.environ['SIMILARITY_REUSE'] = '0'
+    use_stand_in_model()
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)  # history.db is opened relative to the working directory
+    try:
+        runs = [run_sequence(app_path) for _ in range(repeat + 1)][1:]  # first sequence warms caches
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"App: {app_path}")
+    print(f"{'interaction':<14}{'script ms':>11}{'messages':>10}{'bytes':>10}  run")
+    for i, first in enumerate(runs[0]):
+        ms = sum(run[i]['ms'] for run in runs) / len(runs)
+        print(f"{first['interaction']:<14}{ms:>11.1f}{first['messages']:>10}{first['bytes']:>10,}  {first['run']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Benchmark the similarity index: build time, query latency and reuse rate.
+
+Synthetic cases are stitched together from taxonomy sentences. Build time
+is measured on --build-rows real signatures; the index is then padded with
+random signatures up to --rows to time queries at that scale. Reuse rate
+is the share of lightly edited paraphrases (word drops/swaps) found above
+each threshold, plus the false-reuse rate on unrelated cases.
+
+    python benchmark_similarity.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from similarity_index import NUM_PERM, SimilarityIndex, signature
+from taxonomy_compaction import load_nodes
+
+THRESHOLDS = (0.6, 0.7, 0.8, 0.9)
+
+
+def taxonomy_sentences():
+    sentences = []
+    for node in load_nodes():
+        sentences.extend(part for part in [node['description']] + node['hints'] + node['exceptions'] if len(part) > 40)
+    return sentences
+
+
+def make_case(sentences, rng):
+    return ' '.join(rng.sample(sentences, 3))
+
+
+def paraphrase(text, rng, edit_rate=0.1):
+    words = text.split()
+    for _ in range(max(1, int(len(words) * edit_rate))):
+        i = rng.randrange(len(words))
+        if rng.random() < 0.5 and len(words) > 1:
+            del words[i]
+        else:
+            j = rng.randrange(len(words))
+            words[i], words[j] = words[j], words[i]
+    return ' '.join(words)
+
+
+def percentile(values, fraction):
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MinHash similarity index.")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="index size for the latency test")
+    parser.add_argument('--build-rows', type=int, default=20_000, help="real cases used to time the build")
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    sentences = taxonomy_sentences()
+    cases = [make_case(sentences, rng) for _ in range(args.build_rows)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = SimilarityIndex(directory)
+
+        start = time.perf_counter()
+        signatures = np.stack([signature(text) for text in cases])
+        index.add_signatures([f"case-{i}" for i in range(len(cases))], signatures)
+        build = time.perf_counter() - start
+        print(f"Build: {len(cases)} rows in {build:.2f}s ({len(cases) / build:,.0f} rows/s, "
+              f"~{args.rows / len(cases) * build:.0f}s projected for {args.rows:,})")
+
+        # Reuse rate on the real rows before padding
+        probes = rng.sample(range(len(cases)), min(args.queries, len(cases)))
+        paraphrases = [(f"case-{i}", paraphrase(cases[i], rng)) for i in probes]
+        unrelated = [make_case(sentences, rng) for _ in probes]
+        for threshold in THRESHOLDS:
+            reused = sum(1 for case_id, text in paraphrases if (index.query(text, threshold) or (None,))[0] == case_id)
+            false_reuse = sum(1 for text in unrelated if index.query(text, threshold))
+            print(f"Threshold {threshold:.1f}: reuse {reused / len(paraphrases):6.1%}, "
+                  f"false reuse on unrelated cases {false_reuse / len(unrelated):6.1%}")
+
+        # Pad with random signatures to reach the target size in bulk chunks
+        filler_rng = np.random.default_rng(0)
+        chunk = 100_000
+        while len(index) < args.rows:
+            size = min(chunk, args.rows - len(index))
+            filler = filler_rng.integers(0, 2 ** 32, size=(size, NUM_PERM), dtype=np.uint32)
+            index.add_signatures([f"filler-{len(index) + i}" for i in range(size)], filler)
+
+        latencies = []
+        for _, text in paraphrases:
+            start = time.perf_counter()
+            index.query(text, 0.8)
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(f"Query latency at {len(index):,} rows: p50 {percentile(latencies, 0.5):.1f} ms, "
+              f"p95 {percentile(latencies, 0.95):.1f} ms, p99 {percentile(latencies, 0.99):.1f} ms")
+        size_mb = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) / 2 ** 20
+        print(f"Index size on disk: {size_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Simulate speculative classification: click-to-result latency vs. wasted calls.
+
+Each simulated session commits --edits input changes (the text area sends
+its value on blur or Ctrl+Enter), separated by exponential pauses around
+--pause seconds, then clicks classify after a final pause. Calls take
+a lognormal latency around --latency seconds. Sessions run through
+speculation.SpeculativeSession with the given debounce, in real time
+divided by --speed.
+
+    python benchmark_speculation.py --sessions 200 --debounce 1.5 --speed 20
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from speculation import Speculator, result_key
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def simulate(args, debounce):
+    """Return click-to-result latencies (simulated seconds) and the speculator's stats."""
+    speculator = Speculator(debounce=(debounce or 0) / args.speed, max_wasted=args.max_wasted,
+                            max_workers=args.sessions * args.edits)
+    rng = random.Random(3)
+    lock = threading.Lock()
+    latencies = []
+
+    def call():
+        with lock:
+            latency = rng.lognormvariate(0, 0.3) * args.latency
+        time.sleep(latency / args.speed)
+        return {'category': '-'}
+
+    def session(number):
+        with lock:
+            pauses = [rng.expovariate(1 / args.pause) for _ in range(args.edits)]
+        speculative = speculator.session()
+        for edit, pause in enumerate(pauses):
+            key = result_key(f"case {number} edit {edit}")
+            if debounce is not None:
+                speculative.schedule(key, call)
+            time.sleep(pause / args.speed)
+        start = time.monotonic()
+        if debounce is None or speculative.claim(key, is_valid=lambda data: True) is None:
+            call()
+        with lock:
+            latencies.append((time.monotonic() - start) * args.speed)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(args.sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, speculator.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate speculative pre-classification.")
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--edits', type=int, default=2, help="input changes before the click")
+    parser.add_argument('--pause', type=float, default=4.0, help="mean pause after each change (s)")
+    parser.add_argument('--latency', type=float, default=3.0, help="median call latency (s)")
+    parser.add_argument('--debounce', type=float, nargs='+', default=[0.5, 1.5, 3.0])
+    parser.add_argument('--max-wasted', type=int, default=3)
+    parser.add_argument('--speed', type=float, default=20.0, help="simulated seconds per real second")
+    args = parser.parse_args()
+
+    print(f"{'debounce':>9}{'p50':>8}{'p95':>8}{'hit rate':>10}{'calls/click':>13}{'wasted':>8}")
+    for debounce in [None] + args.debounce:
+        latencies, stats = simulate(args, debounce)
+        calls = stats['started'] + stats['misses'] if debounce is not None else args.sessions
+        label = 'off' if debounce is None else f"{debounce:.1f}s"
+        print(f"{label:>9}{percentile(latencies, 0.5):>7.2f}s{percentile(latencies, 0.95):>7.2f}s"
+              f"{stats['hit_rate']:>10.1%}{calls / args.sessions:>13.2f}{stats['wasted']:>8}")
+
+
+if __name__ == "__main__":
+    main()
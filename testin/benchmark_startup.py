@@ -0,0 +1,103 @@
+"""Cold-start benchmark: process start to import, first render and first classification.
+
+Every sample runs in a fresh Python process, the way a new container would
+start. Each child process measures:
+
+    import                 interpreter start until streamlit is imported
+    first render           first script run of app.py (AppTest), including its imports
+    first classification   classify click until the results are rendered
+
+By default the model is an instant stand-in (see stand_in.py), so
+the numbers cover imports and rendering only. With --gemini, the first render initializes a
+real session with GEMINI_API_KEY_1, which adds the upload, and the first
+classification calls the model.
+
+    python benchmark_startup.py --samples 5
+    python benchmark_startup.py --app old_app.py     # e.g. `git show HEAD~1:app.py > old_app.py`
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from pathlib import Path
+
+from stand_in import CASE_TEXT, use_stand_in_model
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MODULES = ('google.generativeai', 'pandas', 'openpyxl', 'numpy')
+
+
+def child(app_path, use_gemini, process_start):
+    """Measure one cold start in this process and print the timings as JSON."""
+    sys.path.insert(0, str(ROOT))
+    timings = {'interpreter': time.time() - process_start}
+
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    timings['import'] = timings['interpreter'] + time.perf_counter() - start
+
+    if not use_gemini:
+        use_stand_in_model()
+    at = AppTest.from_file(str(app_path), default_timeout=300)
+    start = time.perf_counter()
+    at.run()
+    timings['first render'] = time.perf_counter() - start
+
+    at.text_area(key="rtl_input").input(CASE_TEXT)
+    start = time.perf_counter()
+    at.button[0].click().run()
+    timings['first classification'] = time.perf_counter() - start
+
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    timings['loaded'] = [name for name in MODULES
+                         if name in sys.modules and not isinstance(sys.modules[name], types.SimpleNamespace)]
+    print(json.dumps(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time cold starts of the app in fresh processes.")
+    parser.add_argument('--app', default=str(ROOT / "app.py"), help="app script to measure")
+    parser.add_argument('--samples', type=int, default=5)
+    parser.add_argument('--gemini', action='store_true', help="use a real Gemini session (GEMINI_API_KEY_1)")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--process-start', type=float, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    app_path = Path(args.app).resolve()
+    if args.child:
+        child(app_path, args.gemini, args.process_start)
+        return
+
+    env = dict(os.environ, SIMILARITY_REUSE='0')
+    workdir = tempfile.mkdtemp()  # history.db is opened relative to the working directory
+    samples = []
+    try:
+        for _ in range(args.samples):
+            command = [sys.executable, os.path.abspath(__file__), '--child', '--app', str(app_path),
+                       '--process-start', repr(time.time())]
+            if args.gemini:
+                command.append('--gemini')
+            start = time.perf_counter()
+            output = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True, check=True).stdout
+            timings = json.loads(output.strip().splitlines()[-1])
+            timings['total'] = time.perf_counter() - start
+            samples.append(timings)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"App: {app_path} ({'Gemini' if args.gemini else 'stand-in chat'}, {len(samples)} cold starts)")
+    for key in ('import', 'first render', 'first classification', 'total'):
+        values = sorted(sample[key] * 1000 for sample in samples)
+        print(f"{key:<22} median {values[len(values) // 2]:8.0f} ms   max {values[-1]:8.0f} ms")
+    print(f"Heavy modules loaded by the end: {', '.join(samples[-1]['loaded']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
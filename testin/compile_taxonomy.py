@@ -0,0 +1,297 @@
+"""Single-pass taxonomy compiler.
+
+Reads a taxonomy text file (Data/Classes.txt format) once and streams JSON,
+YAML, CSV and the structure report in the same pass, replacing
+convert_formats.py, text_to_json_converter.py, yaml_to_csv_converter.py and
+analyze_structure.py. Outputs whose source hash is unchanged are skipped.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from taxonomy import TAXONOMY_PATH, iter_events, read_source
+
+# Bump when the output layout changes so existing outputs are rebuilt
+COMPILER_VERSION = 1
+
+FORMATS = ('json', 'yaml', 'csv', 'report')
+
+CHILD_KEYS = {1: 'subcategories', 2: 'types'}
+
+# Characters PyYAML refuses (or folds) inside double-quoted scalars
+_YAML_UNSAFE = re.compile('[\x7f-\x84\x86-\x9f\u2028\u2029\ufeff\ufffe\uffff]')
+
+
+def _json_str(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _yaml_str(value):
+    return _YAML_UNSAFE.sub(lambda m: f'\\u{ord(m.group()):04x}', _json_str(value))
+
+
+class JsonWriter:
+    """Streams the nested category/subcategories/types layout as indented JSON."""
+
+    def __init__(self, file):
+        self.file = file
+        self.stack = []
+        self.top_count = 0
+        file.write('{')
+
+    def _indent(self, depth):
+        return '\n' + '  ' * depth
+
+    def enter(self, node, path):
+        level = node['level']
+        depth = 2 * level - 1
+        if level == 1:
+            if self.top_count:
+                self.file.write(',')
+            self.top_count += 1
+        else:
+            parent = self.stack[-1]
+            if parent['children']:
+                self.file.write(',')
+            else:
+                self.file.write(f',{self._indent(depth - 1)}"{CHILD_KEYS[level - 1]}": {{')
+            parent['children'] += 1
+
+        self.file.write(f'{self._indent(depth)}{_json_str(node["name"])}: {{')
+        self.file.write(f'{self._indent(depth + 1)}"description": {_json_str(node["description"])}')
+        for key in ('hints', 'exceptions'):
+            if node[key]:
+                items = ','.join(self._indent(depth + 2) + _json_str(item) for item in node[key])
+                self.file.write(f',{self._indent(depth + 1)}"{key}": [{items}{self._indent(depth + 1)}]')
+        self.stack.append({'children': 0})
+
+    def exit(self, level):
+        entry = self.stack.pop()
+        depth = 2 * level - 1
+        if level in CHILD_KEYS:
+            if entry['children']:
+                self.file.write(self._indent(depth + 1) + '}')
+            else:
+                self.file.write(f',{self._indent(depth + 1)}"{CHILD_KEYS[level]}": {{}}')
+        self.file.write(self._indent(depth) + '}')
+
+    def close(self):
+        self.file.write('\n}\n' if self.top_count else '}\n')
+
+
+class YamlWriter:
+    """Streams the same layout as block YAML with double-quoted scalars."""
+
+    def __init__(self, file):
+        self.file = file
+        self.stack = []
+
+    def enter(self, node, path):
+        level = node['level']
+        pad = ' ' * (4 * (level - 1))
+        if level > 1:
+            parent = self.stack[-1]
+            if not parent['children']:
+                self.file.write(f'{pad[:-2]}{CHILD_KEYS[level - 1]}:\n')
+            parent['children'] += 1
+
+        self.file.write(f'{pad}{_yaml_str(node["name"])}:\n')
+        self.file.write(f'{pad}  description: {_yaml_str(node["description"])}\n')
+        for key in ('hints', 'exceptions'):
+            if node[key]:
+                self.file.write(f'{pad}  {key}:\n')
+                for item in node[key]:
+                    self.file.write(f'{pad}  - {_yaml_str(item)}\n')
+        self.stack.append({'children': 0})
+
+    def exit(self, level):
+        entry = self.stack.pop()
+        if level in CHILD_KEYS and not entry['children']:
+            pad = ' ' * (4 * (level - 1))
+            self.file.write(f'{pad}  {CHILD_KEYS[level]}: {{}}\n')
+
+    def close(self):
+        pass
+
+
+class CsvWriter:
+    """Streams one row per node with content, like yaml_to_csv_converter.py."""
+
+    def __init__(self, file):
+        self.writer = csv.writer(file)
+        self.writer.writerow(['Main Category', 'Subcategory', 'Description', 'Hints', 'Exceptions'])
+
+    def enter(self, node, path):
+        if node['description'] or node['hints'] or node['exceptions']:
+            self.writer.writerow([
+                path[0],
+                ' - '.join(path[1:]),
+                node['description'],
+                '; '.join(node['hints']),
+                '; '.join(node['exceptions'])
+            ])
+
+    def exit(self, level):
+        pass
+
+    def close(self):
+        pass
+
+
+class ReportWriter:
+    """Collects names and counts, then writes the structure report on close."""
+
+    def __init__(self, file, source_name):
+        self.file = file
+        self.source_name = source_name
+        self.structure = {}
+
+    def enter(self, node, path):
+        if node['level'] == 1:
+            self.structure[path[0]] = {}
+        elif node['level'] == 2:
+            self.structure[path[0]][path[1]] = []
+        else:
+            self.structure[path[0]][path[1]].append(path[2])
+
+    def exit(self, level):
+        pass
+
+    def close(self):
+        f = self.file
+        sub_count = sum(len(subs) for subs in self.structure.values())
+        types_count = sum(len(types) for subs in self.structure.values() for types in subs.values())
+
+        f.write(f"\nTaxonomy Analysis: {self.source_name}\n")
+        f.write("=" * 50 + "\n")
+        f.write(f"Main categories: {len(self.structure)}\n")
+        f.write(f"Subcategories: {sub_count}\n")
+        f.write(f"Types: {types_count}\n")
+
+        f.write("\nDetailed Structure Analysis:\n")
+        f.write("=" * 50 + "\n")
+        for main_category, subs in self.structure.items():
+            f.write(f"\nMain Category: {main_category}\n")
+            f.write(f"├── Number of subcategories: {len(subs)}\n")
+            for sub_name, types in subs.items():
+                f.write(f"│   ├── Subcategory: {sub_name}\n")
+                f.write(f"│   │   └── Number of types: {len(types)}\n")
+
+        f.write("\nComplete List of All Types:\n")
+        f.write("=" * 50 + "\n")
+        for main_category, subs in self.structure.items():
+            f.write(f"\nMain Category: {main_category}\n")
+            for sub_name, types in subs.items():
+                f.write(f"├── Subcategory: {sub_name}\n")
+                for type_item in types:
+                    f.write(f"│   └── Type: {type_item}\n")
+
+
+def output_paths(source, out_dir):
+    """Map each format (and the manifest) to its output path."""
+    stem = os.path.splitext(os.path.basename(source))[0]
+    return {
+        'json': os.path.join(out_dir, f'{stem}.json'),
+        'yaml': os.path.join(out_dir, f'{stem}.yaml'),
+        'csv': os.path.join(out_dir, f'{stem}.csv'),
+        'report': os.path.join(out_dir, f'{stem}_structure.txt'),
+        'manifest': os.path.join(out_dir, f'{stem}.manifest.json'),
+    }
+
+
+def read_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def compile_taxonomy(source=TAXONOMY_PATH, out_dir=None, formats=FORMATS, force=False):
+    """Compile `source` into the requested formats in one streaming pass.
+
+    Returns a dict with the 'written' and 'skipped' format names.
+    """
+    source = str(source)
+    out_dir = out_dir or os.path.dirname(os.path.abspath(__file__))
+    paths = output_paths(source, out_dir)
+    text, source_hash = read_source(source)
+
+    manifest = read_manifest(paths['manifest'])
+    fresh = (
+        not force
+        and manifest.get('source_sha256') == source_hash
+        and manifest.get('compiler_version') == COMPILER_VERSION
+    )
+    stale = [fmt for fmt in formats if not (fresh and fmt in manifest.get('outputs', {}) and os.path.exists(paths[fmt]))]
+    skipped = [fmt for fmt in formats if fmt not in stale]
+    if not stale:
+        return {'written': [], 'skipped': skipped}
+
+    os.makedirs(out_dir, exist_ok=True)
+    files = {fmt: open(paths[fmt], 'w', encoding='utf-8', newline='' if fmt == 'csv' else None) for fmt in stale}
+    try:
+        writers = []
+        for fmt, file in files.items():
+            if fmt == 'json':
+                writers.append(JsonWriter(file))
+            elif fmt == 'yaml':
+                writers.append(YamlWriter(file))
+            elif fmt == 'csv':
+                writers.append(CsvWriter(file))
+            elif fmt == 'report':
+                writers.append(ReportWriter(file, os.path.basename(source)))
+            else:
+                raise ValueError(f"Unknown output format: {fmt}")
+
+        path = []
+        for event, value in iter_events(text.splitlines()):
+            if event == 'enter':
+                path.append(value['name'])
+                for writer in writers:
+                    writer.enter(value, path)
+            else:
+                for writer in writers:
+                    writer.exit(value)
+                path.pop()
+        for writer in writers:
+            writer.close()
+    finally:
+        for file in files.values():
+            file.close()
+
+    outputs = manifest.get('outputs', {}) if fresh else {}
+    outputs.update({fmt: os.path.basename(paths[fmt]) for fmt in stale})
+    with open(paths['manifest'], 'w', encoding='utf-8') as f:
+        json.dump({
+            'source': os.path.basename(source),
+            'source_sha256': source_hash,
+            'compiler_version': COMPILER_VERSION,
+            'outputs': outputs,
+        }, f, ensure_ascii=False, indent=2)
+
+    return {'written': stale, 'skipped': skipped}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the taxonomy text into JSON, YAML, CSV and a structure report.")
+    parser.add_argument('source', nargs='?', default=str(TAXONOMY_PATH), help="taxonomy text file")
+    parser.add_argument('--out-dir', default=None, help="output directory (defaults to this script's directory)")
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS))
+    parser.add_argument('--force', action='store_true', help="rebuild outputs even if the source is unchanged")
+    args = parser.parse_args()
+
+    result = compile_taxonomy(args.source, args.out_dir, args.formats, args.force)
+    if result['written']:
+        print(f"Written: {', '.join(result['written'])}")
+    if result['skipped']:
+        print(f"Unchanged, skipped: {', '.join(result['skipped'])}")
+
+
+if __name__ == "__main__":
+    main()
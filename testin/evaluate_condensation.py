@@ -0,0 +1,113 @@
+"""Check that condensing long case texts keeps the labels while cutting latency.
+
+Every case longer than --threshold estimated tokens is classified twice in
+fresh chats: once with the full text and once with condensation.condense.
+The report shows how often the condensed labels match the full-text labels
+(and the expected labels, if the file has category/subcategory/type
+columns), with latency and input tokens for both. The input file is a CSV
+or JSONL with a text column. --offline skips the model calls and only
+reports the token reduction.
+
+    python evaluate_condensation.py cases.jsonl --key-id 1
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classifier import EXPLANATION_MODE, PROMPT_VARIANT, RESPONSE_KEYS, create_model, parse_response
+from condensation import CONDENSE_TARGET, CONDENSE_THRESHOLD, build_vocabulary, condense
+from taxonomy_compaction import build_variant, count_tokens
+
+
+def load_cases(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        if file_path.endswith('.jsonl'):
+            return [json.loads(line) for line in f if line.strip()]
+        return list(csv.DictReader(f))
+
+
+def classify(model, prompt, text):
+    chat = model.start_chat(history=[{"role": "user", "parts": [prompt]}])
+    start_time = time.time()
+    response = chat.send_message(text)
+    duration = time.time() - start_time
+    return parse_response(response.text), duration, response.usage_metadata.prompt_token_count
+
+
+def labels(data):
+    return None if data is False else tuple(str(data[key]).strip() for key in RESPONSE_KEYS)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare labels and latency on full vs. condensed long inputs.")
+    parser.add_argument('cases', help="CSV or JSONL with a text column (labels optional)")
+    parser.add_argument('--key-id', type=int, default=1)
+    parser.add_argument('--threshold', type=int, default=CONDENSE_THRESHOLD or 3000,
+                        help="only cases above this many estimated tokens")
+    parser.add_argument('--target', type=int, default=CONDENSE_TARGET)
+    parser.add_argument('--limit', type=int, default=None, help="only use the first N long cases")
+    parser.add_argument('--offline', action='store_true', help="report token reduction only")
+    args = parser.parse_args()
+
+    vocabulary = build_vocabulary()
+    cases = [case for case in load_cases(args.cases) if count_tokens(case['text'])[0] > args.threshold][:args.limit]
+    if not cases:
+        print(f"No cases above {args.threshold} tokens")
+        return
+
+    reduction = []
+    for case in cases:
+        start_time = time.perf_counter()
+        case['condensed'] = condense(case['text'], vocabulary, args.target)
+        case['condense_ms'] = (time.perf_counter() - start_time) * 1000
+        reduction.append(1 - count_tokens(case['condensed'])[0] / count_tokens(case['text'])[0])
+    print(f"{len(cases)} cases above {args.threshold} tokens; "
+          f"estimated input tokens cut by {sum(reduction) / len(reduction):.1%} on average, "
+          f"condensing took {max(case['condense_ms'] for case in cases):.1f} ms at most")
+    if args.offline:
+        return
+
+    import google.generativeai as genai
+    genai.configure(api_key=os.environ[f"GEMINI_API_KEY_{args.key_id}"])
+    model = create_model(labels_only=EXPLANATION_MODE != "inline")
+    prompt = build_variant(PROMPT_VARIANT)
+    has_labels = all(key in cases[0] for key in RESPONSE_KEYS)
+
+    results = {'full': {'durations': [], 'tokens': [], 'correct': 0},
+               'condensed': {'durations': [], 'tokens': [], 'correct': 0}}
+    agree = 0
+    for i, case in enumerate(cases, 1):
+        predicted = {}
+        for name, text in (('full', case['text']), ('condensed', case['condensed'])):
+            data, duration, tokens = classify(model, prompt, text)
+            predicted[name] = labels(data)
+            results[name]['durations'].append(duration)
+            results[name]['tokens'].append(tokens)
+            if has_labels:
+                results[name]['correct'] += predicted[name] == tuple(str(case[key]).strip() for key in RESPONSE_KEYS)
+        agree += predicted['full'] is not None and predicted['full'] == predicted['condensed']
+        print(f"{i}/{len(cases)}", end="\r", flush=True)
+
+    print(f"\nCondensed labels match full-text labels on {agree}/{len(cases)} cases ({agree / len(cases):.1%})")
+    print(f"{'input':<12}{'tokens':>9}{'p50':>8}{'p95':>8}{'mean':>8}" + (f"{'accuracy':>10}" if has_labels else ''))
+    for name, result in results.items():
+        durations = result['durations']
+        line = (f"{name:<12}{sum(result['tokens']) / len(cases):>9.0f}{percentile(durations, 0.5):>7.2f}s"
+                f"{percentile(durations, 0.95):>7.2f}s{sum(durations) / len(durations):>7.2f}s")
+        if has_labels:
+            line += f"{result['correct'] / len(cases):>10.1%}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
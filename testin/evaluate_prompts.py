@@ -0,0 +1,111 @@
+"""Evaluate compacted taxonomy prompt variants against a labelled case set.
+
+The labelled set is a CSV or JSONL file with text, category, subcategory
+and type columns. Each case is classified in a fresh chat per variant; the
+smallest variant whose accuracy stays within --tolerance of 'full' is
+recommended (set TAXONOMY_PROMPT_VARIANT to use it in the app).
+
+    python evaluate_prompts.py labelled.jsonl --key-id 1 --tolerance 0.02
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import google.generativeai as genai
+
+from classifier import RESPONSE_KEYS, create_model, parse_response
+from taxonomy_compaction import VARIANTS, build_variant, count_tokens
+
+
+def load_labelled(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        if file_path.endswith('.jsonl'):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    missing = [key for key in ('text',) + RESPONSE_KEYS if rows and key not in rows[0]]
+    if missing:
+        raise ValueError(f"Labelled set is missing columns: {', '.join(missing)}")
+    return rows
+
+
+def evaluate_variant(model, prompt, cases):
+    """Classify every case with `prompt` as context and score the labels."""
+    correct = {key: 0 for key in RESPONSE_KEYS}
+    exact = 0
+    failures = 0
+    durations = []
+    for case in cases:
+        chat = model.start_chat(history=[{"role": "user", "parts": [prompt]}])
+        start_time = time.time()
+        data = parse_response(chat.send_message(case['text']).text)
+        durations.append(time.time() - start_time)
+        if data is False:
+            failures += 1
+            continue
+        matches = [str(data[key]).strip() == str(case[key]).strip() for key in RESPONSE_KEYS]
+        for key, match in zip(RESPONSE_KEYS, matches):
+            correct[key] += match
+        exact += all(matches)
+
+    total = len(cases) or 1
+    return {
+        'accuracy': exact / total,
+        'level_accuracy': {key: count / total for key, count in correct.items()},
+        'invalid_responses': failures,
+        'mean_latency': sum(durations) / len(durations) if durations else 0.0,
+    }
+
+
+def choose_variant(results, tolerance):
+    """Smallest variant whose accuracy is within `tolerance` of the full prompt."""
+    baseline = results['full']['accuracy']
+    eligible = [name for name, result in results.items() if result['accuracy'] >= baseline - tolerance]
+    return min(eligible, key=lambda name: results[name]['tokens'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate compacted taxonomy prompts on a labelled set.")
+    parser.add_argument('labelled', help="CSV or JSONL with text, category, subcategory, type")
+    parser.add_argument('--key-id', type=int, default=1)
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument('--tolerance', type=float, default=0.02, help="allowed accuracy drop versus 'full'")
+    parser.add_argument('--limit', type=int, default=None, help="only use the first N cases")
+    parser.add_argument('--output', default=None, help="write the results as JSON")
+    args = parser.parse_args()
+
+    genai.configure(api_key=os.environ[f"GEMINI_API_KEY_{args.key_id}"])
+    model = create_model()
+    cases = load_labelled(args.labelled)[:args.limit]
+
+    variants = args.variants if 'full' in args.variants else ['full'] + args.variants
+    results = {}
+    for name in variants:
+        prompt = build_variant(name)
+        tokens, _ = count_tokens(prompt, model)
+        print(f"Evaluating {name} ({tokens} tokens) on {len(cases)} cases...")
+        results[name] = {'tokens': tokens, **evaluate_variant(model, prompt, cases)}
+
+    print(f"\n{'variant':<30}{'tokens':>8}{'accuracy':>10}{'category':>10}{'sub':>8}{'type':>8}{'invalid':>9}{'latency':>9}")
+    for name, result in results.items():
+        levels = result['level_accuracy']
+        print(f"{name:<30}{result['tokens']:>8}{result['accuracy']:>10.1%}"
+              f"{levels['category']:>10.1%}{levels['subcategory']:>8.1%}{levels['type']:>8.1%}"
+              f"{result['invalid_responses']:>9}{result['mean_latency']:>8.2f}s")
+
+    best = choose_variant(results, args.tolerance)
+    print(f"\nRecommended variant: {best} "
+          f"({results[best]['tokens']} tokens, {results[best]['accuracy']:.1%} vs {results['full']['accuracy']:.1%} full)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'recommended': best, 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
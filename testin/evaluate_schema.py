@@ -0,0 +1,120 @@
+"""Failure and retry rates with and without the taxonomy response schema.
+
+Every case is classified in fresh chats by three models: the free-form JSON
+instruction ('free'), the schema whose required path field is an enum of
+all the taxonomy's valid paths ('flat', the app's default), and the schema
+with one optional field per category, each an enum of that category's
+paths ('category', SCHEMA_BY_CATEGORY=1). The size of each schema is printed first.
+A response fails when it is not a
+parseable dict with the three labels (structural failure), or when its
+labels are not a path in the taxonomy (invalid labels). Each failure is
+retried, up to --retries times, to count the calls needed per valid result.
+Accuracy is reported if the file has category/subcategory/type columns.
+The input file is a CSV or JSONL with a text column.
+
+    python evaluate_schema.py cases.jsonl --key-id 1 --limit 100
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import google.generativeai as genai
+
+from classifier import (EXPLANATION_MODE, PROMPT_VARIANT, RESPONSE_KEYS, create_model, parse_response, response_schema,
+                        taxonomy_paths)
+from taxonomy_artifact import TaxonomyArtifact, ensure_artifact
+from taxonomy_compaction import build_variant
+from taxonomy_versions import PATH_SEPARATOR
+
+
+def load_cases(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        if file_path.endswith('.jsonl'):
+            return [json.loads(line) for line in f if line.strip()]
+        return list(csv.DictReader(f))
+
+
+def classify(model, prompt, text, valid, retries):
+    """Return (labels or None, attempts, outcomes, latencies) for one case."""
+    outcomes, latencies = [], []
+    for attempt in range(1, retries + 2):
+        chat = model.start_chat(history=[{"role": "user", "parts": [prompt]}])
+        start_time = time.time()
+        try:
+            data = parse_response(chat.send_message(text).text)
+        except Exception as e:
+            print(f"\n{e}")
+            data = False
+        latencies.append(time.time() - start_time)
+        if data is False:
+            outcomes.append('structural')
+            continue
+        labels = tuple(str(data[key]).strip() for key in RESPONSE_KEYS)
+        if PATH_SEPARATOR.join(labels) not in valid:
+            outcomes.append('invalid_labels')
+            continue
+        outcomes.append('ok')
+        return labels, attempt, outcomes, latencies
+    return None, retries + 1, outcomes, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare failure/retry rates with and without the response schema.")
+    parser.add_argument('cases', help="CSV or JSONL with a text column (labels optional)")
+    parser.add_argument('--key-id', type=int, default=1)
+    parser.add_argument('--retries', type=int, default=2, help="retries after a failed response")
+    parser.add_argument('--limit', type=int, default=None, help="only use the first N cases")
+    args = parser.parse_args()
+
+    genai.configure(api_key=os.environ[f"GEMINI_API_KEY_{args.key_id}"])
+    with TaxonomyArtifact(ensure_artifact()) as artifact:
+        paths = taxonomy_paths(artifact)
+    valid = set(paths)
+    labels_only = EXPLANATION_MODE != "inline"
+    models = {
+        'free': create_model(labels_only),
+        'flat': create_model(labels_only, paths=paths, by_category=False),
+        'category': create_model(labels_only, paths=paths, by_category=True),
+    }
+    for by_category, name in ((False, 'flat'), (True, 'category')):
+        schema = json.dumps(response_schema(paths, not labels_only, by_category), ensure_ascii=False)
+        print(f"{name} schema: {len(schema)} chars")
+    prompt = build_variant(PROMPT_VARIANT)
+    cases = load_cases(args.cases)[:args.limit]
+    has_labels = bool(cases) and all(key in cases[0] for key in RESPONSE_KEYS)
+
+    results = {name: {'first': {'ok': 0, 'structural': 0, 'invalid_labels': 0}, 'calls': 0, 'unresolved': 0,
+                      'correct': 0, 'latencies': []} for name in models}
+    for i, case in enumerate(cases, 1):
+        for name, model in models.items():
+            labels, attempts, outcomes, latencies = classify(model, prompt, case['text'], valid, args.retries)
+            result = results[name]
+            result['first'][outcomes[0]] += 1
+            result['calls'] += attempts
+            result['unresolved'] += labels is None
+            result['latencies'].extend(latencies)
+            if has_labels and labels is not None:
+                result['correct'] += labels == tuple(str(case[key]).strip() for key in RESPONSE_KEYS)
+        print(f"{i}/{len(cases)}", end="\r", flush=True)
+
+    total = len(cases) or 1
+    print(f"\n{'model':<10}{'structural':>12}{'invalid':>9}{'retry rate':>12}{'calls/case':>12}"
+          f"{'unresolved':>12}{'latency':>9}" + (f"{'accuracy':>10}" if has_labels else ''))
+    for name, result in results.items():
+        first = result['first']
+        latencies = result['latencies']
+        line = (f"{name:<10}{first['structural'] / total:>12.1%}{first['invalid_labels'] / total:>9.1%}"
+                f"{1 - first['ok'] / total:>12.1%}{result['calls'] / total:>12.2f}{result['unresolved']:>12}"
+                f"{sum(latencies) / max(1, len(latencies)):>8.2f}s")
+        if has_labels:
+            line += f"{result['correct'] / total:>10.1%}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""Re-validate stored classifications against the current taxonomy and re-classify bad rows.
+
+Scan: label triples are read from history.db in rowid chunks and checked
+against the taxonomy's valid paths with one pandas merge per chunk. Rows
+labelled '-' (the model's response could not be parsed) and rows whose
+labels are no longer in the taxonomy go into the revalidation_queue table.
+With --affected, rows saved under an older taxonomy version whose labels
+fall under a branch that changed since (taxonomy_versions.affected_branches)
+are queued too. The queue inserts and the scan checkpoint are committed
+together, so an interrupted scan resumes from the last chunk. Running the
+scan again for the same taxonomy version finds nothing new.
+
+Re-classify: queued rows are sent to Gemini one at a time, at most --rate
+per minute. An invalid or failed row is first checked again, and closed
+without a model call if its labels are already valid; an affected row's
+labels are valid by definition, so it is always re-classified. New labels are written back only if they
+are valid; otherwise the row is retried in a later run, up to
+--max-attempts times.
+
+    python revalidate_history.py --db ../history.db --scan-only
+    python revalidate_history.py --db ../history.db --key-id 1 --rate 30
+    python revalidate_history.py --db ../history.db --status
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+import history_db
+from classifier import (EXPLANATION_MODE, NO_TYPE, PROMPT_VARIANT, RESPONSE_SCHEMA, create_model, parse_response,
+                        taxonomy_paths)
+from condensation import build_vocabulary, prepare_input
+from taxonomy_artifact import TaxonomyArtifact, ensure_artifact
+from taxonomy_compaction import build_variant
+from taxonomy_versions import PATH_SEPARATOR, affected_branches, diff_nodes, hash_nodes, load_manifest
+
+LABELS = ['main_classification', 'sub_classification', 'case_type']
+
+
+def valid_paths(nodes):
+    """DataFrame of every valid (category, subcategory, type) triple.
+
+    As in the app, a subcategory with type 'لا يوجد' is valid whether or
+    not the subcategory has types.
+    """
+    paths = [tuple(key.split(PATH_SEPARATOR)) for key in nodes]
+    triples = [path for path in paths if len(path) == 3]
+    triples += [(*path, NO_TYPE) for path in paths if len(path) == 2]
+    return pd.DataFrame(triples, columns=LABELS).drop_duplicates()
+
+
+def affected_by_version(current_nodes):
+    """Old taxonomy version -> node keys affected by the changes since then."""
+    versions = load_manifest()['versions']
+    return {
+        version: affected_branches(diff_nodes(data['nodes'], current_nodes))
+        for version, data in versions.items()
+    }
+
+
+def find_invalid(chunk, valid, current_version, affected=None):
+    """Set-based check of one chunk; returns its rows to queue with a reason."""
+    checked = chunk.merge(valid, on=LABELS, how='left', indicator=True)
+    reason = pd.Series(None, index=checked.index, dtype=object)
+    reason[checked['_merge'] == 'left_only'] = 'invalid'
+    reason[checked['main_classification'] == '-'] = 'failed'
+
+    if affected is not None:
+        category = checked['main_classification']
+        subcategory = category + PATH_SEPARATOR + checked['sub_classification']
+        case_type = subcategory + PATH_SEPARATOR + checked['case_type']
+        older = checked['taxonomy_version'].notna() & (checked['taxonomy_version'] != current_version)
+        for version, rows in checked[older & reason.isna()].groupby('taxonomy_version'):
+            keys = affected.get(version)
+            if keys is None:
+                continue  # version not in the manifest: nothing to compare with
+            index = rows.index
+            if '' in keys:
+                hit = pd.Series(True, index=index)
+            else:
+                hit = category[index].isin(keys) | subcategory[index].isin(keys) | case_type[index].isin(keys)
+            reason[index[hit.to_numpy()]] = 'affected'
+
+    checked['reason'] = reason
+    return checked.loc[reason.notna(), ['id', 'reason']]
+
+
+def scan(conn, valid, current_version, chunk_size, affected=None):
+    """Queue invalid rows, resuming from the checkpoint for `current_version`."""
+    conn.execute('INSERT OR IGNORE INTO revalidation_scan (taxonomy_version) VALUES (?)', (current_version,))
+    last_rowid, finished = conn.execute(
+        'SELECT last_rowid, finished_at FROM revalidation_scan WHERE taxonomy_version = ?', (current_version,)
+    ).fetchone()
+    total = conn.execute('SELECT COUNT(*) FROM classifications WHERE rowid > ?', (last_rowid,)).fetchone()[0]
+    if finished and not total:
+        print(f"Scan for taxonomy {current_version} already finished")
+        return 0
+    print(f"Scanning {total:,} rows after rowid {last_rowid} against taxonomy {current_version}")
+
+    start = time.perf_counter()
+    scanned = queued = 0
+    while True:
+        chunk = pd.read_sql_query('''
+            SELECT rowid, id, main_classification, sub_classification, case_type, taxonomy_version
+            FROM classifications WHERE rowid > ? ORDER BY rowid LIMIT ?
+        ''', conn, params=(last_rowid, chunk_size))
+        if chunk.empty:
+            break
+        invalid = find_invalid(chunk, valid, current_version, affected)
+        last_rowid = int(chunk['rowid'].iloc[-1])
+        with conn:
+            # A row queued for an older taxonomy version is queued again for this one
+            before = conn.total_changes
+            conn.executemany('''
+                INSERT INTO revalidation_queue (id, reason, taxonomy_version) VALUES (?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    reason = excluded.reason, taxonomy_version = excluded.taxonomy_version,
+                    status = 'pending', attempts = 0, updated_at = CURRENT_TIMESTAMP
+                WHERE revalidation_queue.taxonomy_version != excluded.taxonomy_version
+            ''', [(row.id, row.reason, current_version) for row in invalid.itertuples(index=False)])
+            queued += conn.total_changes - before
+            conn.execute('UPDATE revalidation_scan SET last_rowid = ? WHERE taxonomy_version = ?',
+                         (last_rowid, current_version))
+        scanned += len(chunk)
+        elapsed = time.perf_counter() - start
+        print(f"  scanned {scanned:,}/{total:,} rows ({scanned / elapsed:,.0f} rows/s), queued {queued:,}",
+              end="\r", flush=True)
+
+    with conn:
+        conn.execute('UPDATE revalidation_scan SET finished_at = CURRENT_TIMESTAMP WHERE taxonomy_version = ?',
+                     (current_version,))
+    print(f"\nScan finished: {scanned:,} rows, {queued:,} newly queued")
+    return queued
+
+
+def is_valid(labels, valid_set):
+    category, subcategory, case_type = labels
+    return category != '-' and (category, subcategory, case_type) in valid_set
+
+
+def reclassify(conn, valid_set, current_version, model, prompt, rate, max_attempts, limit=None):
+    """Re-classify pending rows, at most `rate` model calls per minute."""
+    pending = conn.execute('''
+        SELECT q.id, q.reason, q.attempts, c.input_text, c.main_classification, c.sub_classification, c.case_type
+        FROM revalidation_queue q JOIN classifications c ON c.id = q.id
+        WHERE q.status = 'pending' AND q.taxonomy_version = ?
+        ORDER BY q.queued_at, q.rowid LIMIT ?
+    ''', (current_version, -1 if limit is None else limit)).fetchall()
+    if not pending:
+        print("Nothing to re-classify")
+        return
+    vocabulary = build_vocabulary()
+    interval = 60.0 / rate
+    counts = {'done': 0, 'already_valid': 0, 'retry': 0, 'failed': 0}
+    next_call = time.monotonic()
+    start = time.monotonic()
+    for i, (entry_id, reason, attempts, text, *labels) in enumerate(pending, 1):
+        if reason != 'affected' and is_valid(labels, valid_set):
+            status, update = 'done', None
+            counts['already_valid'] += 1
+        else:
+            time.sleep(max(0.0, next_call - time.monotonic()))
+            next_call = time.monotonic() + interval
+            model_input, _, _ = prepare_input(text, vocabulary)
+            chat = model.start_chat(history=[{"role": "user", "parts": [prompt]}])
+            call_start = time.time()
+            try:
+                data = parse_response(chat.send_message(model_input).text)
+            except Exception as e:
+                print(f"\n  {entry_id}: {e}")
+                data = False
+            duration = time.time() - call_start
+            new_labels = (data['category'], data['subcategory'], data['type']) if data else None
+            if new_labels and is_valid(new_labels, valid_set):
+                status, update = 'done', (*new_labels, data.get('explanation'), f"{duration:.2f}")
+                counts['done'] += 1
+            else:
+                status, update = ('failed' if attempts + 1 >= max_attempts else 'pending'), None
+                counts['failed' if status == 'failed' else 'retry'] += 1
+
+        with conn:
+            if update:
+                conn.execute('''
+                    UPDATE classifications SET main_classification = ?, sub_classification = ?, case_type = ?,
+                        explanation = ?, duration = ?, explanation_duration = NULL, taxonomy_version = ?
+                    WHERE id = ?
+                ''', (*update, current_version, entry_id))
+            conn.execute('''
+                UPDATE revalidation_queue SET status = ?, attempts = attempts + ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (status, 0 if update is None and status == 'done' else 1, entry_id))
+
+        elapsed = time.monotonic() - start
+        eta = elapsed / i * (len(pending) - i)
+        print(f"  {i:,}/{len(pending):,} rows, {counts}, ETA {eta / 60:.1f} min", end="\r", flush=True)
+    print(f"\nRe-classification finished: {counts}")
+    stale = check_affected(conn, current_version)
+    if stale:
+        print(f"Warning: {stale:,} affected rows closed without new labels for taxonomy {current_version}")
+
+
+def check_affected(conn, current_version):
+    """Number of affected rows marked done that were not re-labelled under `current_version`."""
+    return conn.execute('''
+        SELECT COUNT(*) FROM revalidation_queue q JOIN classifications c ON c.id = q.id
+        WHERE q.reason = 'affected' AND q.status = 'done' AND q.taxonomy_version = ?
+          AND c.taxonomy_version IS NOT ?
+    ''', (current_version, current_version)).fetchone()[0]
+
+
+def print_status(conn):
+    for version, last_rowid, finished in conn.execute(
+            'SELECT taxonomy_version, last_rowid, finished_at FROM revalidation_scan'):
+        print(f"scan {version}: up to rowid {last_rowid}, {'finished ' + finished if finished else 'in progress'}")
+    for version, status, reason, count in conn.execute('''
+            SELECT taxonomy_version, status, reason, COUNT(*) FROM revalidation_queue
+            GROUP BY taxonomy_version, status, reason ORDER BY taxonomy_version, status, reason'''):
+        print(f"queue {version}: {status:<8} {reason:<9} {count:,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-validate stored labels and re-classify invalid rows.")
+    parser.add_argument('--db', default=history_db.DB_PATH)
+    parser.add_argument('--chunk-size', type=int, default=50_000)
+    parser.add_argument('--affected', action='store_true',
+                        help="also queue rows under taxonomy branches changed since they were labelled")
+    parser.add_argument('--scan-only', action='store_true', help="queue rows without calling the model")
+    parser.add_argument('--status', action='store_true', help="print scan and queue progress and exit")
+    parser.add_argument('--key-id', type=int, default=1)
+    parser.add_argument('--rate', type=float, default=30, help="model calls per minute")
+    parser.add_argument('--max-attempts', type=int, default=3)
+    parser.add_argument('--limit', type=int, default=None, help="re-classify at most N rows in this run")
+    args = parser.parse_args()
+
+    history_db.DB_PATH = args.db
+    conn = history_db.init_db()
+    if args.status:
+        print_status(conn)
+        return
+
+    current_version, nodes = hash_nodes()
+    valid = valid_paths(nodes)
+    affected = affected_by_version(nodes) if args.affected else None
+    scan(conn, valid, current_version, args.chunk_size, affected)
+    if args.scan_only:
+        return
+
+    import google.generativeai as genai
+    genai.configure(api_key=os.environ[f"GEMINI_API_KEY_{args.key_id}"])
+    with TaxonomyArtifact(ensure_artifact()) as artifact:
+        paths = taxonomy_paths(artifact) if RESPONSE_SCHEMA else None
+    model = create_model(labels_only=EXPLANATION_MODE != "inline", paths=paths)
+    valid_set = set(valid.itertuples(index=False, name=None))
+    reclassify(conn, valid_set, current_version, model, build_variant(PROMPT_VARIANT),
+               args.rate, args.max_attempts, args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Instant stand-in for the Gemini model, shared by the app benchmarks.
+
+use_stand_in_model() makes the app's initialize_gemini return StandInChat
+sessions that answer every case with RESPONSE, so a benchmark measures the
+app itself (imports, rendering) without the SDK, an upload or a model call.
+"""
+import json
+import os
+import sys
+import types
+
+CASE_TEXT = "نزاع بين الشركاء في شركة تضامن حول توزيع الأرباح وتصفية حصة أحد الشركاء بعد انسحابه."
+RESPONSE = {'category': 'تجاري', 'subcategory': 'الشركات', 'type': 'لا يوجد', 'explanation': 'شرح'}
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class StandInChat:
+    """Replaces the Gemini chat session; answers instantly with a fixed label."""
+
+    def send_message(self, content):
+        return _Response(json.dumps(RESPONSE, ensure_ascii=False))
+
+
+class StandInModel:
+    def start_chat(self, history=None):
+        return StandInChat()
+
+
+def use_stand_in_model():
+    """Make the app's initialize_gemini return StandInChat sessions, without the SDK or an upload."""
+    import classifier
+    import warmup
+    for key_id in range(1, classifier.NUM_KEYS + 1):
+        os.environ.setdefault(f"GEMINI_API_KEY_{key_id}", "stand-in")
+    classifier.create_model = lambda *args, **kwargs: StandInModel()
+    warmup.taxonomy_file = lambda key_id, taxonomy_version: None
+    sys.modules.setdefault('google.generativeai', types.SimpleNamespace(configure=lambda **kwargs: None))
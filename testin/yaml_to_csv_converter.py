@@ -1,6 +1,12 @@
 import yaml
 import csv
 import os
+import sys
+from collections.abc import Mapping
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from taxonomy_artifact import TaxonomyArtifact, ensure_artifact
 
 def process_item(writer, main_cat, current_path, data):
     # Get metadata for current item
@@ -8,7 +14,7 @@ def process_item(writer, main_cat, current_path, data):
     hints = []
     exceptions = []
     
-    if isinstance(data, dict):
+    if isinstance(data, Mapping):
         description = data.get('description', '')
         hints = data.get('hints', [])
         exceptions = data.get('exceptions', [])
@@ -25,17 +31,23 @@ def process_item(writer, main_cat, current_path, data):
         
         # Process nested items
         for key, value in data.items():
-            if isinstance(value, dict) and key not in ['description', 'hints', 'exceptions']:
+            if isinstance(value, Mapping) and key not in ['description', 'hints', 'exceptions']:
                 new_path = current_path + [key] if current_path else [key]
                 process_item(writer, main_cat, new_path, value)
 
+def load_taxonomy(file_path):
+    # Binary artifacts are memory-mapped and decoded lazily; anything else is YAML
+    if file_path.endswith('.nztx'):
+        return TaxonomyArtifact(file_path).as_mapping()
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return yaml.safe_load(file)
+
 def flatten_yaml_to_csv(yaml_file_path, csv_file_path):
-    # Read YAML file
-    print(f"Reading YAML file from: {yaml_file_path}")
-    with open(yaml_file_path, 'r', encoding='utf-8') as file:
-        data = yaml.safe_load(file)
+    # Read taxonomy file
+    print(f"Reading taxonomy from: {yaml_file_path}")
+    data = load_taxonomy(yaml_file_path)
     
-    print(f"YAML data loaded. Top-level keys: {list(data.keys())}")
+    print(f"Taxonomy loaded. Top-level keys: {list(data.keys())}")
     
     # Prepare CSV file
     with open(csv_file_path, 'w', encoding='utf-8', newline='') as file:
@@ -50,15 +62,15 @@ def flatten_yaml_to_csv(yaml_file_path, csv_file_path):
 
 if __name__ == "__main__":
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    yaml_file = os.path.join(script_dir, "Clasess_with_hints.yaml")
+    yaml_file = str(ensure_artifact())
     csv_file = os.path.join(script_dir, "classes_converted.csv")
     
     print(f"Starting conversion...")
-    print(f"YAML file path: {yaml_file}")
+    print(f"Taxonomy file path: {yaml_file}")
     print(f"CSV file path: {csv_file}")
     
     if not os.path.exists(yaml_file):
-        print(f"Error: YAML file not found at {yaml_file}")
+        print(f"Error: taxonomy file not found at {yaml_file}")
     else:
         flatten_yaml_to_csv(yaml_file, csv_file)
         print(f"Conversion completed. CSV file saved as: {csv_file}") 
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""Background warm-up of the app's resources at server start, with a readiness probe.
+
+`start()` runs the stages below in a background thread and serves their
+status on READINESS_PORT. GET /ready answers 200 once every stage is
+ready and 503 before that; both return the per-stage status as JSON.
+GET /metrics returns the live counters of the admission controller and
+of speculative classification (see admission.py and speculation.py).
+
+    database          create or migrate history.db
+    taxonomy          rebuild Data/Classes.nztx if needed and record the version
+    similarity_index  index classifications saved since the last sync
+    gemini            upload the taxonomy prompt for every configured API key
+
+Uploads are kept per (key, taxonomy version, prompt variant) for the life
+of the process, so `taxonomy_file` returns them to the app without a new
+upload. Each upload uses a client bound to its own key, and no lock is held
+while it runs. A failed stage is retried every RETRY_SECONDS.
+"""
+import datetime
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import admission
+import speculation
+from classifier import NUM_KEYS, PROMPT_VARIANT, upload_file
+from history_db import init_db, sync_similarity_index
+from similarity_index import shared_index
+from taxonomy_artifact import ensure_artifact
+from taxonomy_compaction import variant_path
+from taxonomy_versions import record_version
+
+READINESS_PORT = int(os.environ.get("READINESS_PORT", "8503"))
+RETRY_SECONDS = 30
+
+# Gemini deletes uploaded files after 48 hours; upload again before that
+FILE_EXPIRY = datetime.timedelta(hours=48)
+FILE_TTL = datetime.timedelta(hours=47)
+
+# A chat session may be created from an upload up to FILE_TTL old, so it is
+# cached for at most the remaining time before Gemini deletes the file
+SESSION_TTL = FILE_EXPIRY - FILE_TTL
+
+STAGES = ('database', 'taxonomy', 'similarity_index', 'gemini')
+
+_status = {stage: {'state': 'pending'} for stage in STAGES}
+_status_lock = threading.Lock()
+_files = {}  # (key, version, variant) -> (Future of the upload, started at)
+_files_lock = threading.Lock()
+_started = False
+
+
+def taxonomy_file(key_id, taxonomy_version):
+    """Return the uploaded taxonomy prompt for an API key, uploading it if needed.
+
+    Raises KeyError if the key is not configured. Concurrent callers for the
+    same key and version wait for an upload in progress instead of starting
+    their own; other keys and cached uploads are not held up by it.
+    """
+    api_key = os.environ[f"GEMINI_API_KEY_{key_id}"]
+    cache_key = (key_id, taxonomy_version, PROMPT_VARIANT)
+    with _files_lock:
+        cached = _files.get(cache_key)
+        if cached and (not cached[0].done() or (cached[0].exception() is None
+                                               and time.time() - cached[1] < FILE_TTL.total_seconds())):
+            future, owner = cached[0], False
+        else:
+            future, owner = Future(), True
+            _files[cache_key] = (future, time.time())
+    if owner:
+        try:
+            future.set_result(upload_file(variant_path(PROMPT_VARIANT), api_key=api_key))
+        except BaseException as e:
+            future.set_exception(e)
+    return future.result()
+
+
+def configured_keys():
+    return [key_id for key_id in range(1, NUM_KEYS + 1) if os.environ.get(f"GEMINI_API_KEY_{key_id}")]
+
+
+def _warm_database(context):
+    init_db().close()
+
+
+def _warm_taxonomy(context):
+    ensure_artifact()
+    context['taxonomy_version'] = record_version()[1]
+
+
+def _warm_similarity_index(context):
+    conn = init_db()
+    try:
+        sync_similarity_index(shared_index(), conn)
+    finally:
+        conn.close()
+
+
+def _warm_gemini(context):
+    keys = configured_keys()
+    if not keys:
+        raise Exception("No GEMINI_API_KEY_<n> is configured")
+    for key_id in keys:
+        taxonomy_file(key_id, context['taxonomy_version'])
+
+
+_WARMERS = {
+    'database': _warm_database,
+    'taxonomy': _warm_taxonomy,
+    'similarity_index': _warm_similarity_index,
+    'gemini': _warm_gemini,
+}
+
+
+def _set_status(stage, **fields):
+    with _status_lock:
+        _status[stage] = fields
+
+
+def status():
+    """Per-stage status and whether every stage is ready."""
+    with _status_lock:
+        stages = {stage: dict(fields) for stage, fields in _status.items()}
+    return {'ready': all(fields['state'] == 'ready' for fields in stages.values()), 'stages': stages}
+
+
+def run_stages():
+    """Run every stage in order, retrying from the first failed stage until all are ready."""
+    context = {}
+    done = set()
+    while True:
+        for stage in STAGES:
+            if stage in done:
+                continue
+            _set_status(stage, state='running')
+            start_time = time.time()
+            try:
+                _WARMERS[stage](context)
+            except Exception as e:
+                print(f"Warm-up stage {stage} failed: {e}")
+                _set_status(stage, state='failed', error=str(e), seconds=round(time.time() - start_time, 2))
+                break  # later stages depend on the earlier ones
+            _set_status(stage, state='ready', seconds=round(time.time() - start_time, 2))
+            print(f"Warm-up stage {stage} ready in {time.time() - start_time:.2f} seconds")
+            done.add(stage)
+        else:
+            return
+        time.sleep(RETRY_SECONDS)
+
+
+class ReadinessHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.rstrip('/')
+        if path == '/ready':
+            report = status()
+            code = 200 if report['ready'] else 503
+        elif path == '/metrics':
+            report = {'admission': admission.controller.stats(), 'speculation': speculation.speculator.stats()}
+            code = 200
+        else:
+            self.send_error(404)
+            return
+        body = json.dumps(report).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start(port=READINESS_PORT):
+    """Start the readiness server and the warm-up thread (once per process)."""
+    global _started
+    if _started:
+        return
+    _started = True
+    server = ThreadingHTTPServer(('0.0.0.0', port), ReadinessHandler)
+    threading.Thread(target=server.serve_forever, name='readiness', daemon=True).start()
+    threading.Thread(target=run_stages, name='warmup', daemon=True).start()
+    print(f"Warm-up started; readiness on http://0.0.0.0:{port}/ready")